@@ -0,0 +1,48 @@
+"""
+So sánh hai lần chạy benchmark (file JSON của run_benchmarks).
+"""
+import json
+from pathlib import Path
+
+from .suite import FORMAT_VERSION, BenchmarkError
+
+
+def load_run(path) -> dict:
+    run = json.loads(Path(path).read_text())
+    if run.get('format') != FORMAT_VERSION:
+        raise BenchmarkError(f'{path}: định dạng kết quả không được hỗ trợ ({run.get("format")})')
+    return run
+
+
+def compare_runs(baseline: dict, current: dict, tolerance: float = 0.1, min_ms: float = 1.0) -> list[dict]:
+    """
+    So từng (bộ dữ liệu, case) có trong cả hai lần chạy.
+
+    Là regression khi thời gian median tăng quá tolerance (và quá min_ms, để bỏ qua dao động của case rất nhanh),
+    bộ nhớ đỉnh tăng quá tolerance, hoặc số truy vấn tăng.
+
+    Returns:
+        list[dict]: mỗi phần tử gồm dataset, case, metric, baseline, current, change (tỉ lệ) và regression.
+    """
+    baseline_results = {(result['dataset'], result['case']): result for result in baseline['results']}
+    rows = []
+    for result in current['results']:
+        before = baseline_results.get((result['dataset'], result['case']))
+        if before is None:
+            continue
+        metrics = [
+            ('wall_ms', before['wall_ms']['median'], result['wall_ms']['median']),
+            ('queries', before['queries'], result['queries']),
+            ('peak_memory_kb', before['peak_memory_kb'], result['peak_memory_kb']),
+        ]
+        for metric, old, new in metrics:
+            change = (new - old) / old if old else 0.0
+            if metric == 'queries':
+                regression = new > old
+            elif metric == 'wall_ms':
+                regression = change > tolerance and new - old > min_ms
+            else:
+                regression = change > tolerance
+            rows.append({'dataset': result['dataset'], 'case': result['case'], 'metric': metric,
+                         'baseline': old, 'current': new, 'change': change, 'regression': regression})
+    return rows
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.compare import compare_runs, load_run
+from benchmarks.suite import BenchmarkError
+
+
+class Command(BaseCommand):
+    help = ('Compares two run_benchmarks result files and fails when a case got slower, used more memory or '
+            'ran more queries than the baseline beyond the tolerance.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('baseline', help='Result file of the reference run.')
+        parser.add_argument('current', help='Result file of the run to check.')
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.1,
+            help='Allowed relative increase of median wall time and peak memory (default: 0.1 = 10%%).',
+        )
+        parser.add_argument(
+            '--min-ms',
+            type=float,
+            default=1.0,
+            help='Ignore wall time increases smaller than this many milliseconds (default: 1.0).',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            baseline, current = load_run(options['baseline']), load_run(options['current'])
+        except (OSError, ValueError, BenchmarkError) as e:
+            raise CommandError(str(e))
+        if baseline['engine'] != current['engine']:
+            self.stdout.write(self.style.WARNING(
+                f'Runs used different report engines: {baseline["engine"]} and {current["engine"]}.'
+            ))
+
+        rows = compare_runs(baseline, current, tolerance=options['tolerance'], min_ms=options['min_ms'])
+        if not rows:
+            raise CommandError('The two runs have no (dataset, case) in common.')
+
+        for row in rows:
+            line = (f'{row["dataset"]:>10} {row["case"]:<18} {row["metric"]:<15} {row["baseline"]:>12g} -> '
+                    f'{row["current"]:<12g} {row["change"]:+7.1%}')
+            if row['regression']:
+                self.stdout.write(self.style.ERROR(f'{line}  REGRESSION'))
+            elif row['change'] < -options['tolerance']:
+                self.stdout.write(self.style.SUCCESS(f'{line}  improved'))
+            else:
+                self.stdout.write(line)
+
+        regressions = [row for row in rows if row['regression']]
+        if regressions:
+            raise CommandError(f'{len(regressions)} regressions beyond the tolerance.')
+        self.stdout.write(self.style.SUCCESS('No regressions.'))
@@ -0,0 +1,66 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from benchmarks.suite import CASES, BenchmarkError, run_suite, select_cases
+
+
+class Command(BaseCommand):
+    help = ('Benchmarks the report services and the list/detail API endpoints on datasets of several sizes '
+            'and writes wall time, query counts and peak memory to a JSON file.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='1000,10000,100000',
+            help='Comma-separated datasets: "current" for the configured database, or a number of orders for a '
+                 'synthetic dataset generated (once) into BENCHMARK_DIR/data (default: 1000,10000,100000).',
+        )
+        parser.add_argument(
+            '--case',
+            action='append',
+            dest='cases',
+            help=f'Only run cases matching this glob pattern (can be repeated). Cases: {", ".join(CASES)}.',
+        )
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case (default: 5).')
+        parser.add_argument('--seed', type=int, default=42, help='Seed of the synthetic datasets (default: 42).')
+        parser.add_argument(
+            '--engine',
+            choices=['orm', 'columnar'],
+            help='Report engine to benchmark (default: settings.REPORT_ENGINE).',
+        )
+        parser.add_argument(
+            '--output',
+            help='Result file (default: BENCHMARK_DIR/results/<timestamp>.json).',
+        )
+
+    def handle(self, *args, **options):
+        datasets = [size.strip() for size in options['sizes'].split(',') if size.strip()]
+        for dataset in datasets:
+            if dataset != 'current' and not (dataset.isdigit() and int(dataset) > 0):
+                raise CommandError(f'Invalid dataset "{dataset}": use "current" or a positive number of orders.')
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1.')
+
+        def progress(result):
+            wall = result['wall_ms']
+            self.stdout.write(
+                f'{result["dataset"]:>10} {result["case"]:<18} median {wall["median"]:10.2f} ms '
+                f'(min {wall["min"]:.2f}, max {wall["max"]:.2f})  {result["queries"]:5d} queries  '
+                f'{result["peak_memory_kb"]:10.1f} KiB peak'
+            )
+
+        try:
+            run = run_suite(datasets, select_cases(options['cases']), repeat=options['repeat'],
+                            seed=options['seed'], engine=options['engine'], progress=progress)
+        except BenchmarkError as e:
+            raise CommandError(str(e))
+
+        output = Path(options['output'] or Path(settings.BENCHMARK_DIR) / 'results'
+                      / f'{timezone.now():%Y%m%dT%H%M%S}.json')
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(run, indent=2))
+        self.stdout.write(self.style.SUCCESS(f'Wrote {len(run["results"])} results to {output}'))
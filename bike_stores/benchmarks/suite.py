@@ -0,0 +1,250 @@
+"""
+Bộ benchmark cho các service báo cáo và các endpoint danh sách/chi tiết.
+
+Mỗi case được chạy trên từng bộ dữ liệu: 'current' là cơ sở dữ liệu đang cấu hình, một số nguyên N là bộ dữ liệu
+giả N đơn hàng sinh bằng generate_data, lưu thành file SQLite riêng trong BENCHMARK_DIR và dùng lại ở các lần sau.
+Mỗi case ghi thời gian (min/median/max của các lần lặp, cache báo cáo được xóa trước mỗi lần), số truy vấn SQL
+và bộ nhớ cấp phát đỉnh (đo bằng tracemalloc ở một lần chạy riêng, vì tracemalloc làm chậm).
+"""
+import fnmatch
+import logging
+import os
+import platform
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import date
+from io import StringIO
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from production.models import Product, Stock
+from report.columnar import reset_columnar_engine
+from report.recommendations import reset_recommendation_index
+from report.services import get_inventory_report_data, get_pareto_customer_analysis, get_revenue_report_data
+from sales.models import Customer, Order, OrderItem, Staff, Store
+
+FORMAT_VERSION = 1
+PERIODS = ['day', 'week', 'month', 'quarter', 'year']
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def _service(function, **kwargs):
+    def prepare():
+        return lambda: function(**kwargs)
+    return prepare
+
+
+def _endpoint(url_name, kwargs=None):
+    """
+    Case gọi GET qua test client. kwargs() lấy tham số URL (ví dụ khóa chính đầu tiên) trên bộ dữ liệu đang dùng.
+    """
+    def prepare():
+        url = reverse(url_name, kwargs=kwargs() if kwargs else None)
+        client = Client()
+
+        def run():
+            response = client.get(url)
+            if response.status_code != 200:
+                raise BenchmarkError(f'GET {url} trả về {response.status_code}')
+        return run
+    return prepare
+
+
+def _first(model, *fields):
+    values = model.objects.order_by('pk').values_list(*fields).first()
+    if values is None:
+        raise BenchmarkError(f'Bảng {model._meta.db_table} không có dữ liệu')
+    return dict(zip(fields, values))
+
+
+# Tên case -> hàm chuẩn bị, trả về hàm chạy một lần
+CASES = {
+    'inventory': _service(get_inventory_report_data),
+    **{f'revenue[{period}]': _service(get_revenue_report_data, end_date=date.today(), period=period)
+       for period in PERIODS},
+    'pareto': _service(get_pareto_customer_analysis, end_date=date.today()),
+    'store-list': _endpoint('store-list'),
+    'store-detail': _endpoint('store-detail', lambda: _first(Store, 'store_id')),
+    'staff-list': _endpoint('staff-list'),
+    'staff-detail': _endpoint('staff-detail', lambda: _first(Staff, 'staff_id')),
+    'customer-list': _endpoint('customer-list'),
+    'customer-detail': _endpoint('customer-detail', lambda: _first(Customer, 'customer_id')),
+    'order-list': _endpoint('order-list'),
+    'order-detail': _endpoint('order-detail', lambda: _first(Order, 'order_id')),
+    'orderitem-list': _endpoint('orderitem-list'),
+    'orderitem-detail': _endpoint('orderitem-detail', lambda: _first(OrderItem, 'order_id', 'item_id')),
+    'product-list': _endpoint('product-list-create'),
+    'product-detail': _endpoint('product-detail', lambda: _first(Product, 'product_id')),
+    'stock-list': _endpoint('stock-list-create'),
+    'stock-detail': _endpoint('stock-detail', lambda: _first(Stock, 'store_id', 'product_id')),
+}
+
+
+def select_cases(patterns: list[str] | None) -> list[str]:
+    """
+    Tên các case khớp một trong các mẫu glob (ví dụ 'revenue*'), tất cả nếu không có mẫu.
+    """
+    if not patterns:
+        return list(CASES)
+    names = [name for name in CASES if any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)]
+    if not names:
+        raise BenchmarkError(f'Không có case nào khớp {", ".join(patterns)}')
+    return names
+
+
+def dataset_path(orders: int, seed: int) -> Path:
+    return Path(settings.BENCHMARK_DIR) / 'data' / f'orders-{orders}-seed{seed}.sqlite3'
+
+
+@contextmanager
+def using_database(path):
+    """
+    Tạm trỏ kết nối mặc định sang file SQLite khác (như test runner làm với cơ sở dữ liệu test).
+    """
+    database = connection.settings_dict
+    original = database['NAME']
+    connection.close()
+    database['NAME'] = str(path)
+    try:
+        yield
+    finally:
+        connection.close()
+        database['NAME'] = original
+
+
+def build_dataset(orders: int, seed: int) -> Path:
+    """
+    File SQLite chứa bộ dữ liệu giả orders đơn hàng, sinh ở lần dùng đầu tiên. File được ghi dưới tên tạm
+    rồi đổi tên, nên lần sinh bị ngắt giữa chừng không để lại bộ dữ liệu dở dang.
+    """
+    path = dataset_path(orders, seed)
+    if path.exists():
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    staging = path.with_suffix('.tmp')
+    staging.unlink(missing_ok=True)
+    with using_database(staging):
+        call_command('migrate', verbosity=0)
+        call_command('generate_data', orders=orders, seed=seed, stdout=StringIO())
+    os.replace(staging, path)
+    return path
+
+
+def measure(run, repeat: int, warmup: int = 1) -> dict:
+    """
+    Chạy run() warmup lần để làm nóng, repeat lần để đo thời gian và số truy vấn, rồi một lần dưới tracemalloc.
+    """
+    query_count = 0
+
+    def count_queries(execute, sql, params, many, context):
+        nonlocal query_count
+        query_count += 1
+        return execute(sql, params, many, context)
+
+    for _ in range(warmup):
+        cache.clear()
+        run()
+
+    durations = []
+    queries = []
+    with connection.execute_wrapper(count_queries):
+        for _ in range(repeat):
+            cache.clear()
+            query_count = 0
+            started = time.perf_counter()
+            run()
+            durations.append(time.perf_counter() - started)
+            queries.append(query_count)
+
+    cache.clear()
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'wall_ms': {
+            'min': round(min(durations) * 1000, 3),
+            'median': round(statistics.median(durations) * 1000, 3),
+            'max': round(max(durations) * 1000, 3),
+        },
+        'queries': max(queries),
+        'peak_memory_kb': round(peak / 1024, 1),
+        'repeat': repeat,
+    }
+
+
+def _dataset_stats() -> dict:
+    return {'orders': Order.objects.count(), 'order_items': OrderItem.objects.count(),
+            'customers': Customer.objects.count(), 'products': Product.objects.count()}
+
+
+def _run_dataset(name: str, cases: list[str], repeat: int, progress) -> tuple[dict, list[dict]]:
+    # Bộ cột và chỉ mục gợi ý nạp từ bộ dữ liệu trước phải được bỏ
+    reset_columnar_engine()
+    reset_recommendation_index()
+    results = []
+    for case in cases:
+        result = {'dataset': name, 'case': case, **measure(CASES[case](), repeat)}
+        results.append(result)
+        if progress is not None:
+            progress(result)
+    return _dataset_stats(), results
+
+
+def run_suite(datasets: list[str], cases: list[str], repeat: int = 5, seed: int = 42, engine: str | None = None,
+              progress=None) -> dict:
+    """
+    Chạy các case trên từng bộ dữ liệu ('current' hoặc số đơn hàng) và trả về kết quả dạng dict ghi được ra JSON.
+    """
+    engine = engine or settings.REPORT_ENGINE
+    run = {
+        'format': FORMAT_VERSION,
+        'created_at': timezone.now().isoformat(),
+        'engine': engine,
+        'seed': seed,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'datasets': {},
+        'results': [],
+    }
+    # Cache báo cáo riêng trong bộ nhớ (cache.clear() không đụng cache thật), không dùng snapshot dạng cột
+    # của cơ sở dữ liệu thật, và cho phép host của test client
+    isolated = override_settings(
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmarks'}},
+        REPORT_ENGINE=engine, REPORT_COLUMNAR_SNAPSHOT_DIR='',
+        ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+    )
+    # Log từng yêu cầu (và cảnh báo N+1) của test client không cần thiết, số liệu đã có trong kết quả
+    request_logger = logging.getLogger('monitoring.requests')
+    request_logger.disabled = True
+    try:
+        with isolated:
+            for dataset in datasets:
+                if dataset == 'current':
+                    stats, results = _run_dataset(dataset, cases, repeat, progress)
+                else:
+                    with using_database(build_dataset(int(dataset), seed)):
+                        stats, results = _run_dataset(dataset, cases, repeat, progress)
+                run['datasets'][dataset] = stats
+                run['results'].extend(results)
+    finally:
+        request_logger.disabled = False
+        reset_columnar_engine()
+        reset_recommendation_index()
+    return run
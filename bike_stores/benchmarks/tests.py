@@ -0,0 +1,72 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from sales.models import Store
+from .compare import compare_runs
+from .suite import FORMAT_VERSION, select_cases
+
+
+def _run(**results) -> dict:
+    return {
+        'format': FORMAT_VERSION, 'engine': 'orm',
+        'results': [
+            {'dataset': '1000', 'case': case, 'wall_ms': {'min': wall, 'median': wall, 'max': wall},
+             'queries': queries, 'peak_memory_kb': memory, 'repeat': 1}
+            for case, (wall, queries, memory) in results.items()
+        ],
+    }
+
+
+class RunBenchmarksTest(TestCase):
+    def test_results_are_written_as_json(self):
+        Store.objects.create(store_id=1, store_name='Store A')
+        output = Path(self.enterContext(tempfile.TemporaryDirectory())) / 'run.json'
+
+        call_command('run_benchmarks', sizes='current', cases=['store-*', 'inventory'], repeat=2,
+                     output=str(output), stdout=StringIO())
+
+        run = json.loads(output.read_text())
+        self.assertEqual(run['datasets']['current']['orders'], 0)
+        results = {result['case']: result for result in run['results']}
+        self.assertEqual(list(results), ['inventory', 'store-list', 'store-detail'])
+        self.assertEqual(results['store-list']['queries'], 1)
+        self.assertEqual(results['store-list']['repeat'], 2)
+        self.assertGreater(results['store-list']['peak_memory_kb'], 0)
+
+    def test_case_selection(self):
+        self.assertEqual(select_cases(['revenue[[]q*']), ['revenue[quarter]'])
+        with self.assertRaises(CommandError):
+            call_command('run_benchmarks', sizes='current', cases=['nope'], stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('run_benchmarks', sizes='big', stdout=StringIO())
+
+
+class CompareBenchmarksTest(TestCase):
+    def test_regressions_beyond_tolerance(self):
+        baseline = _run(inventory=(100.0, 3, 500.0), pareto=(0.2, 2, 100.0), orders=(50.0, 1, 100.0))
+        current = _run(inventory=(120.0, 3, 520.0), pareto=(0.5, 2, 100.0), orders=(40.0, 2, 100.0))
+
+        regressions = {(row['case'], row['metric']) for row in compare_runs(baseline, current, tolerance=0.1)
+                       if row['regression']}
+        # pareto chậm hơn 150% nhưng chỉ 0.3 ms: bỏ qua
+        self.assertEqual(regressions, {('inventory', 'wall_ms'), ('orders', 'queries')})
+
+    def test_command_fails_on_regression(self):
+        directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        (directory / 'baseline.json').write_text(json.dumps(_run(inventory=(100.0, 3, 500.0))))
+        (directory / 'faster.json').write_text(json.dumps(_run(inventory=(90.0, 3, 500.0))))
+        (directory / 'slower.json').write_text(json.dumps(_run(inventory=(150.0, 3, 500.0))))
+
+        out = StringIO()
+        call_command('compare_benchmarks', str(directory / 'baseline.json'), str(directory / 'faster.json'),
+                     stdout=out)
+        self.assertIn('No regressions.', out.getvalue())
+        with self.assertRaisesMessage(CommandError, '1 regressions'):
+            call_command('compare_benchmarks', str(directory / 'baseline.json'), str(directory / 'slower.json'),
+                         stdout=StringIO())
@@ -0,0 +1,198 @@
+import asyncio
+import threading
+from collections import deque
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+
+REPORT_PREFIX = '/api/report/'
+EXEMPT_URL_NAMES = {'event-stream'}
+# Báo cáo chỉ đọc bộ đếm đã tính sẵn (dashboard gọi liên tục), chi phí như một lần đọc CRUD
+LIGHT_REPORT_URL_NAMES = {'order-funnel'}
+
+
+def classify_request(request) -> str | None:
+    """
+    Phân loại yêu cầu theo chi phí: 'report' (báo cáo tổng hợp), 'bulk_list' (GET toàn bộ một bảng),
+    'crud' (đọc/ghi từng bản ghi, gồm đặt hàng, cập nhật tồn kho và báo cáo đọc bộ đếm có sẵn).
+    Trả về None nếu không áp dụng.
+    """
+    path = request.path_info
+    if not path.startswith('/api/'):
+        return None
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return None
+    if match.url_name in EXEMPT_URL_NAMES:
+        return None
+    if path.startswith(REPORT_PREFIX) and match.url_name not in LIGHT_REPORT_URL_NAMES:
+        return 'report'
+    if request.method == 'GET' and match.url_name and match.url_name.endswith(('-list', '-list-create')):
+        return 'bulk_list'
+    return 'crud'
+
+
+class _Waiter:
+    """
+    Một yêu cầu đang xếp hàng; granted được bật khi release() chuyển thẳng một chỗ cho nó.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop | None = None):
+        self.granted = False
+        self.loop = loop
+        self.event = None if loop else threading.Event()
+        self.future = loop.create_future() if loop else None
+
+    def wake(self) -> None:
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(True)
+
+
+class ConcurrencyLimiter:
+    """
+    Giới hạn số yêu cầu chạy đồng thời của một loại, kèm hàng đợi có giới hạn (FIFO).
+
+    Khi một yêu cầu xong, chỗ của nó được chuyển thẳng cho yêu cầu chờ lâu nhất. Dùng được cho cả
+    luồng (WSGI) lẫn coroutine (ASGI) vì người chờ được đánh thức qua Event hoặc call_soon_threadsafe.
+
+    Coroutine chờ gần như không tốn gì, còn luồng chờ giữ luôn một luồng của WSGI server: hàng đợi của acquire()
+    là sync_queue (mặc định 0, tức từ chối ngay khi hết chỗ) và nên nhỏ hơn số luồng của mỗi worker.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue: int = 0, timeout: float = 0.0, retry_after: int = 1,
+                 sync_queue: int = 0):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue
+        self.sync_queue_size = min(sync_queue, queue)
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiters = deque()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _enter(self, waiter_factory, queue_size: int) -> tuple[bool, _Waiter | None]:
+        with self._lock:
+            if self._active < self.concurrency:
+                self._active += 1
+                return True, None
+            if len(self._waiters) >= queue_size:
+                return False, None
+            waiter = waiter_factory()
+            self._waiters.append(waiter)
+            return False, waiter
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """
+        Bỏ hàng đợi khi hết thời gian chờ. Trả về True nếu chỗ đã kịp được chuyển cho waiter.
+        """
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._waiters.remove(waiter)
+            return False
+
+    def acquire(self) -> bool:
+        admitted, waiter = self._enter(_Waiter, self.sync_queue_size)
+        if waiter is None:
+            return admitted
+        if waiter.event.wait(self.timeout):
+            return True
+        return self._abandon(waiter)
+
+    async def aacquire(self) -> bool:
+        loop = asyncio.get_running_loop()
+        admitted, waiter = self._enter(lambda: _Waiter(loop), self.queue_size)
+        if waiter is None:
+            return admitted
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.timeout)
+            return True
+        except asyncio.TimeoutError:
+            return self._abandon(waiter)
+        except asyncio.CancelledError:
+            # Client ngắt kết nối khi đang chờ: trả lại chỗ nếu đã được cấp
+            if self._abandon(waiter):
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                waiter.wake()
+            else:
+                self._active -= 1
+
+
+class AdmissionControlMiddleware:
+    """
+    Giới hạn đồng thời theo loại endpoint (xem ADMISSION_CONTROL trong settings).
+
+    Báo cáo và danh sách toàn bảng chỉ chiếm một số chỗ cố định cho mỗi worker; khi đã đầy và hàng đợi
+    cũng đầy (hoặc chờ quá lâu) thì trả về 429 kèm Retry-After. Dưới WSGI hàng đợi mặc định là 0 (xem
+    ConcurrencyLimiter) để yêu cầu bị từ chối không chiếm luồng của server trong lúc chờ. Loại 'crud' mặc định không giới hạn
+    để đặt hàng và cập nhật tồn kho không phải xếp hàng sau các yêu cầu phân tích.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.limiters = {
+            name: ConcurrencyLimiter(name, **config)
+            for name, config in settings.ADMISSION_CONTROL.items() if config
+        }
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        limiter = self.limiters.get(classify_request(request))
+        if limiter is None:
+            return self.get_response(request)
+        if not limiter.acquire():
+            return self._reject(limiter)
+        try:
+            return self.get_response(request)
+        finally:
+            limiter.release()
+
+    async def __acall__(self, request):
+        limiter = self.limiters.get(classify_request(request))
+        if limiter is None:
+            return await self.get_response(request)
+        if not await limiter.aacquire():
+            return self._reject(limiter)
+        try:
+            return await self.get_response(request)
+        finally:
+            limiter.release()
+
+    def _reject(self, limiter: ConcurrencyLimiter) -> JsonResponse:
+        response = JsonResponse(
+            {'error': f"Máy chủ đang quá tải với các yêu cầu loại '{limiter.name}', vui lòng thử lại sau."},
+            status=429
+        )
+        response['Retry-After'] = str(limiter.retry_after)
+        return response
@@ -39,9 +39,14 @@ INSTALLED_APPS = [
     'production',
     'sales',
     'report',
+    'events',
+    'monitoring',
+    'benchmarks',
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.RequestTimingMiddleware',
+    'monitoring.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -49,6 +54,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'bike_stores.admission.AdmissionControlMiddleware',
 ]
 
 ROOT_URLCONF = 'bike_stores.urls'
@@ -81,6 +87,17 @@ DATABASES = {
     }
 }
 
+# Cache
+# Cross-worker report coalescing needs a cache shared by all workers,
+# e.g. CACHE_BACKEND=django.core.cache.backends.db.DatabaseCache with CACHE_LOCATION=report_cache
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -122,3 +139,126 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Report settings
+
+# Number of worker processes used to fit demand forecasts (1 = run in the request process)
+REPORT_FORECAST_WORKERS = int(os.getenv('REPORT_FORECAST_WORKERS', '1'))
+
+# Seconds a computed report stays in the cache (writes to orders and stocks invalidate it earlier)
+REPORT_CACHE_TIMEOUT = int(os.getenv('REPORT_CACHE_TIMEOUT', '300'))
+
+# Seconds a request waits for an identical in-flight report computation before computing it itself
+REPORT_SINGLEFLIGHT_WAIT = float(os.getenv('REPORT_SINGLEFLIGHT_WAIT', '30'))
+
+# Seconds after which a cross-worker computation lock is considered abandoned
+REPORT_SINGLEFLIGHT_LOCK_TIMEOUT = int(os.getenv('REPORT_SINGLEFLIGHT_LOCK_TIMEOUT', '60'))
+
+# Engine for revenue and Pareto reports: 'orm' (SQL aggregation) or 'columnar' (in-memory NumPy columns)
+REPORT_ENGINE = os.getenv('REPORT_ENGINE', 'orm')
+
+# Seconds between checks that the in-memory columns still match the order_items table
+REPORT_COLUMNAR_VERIFY_SECONDS = float(os.getenv('REPORT_COLUMNAR_VERIFY_SECONDS', '60'))
+
+# Seconds between checks that the in-memory recommendation index matches the last build_recommendations run
+REPORT_RECOMMENDATIONS_CHECK_SECONDS = float(os.getenv('REPORT_RECOMMENDATIONS_CHECK_SECONDS', '30'))
+
+# Directory of memory-mapped order line snapshots written by `snapshot_order_lines` (empty disables them)
+REPORT_COLUMNAR_SNAPSHOT_DIR = os.getenv('REPORT_COLUMNAR_SNAPSHOT_DIR', str(BASE_DIR / 'var' / 'order_lines'))
+
+
+# Events settings
+
+# Maximum queued events per SSE connection (a slow client drops its oldest events)
+EVENTS_QUEUE_SIZE = int(os.getenv('EVENTS_QUEUE_SIZE', '100'))
+
+# Recent events kept in memory so reconnecting clients can resume from Last-Event-ID
+EVENTS_HISTORY_SIZE = int(os.getenv('EVENTS_HISTORY_SIZE', '500'))
+
+# Seconds between keep-alive comments on an idle SSE connection
+EVENTS_HEARTBEAT_SECONDS = int(os.getenv('EVENTS_HEARTBEAT_SECONDS', '15'))
+
+# Reconnect delay suggested to SSE clients
+EVENTS_RETRY_MILLISECONDS = int(os.getenv('EVENTS_RETRY_MILLISECONDS', '3000'))
+
+
+# Admission control
+
+# Per worker process and endpoint class: at most `concurrency` requests run at once, up to `queue` more
+# wait for at most `timeout` seconds, the rest get 429 with Retry-After. A class set to None is not limited.
+# Under WSGI every waiting request holds a server thread, so only `sync_queue` requests may wait there
+# (default 0: reject as soon as the class is saturated); keep it below the worker's thread count.
+ADMISSION_CONTROL = {
+    'report': {
+        'concurrency': int(os.getenv('ADMISSION_REPORT_CONCURRENCY', '2')),
+        'queue': int(os.getenv('ADMISSION_REPORT_QUEUE', '8')),
+        'timeout': float(os.getenv('ADMISSION_REPORT_TIMEOUT', '5')),
+        'sync_queue': int(os.getenv('ADMISSION_REPORT_SYNC_QUEUE', '0')),
+        'retry_after': 5,
+    },
+    'bulk_list': {
+        'concurrency': int(os.getenv('ADMISSION_BULK_LIST_CONCURRENCY', '4')),
+        'queue': int(os.getenv('ADMISSION_BULK_LIST_QUEUE', '8')),
+        'timeout': float(os.getenv('ADMISSION_BULK_LIST_TIMEOUT', '2')),
+        'sync_queue': int(os.getenv('ADMISSION_BULK_LIST_SYNC_QUEUE', '0')),
+        'retry_after': 2,
+    },
+    'crud': None,
+}
+
+
+# Monitoring
+
+# A SQL shape repeated this many times within one request is flagged as an N+1 pattern (0 disables)
+MONITORING_N_PLUS_ONE_THRESHOLD = int(os.getenv('MONITORING_N_PLUS_ONE_THRESHOLD', '10'))
+
+# Per-request JSON log lines are INFO, flagged N+1 requests are WARNING
+MONITORING_LOG_LEVEL = os.getenv('MONITORING_LOG_LEVEL', 'WARNING')
+
+# SQLite file where every worker adds its metrics for /metrics (empty keeps them per process)
+MONITORING_METRICS_DB = os.getenv('MONITORING_METRICS_DB', str(BASE_DIR / 'var' / 'metrics.sqlite3'))
+
+# `manage.py test` swaps this for an in-memory store and mutes the monitoring log (bike_stores.test_runner)
+TEST_RUNNER = 'bike_stores.test_runner.TestRunner'
+
+# Seconds between flushes of a worker's in-memory metrics to the shared file
+MONITORING_METRICS_FLUSH_SECONDS = float(os.getenv('MONITORING_METRICS_FLUSH_SECONDS', '5'))
+
+# Gauges of a worker that has not flushed for this many seconds are left out (the worker is gone)
+MONITORING_METRICS_GAUGE_TTL = float(os.getenv('MONITORING_METRICS_GAUGE_TTL', '300'))
+
+# Fraction of requests run under the profiler (0 disables sampling)
+MONITORING_PROFILE_SAMPLE_RATE = float(os.getenv('MONITORING_PROFILE_SAMPLE_RATE', '0'))
+
+# A request with header `X-Profile-Token: <token>` is always profiled (empty disables the header)
+MONITORING_PROFILE_TOKEN = os.getenv('MONITORING_PROFILE_TOKEN', '')
+
+# Where profiles are written; only the newest MONITORING_PROFILE_KEEP are kept
+MONITORING_PROFILE_DIR = os.getenv('MONITORING_PROFILE_DIR', str(BASE_DIR / 'var' / 'profiles'))
+MONITORING_PROFILE_KEEP = int(os.getenv('MONITORING_PROFILE_KEEP', '200'))
+
+# Seconds between stack samples for the collapsed-stack (flamegraph) files
+MONITORING_PROFILE_SAMPLE_INTERVAL = float(os.getenv('MONITORING_PROFILE_SAMPLE_INTERVAL', '0.005'))
+
+# SQL statements slower than this many milliseconds are logged with their EXPLAIN plan (0 disables)
+MONITORING_SLOW_QUERY_MS = float(os.getenv('MONITORING_SLOW_QUERY_MS', '200'))
+
+# JSON lines log of slow statements, rotated at MONITORING_SLOW_QUERY_LOG_BYTES
+MONITORING_SLOW_QUERY_LOG = os.getenv('MONITORING_SLOW_QUERY_LOG', str(BASE_DIR / 'var' / 'slow_queries.jsonl'))
+MONITORING_SLOW_QUERY_LOG_BYTES = int(os.getenv('MONITORING_SLOW_QUERY_LOG_BYTES', str(10 * 1024 * 1024)))
+MONITORING_SLOW_QUERY_LOG_BACKUPS = int(os.getenv('MONITORING_SLOW_QUERY_LOG_BACKUPS', '5'))
+
+# Synthetic benchmark datasets (data/) and run_benchmarks result files (results/)
+BENCHMARK_DIR = os.getenv('BENCHMARK_DIR', str(BASE_DIR / 'var' / 'benchmarks'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'monitoring': {'handlers': ['console'], 'level': MONITORING_LOG_LEVEL, 'propagate': False},
+    },
+}
@@ -0,0 +1,25 @@
+import logging
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Chạy test với kho metrics SQLite trong bộ nhớ, để không ghi vào var/metrics.sqlite3 của môi trường thật,
+    và không in log JSON của logger `monitoring` (cảnh báo N+1) ra stderr.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._test_settings = override_settings(MONITORING_METRICS_DB='')
+        self._test_settings.enable()
+        # assertLogs vẫn bắt được log vì nó gắn handler riêng vào logger được kiểm tra
+        monitoring_logger = logging.getLogger('monitoring')
+        self._monitoring_handlers = monitoring_logger.handlers
+        monitoring_logger.handlers = [logging.NullHandler()]
+
+    def teardown_test_environment(self, **kwargs):
+        logging.getLogger('monitoring').handlers = self._monitoring_handlers
+        self._test_settings.disable()
+        super().teardown_test_environment(**kwargs)
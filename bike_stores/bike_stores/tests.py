@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+
+from django.http import JsonResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from .admission import AdmissionControlMiddleware, ConcurrencyLimiter, classify_request
+
+
+class AdmissionControlTest(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_classify_request_by_cost(self):
+        self.assertEqual(classify_request(self.factory.get('/api/report/revenue-report/')), 'report')
+        self.assertEqual(classify_request(self.factory.get('/api/report/order-funnel/')), 'crud')
+        self.assertEqual(classify_request(self.factory.get('/api/sales/orders/')), 'bulk_list')
+        self.assertEqual(classify_request(self.factory.post('/api/sales/orders/')), 'crud')
+        self.assertEqual(classify_request(self.factory.patch('/api/production/stocks/1/1/')), 'crud')
+        self.assertIsNone(classify_request(self.factory.get('/api/events/stream/')))
+        self.assertIsNone(classify_request(self.factory.get('/')))
+
+    def test_bounded_queue_hands_slot_to_waiter(self):
+        limiter = ConcurrencyLimiter('report', concurrency=1, queue=1, timeout=5, sync_queue=1)
+        self.assertTrue(limiter.acquire())
+
+        admitted = []
+        waiter = threading.Thread(target=lambda: admitted.append(limiter.acquire()))
+        waiter.start()
+        while not limiter.waiting:
+            pass
+        # Hàng đợi đã đầy: yêu cầu tiếp theo bị từ chối ngay
+        self.assertFalse(limiter.acquire())
+
+        limiter.release()
+        waiter.join(5)
+        self.assertEqual((admitted, limiter.active, limiter.waiting), ([True], 1, 0))
+
+    def test_waiter_times_out(self):
+        limiter = ConcurrencyLimiter('report', concurrency=1, queue=1, timeout=0.05, sync_queue=1)
+        limiter.acquire()
+        self.assertFalse(limiter.acquire())
+        self.assertEqual(limiter.waiting, 0)
+
+    def test_sync_requests_are_rejected_instead_of_holding_a_thread_by_default(self):
+        limiter = ConcurrencyLimiter('report', concurrency=1, queue=8, timeout=5)
+        limiter.acquire()
+        started = time.monotonic()
+        self.assertFalse(limiter.acquire())
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(limiter.waiting, 0)
+
+        # Coroutine vẫn được xếp hàng
+        async def wait_for_slot():
+            threading.Timer(0.05, limiter.release).start()
+            return await limiter.aacquire()
+
+        self.assertTrue(asyncio.run(wait_for_slot()))
+
+    def test_async_waiter_is_woken_from_other_thread(self):
+        limiter = ConcurrencyLimiter('report', concurrency=1, queue=1, timeout=5)
+        limiter.acquire()
+
+        async def wait_for_slot():
+            threading.Timer(0.05, limiter.release).start()
+            return await limiter.aacquire()
+
+        self.assertTrue(asyncio.run(wait_for_slot()))
+        self.assertEqual(limiter.active, 1)
+
+    @override_settings(ADMISSION_CONTROL={
+        'report': {'concurrency': 1, 'queue': 0, 'timeout': 0, 'retry_after': 7},
+        'bulk_list': None,
+        'crud': None,
+    })
+    def test_saturated_class_gets_429_while_crud_passes(self):
+        nested = {}
+
+        def get_response(request):
+            if request.path.startswith('/api/report/') and not nested:
+                # Trong lúc báo cáo đang chạy: báo cáo thứ hai bị từ chối, cập nhật tồn kho vẫn chạy
+                nested['report'] = middleware(self.factory.get('/api/report/sales-cube/'))
+                nested['stock'] = middleware(self.factory.patch('/api/production/stocks/1/1/'))
+            return JsonResponse({'ok': True})
+
+        middleware = AdmissionControlMiddleware(get_response)
+        response = middleware(self.factory.get('/api/report/revenue-report/'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(nested['report'].status_code, 429)
+        self.assertEqual(nested['report']['Retry-After'], '7')
+        self.assertEqual(nested['stock'].status_code, 200)
+        self.assertEqual(middleware.limiters['report'].active, 0)
@@ -25,4 +25,6 @@ urlpatterns = [
     path('api/production/', include('production.urls'), name='production'),
     path('api/sales/', include('sales.urls'), name='sales'),
     path('api/report/', include('report.urls'), name='report'),
+    path('api/events/', include('events.urls'), name='events'),
+    path('', include('monitoring.urls'), name='monitoring'),  # /metrics
 ]
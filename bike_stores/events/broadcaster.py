@@ -0,0 +1,109 @@
+import asyncio
+import itertools
+import threading
+from collections import deque
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import transaction
+
+
+class Subscription:
+    """
+    Một kết nối đang lắng nghe sự kiện: hàng đợi asyncio gắn với event loop của kết nối và bộ lọc cửa hàng.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, store_ids: set[int] | None, queue_size: int):
+        self.loop = loop
+        self.store_ids = store_ids
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def matches(self, event: dict) -> bool:
+        return not self.store_ids or event['store_id'] in self.store_ids
+
+    def put(self, event: dict) -> None:
+        """
+        Đưa sự kiện vào hàng đợi (chạy trên event loop). Kết nối chậm bị bỏ sự kiện cũ nhất thay vì chặn người ghi.
+        """
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+
+class EventBroadcaster:
+    """
+    Bộ phát sự kiện trong tiến trình: các API ghi gọi publish(), các kết nối SSE đăng ký nhận qua subscribe().
+
+    publish() có thể gọi từ bất kỳ luồng nào; sự kiện được chuyển sang event loop của từng kết nối
+    bằng call_soon_threadsafe nên kết nối đang chờ không tốn CPU hay truy vấn nào.
+    Chỉ các kết nối trong cùng tiến trình với thao tác ghi mới nhận được sự kiện.
+    """
+
+    def __init__(self, queue_size: int = 100, history_size: int = 500):
+        self._lock = threading.Lock()
+        self._subscriptions: set[Subscription] = set()
+        self._ids = itertools.count(1)
+        self._history = deque(maxlen=history_size)
+        self.queue_size = queue_size
+
+    def subscribe(self, store_ids=None, last_event_id: int | None = None) -> Subscription:
+        """
+        Đăng ký nhận sự kiện (gọi từ bên trong event loop). Nếu có last_event_id, các sự kiện
+        còn trong lịch sử sau id đó được đưa sẵn vào hàng đợi để client kết nối lại không bị sót.
+        """
+        subscription = Subscription(asyncio.get_running_loop(), set(store_ids or ()), self.queue_size)
+        with self._lock:
+            if last_event_id is not None:
+                for event in self._history:
+                    if event['id'] > last_event_id and subscription.matches(event):
+                        subscription.put(event)
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions)
+
+    def publish(self, event_type: str, action: str, store_id: int, data: dict) -> dict:
+        """
+        Gửi một sự kiện tới mọi kết nối có bộ lọc khớp với store_id. Trả về sự kiện đã gửi.
+        """
+        with self._lock:
+            event = {
+                'id': next(self._ids),
+                'type': event_type,
+                'action': action,
+                'store_id': store_id,
+                'data': data,
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+            }
+            self._history.append(event)
+            subscriptions = [subscription for subscription in self._subscriptions if subscription.matches(event)]
+
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # Event loop của kết nối đã đóng
+                self.unsubscribe(subscription)
+        return event
+
+
+broadcaster = EventBroadcaster(
+    queue_size=settings.EVENTS_QUEUE_SIZE,
+    history_size=settings.EVENTS_HISTORY_SIZE,
+)
+
+
+def publish_on_commit(event_type: str, action: str, store_id: int, data: dict) -> None:
+    """
+    Phát sự kiện sau khi transaction hiện tại commit (phát ngay nếu không ở trong transaction).
+    Thao tác bị rollback thì không phát gì.
+    """
+    transaction.on_commit(lambda: broadcaster.publish(event_type, action, store_id, data))
@@ -0,0 +1,109 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from events.outbox import dispatch_batch, get_outbox_lag, prune_dispatched_events
+from events.sinks import CallbackSink, FileSink, HttpSink
+
+
+class Command(BaseCommand):
+    help = 'Delivers change events from the transactional outbox to a sink (at-least-once, checkpointed per sink).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sink', choices=['file', 'http', 'callback'], required=True, help='Sink type.')
+        parser.add_argument('--name', help='Checkpoint name of the sink (default: the sink type).')
+        parser.add_argument('--path', help='Output JSON Lines file for the file sink.')
+        parser.add_argument('--url', help='Endpoint receiving POSTed batches for the http sink.')
+        parser.add_argument(
+            '--callback',
+            action='append',
+            default=[],
+            help='Dotted path of a function called with each batch for the callback sink (can be repeated).',
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help='Events per batch (default: 500).')
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=0,
+            help='Stop after this many batches (default: 0 = until the outbox is drained).',
+        )
+        parser.add_argument(
+            '--follow',
+            action='store_true',
+            help='Keep polling for new events instead of exiting once the outbox is drained.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds between polls in --follow mode (default: 1.0).',
+        )
+        parser.add_argument(
+            '--prune',
+            action='store_true',
+            help='Delete events already delivered to every sink after dispatching.',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        sink = self._build_sink(options)
+
+        while True:
+            started = time.perf_counter()
+            try:
+                event_count, batch_count = self._drain(sink, options['batch_size'], options['max_batches'])
+            except CommandError as e:
+                if not options['follow']:
+                    raise
+                # Chế độ theo dõi: ghi lỗi và thử lại ở lần poll sau
+                self.stderr.write(str(e))
+                event_count = batch_count = 0
+            elapsed = time.perf_counter() - started
+
+            if event_count or not options['follow']:
+                lag = get_outbox_lag(sink.name)
+                self.stdout.write(self.style.SUCCESS(
+                    f'Dispatched {event_count} events in {batch_count} batches to {sink.name} in {elapsed:.2f}s '
+                    f'(pending: {lag["pending_events"]}, oldest pending: {lag["oldest_pending_age_seconds"]}s, '
+                    f'checkpoint: {lag["last_event_id"]})'
+                ))
+            if options['prune']:
+                pruned = prune_dispatched_events()
+                if pruned:
+                    self.stdout.write(f'Pruned {pruned} delivered events')
+            if not options['follow']:
+                break
+            time.sleep(options['interval'])
+
+    def _drain(self, sink, batch_size: int, max_batches: int) -> tuple[int, int]:
+        event_count = batch_count = 0
+        while not max_batches or batch_count < max_batches:
+            try:
+                dispatched = dispatch_batch(sink, batch_size)
+            except Exception as e:
+                raise CommandError(f'Sink {sink.name} failed, checkpoint kept for retry: {e}')
+            if not dispatched:
+                break
+            event_count += dispatched
+            batch_count += 1
+        return event_count, batch_count
+
+    def _build_sink(self, options):
+        name = options['name'] or options['sink']
+        if options['sink'] == 'file':
+            if not options['path']:
+                raise CommandError('--path is required for the file sink.')
+            return FileSink(options['path'], name=name)
+        if options['sink'] == 'http':
+            if not options['url']:
+                raise CommandError('--url is required for the http sink.')
+            return HttpSink(options['url'], name=name)
+        if not options['callback']:
+            raise CommandError('--callback is required for the callback sink.')
+        try:
+            callbacks = [import_string(path) for path in options['callback']]
+        except ImportError as e:
+            raise CommandError(str(e))
+        return CallbackSink(callbacks, name=name)
@@ -0,0 +1,44 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+# Create your models here.
+
+
+class OutboxEvent(models.Model):
+    """
+    Sự kiện thay đổi (sản phẩm, tồn kho, đơn hàng, dòng hàng) được ghi cùng transaction với thao tác ghi.
+    Lệnh dispatch_outbox đọc bảng này theo thứ tự id và gửi tới các sink.
+    """
+    event_type = models.CharField(max_length=32)
+    action = models.CharField(max_length=16)
+    aggregate_id = models.CharField(max_length=64)
+    store_id = models.IntegerField(null=True, blank=True)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'event_outbox'
+
+    def as_message(self) -> dict:
+        return {
+            'id': self.id,
+            'type': self.event_type,
+            'action': self.action,
+            'aggregate_id': self.aggregate_id,
+            'store_id': self.store_id,
+            'payload': self.payload,
+            'created_at': self.created_at.isoformat(),
+        }
+
+
+class OutboxCheckpoint(models.Model):
+    """
+    Vị trí đã gửi xong của từng sink: mọi sự kiện có id <= last_event_id đã được sink xác nhận.
+    """
+    sink = models.CharField(max_length=100, unique=True)
+    last_event_id = models.BigIntegerField(default=0)
+    dispatched_count = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'event_outbox_checkpoints'
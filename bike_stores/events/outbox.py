@@ -0,0 +1,82 @@
+from django.db import models, transaction
+from django.utils import timezone
+
+from .broadcaster import publish_on_commit
+from .models import OutboxCheckpoint, OutboxEvent
+from .sinks import OutboxSink
+
+
+def record_change(event_type: str, action: str, aggregate_id, payload: dict,
+                  store_id: int | None = None, broadcast: bool = True) -> OutboxEvent:
+    """
+    Ghi một sự kiện thay đổi vào outbox. Gọi bên trong transaction.atomic() cùng với thao tác ghi
+    để sự kiện và dữ liệu cùng được commit hoặc cùng bị rollback.
+    Nếu broadcast=True, sự kiện cũng được phát tới các kết nối SSE sau khi commit.
+    """
+    event = OutboxEvent.objects.create(
+        event_type=event_type,
+        action=action,
+        aggregate_id=str(aggregate_id),
+        store_id=store_id,
+        payload=payload,
+    )
+    if broadcast:
+        publish_on_commit(event_type, action, store_id, payload)
+    return event
+
+
+def dispatch_batch(sink: OutboxSink, batch_size: int = 500) -> int:
+    """
+    Gửi lô sự kiện tiếp theo sau checkpoint của sink rồi mới dời checkpoint (giao ít nhất một lần):
+    nếu tiến trình dừng giữa hai bước, lô đó sẽ được gửi lại ở lần chạy sau.
+    Trả về số sự kiện đã gửi (0 khi đã hết).
+
+    SQLite ghi tuần tự nên id sự kiện tăng theo đúng thứ tự commit.
+    """
+    checkpoint, _ = OutboxCheckpoint.objects.get_or_create(sink=sink.name)
+    events = list(
+        OutboxEvent.objects
+        .filter(id__gt=checkpoint.last_event_id)
+        .order_by('id')[:batch_size]
+    )
+    if not events:
+        return 0
+
+    sink.send([event.as_message() for event in events])
+
+    OutboxCheckpoint.objects.filter(sink=sink.name).update(
+        last_event_id=events[-1].id,
+        dispatched_count=models.F('dispatched_count') + len(events),
+        updated_at=timezone.now(),
+    )
+    return len(events)
+
+
+def get_outbox_lag(sink_name: str) -> dict:
+    """
+    Độ trễ của một sink: số sự kiện chưa gửi và tuổi (giây) của sự kiện chưa gửi cũ nhất.
+    """
+    checkpoint = OutboxCheckpoint.objects.filter(sink=sink_name).first()
+    last_event_id = checkpoint.last_event_id if checkpoint else 0
+    pending = OutboxEvent.objects.filter(id__gt=last_event_id)
+    oldest = pending.order_by('id').values_list('created_at', flat=True).first()
+
+    return {
+        'sink': sink_name,
+        'last_event_id': last_event_id,
+        'dispatched_count': checkpoint.dispatched_count if checkpoint else 0,
+        'pending_events': pending.count(),
+        'oldest_pending_age_seconds': round((timezone.now() - oldest).total_seconds(), 3) if oldest else 0.0,
+    }
+
+
+def prune_dispatched_events() -> int:
+    """
+    Xóa các sự kiện mà mọi sink đã nhận (id <= checkpoint nhỏ nhất). Trả về số sự kiện đã xóa.
+    """
+    with transaction.atomic():
+        min_checkpoint = OutboxCheckpoint.objects.aggregate(value=models.Min('last_event_id'))['value']
+        if not min_checkpoint:
+            return 0
+        deleted, _ = OutboxEvent.objects.filter(id__lte=min_checkpoint).delete()
+    return deleted
@@ -0,0 +1,66 @@
+import json
+import urllib.request
+from pathlib import Path
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+class OutboxSink:
+    """
+    Đích nhận sự kiện outbox. send() phải ném lỗi nếu lô chưa được nhận để lô đó được gửi lại.
+    """
+    name = 'sink'
+
+    def send(self, messages: list[dict]) -> None:
+        raise NotImplementedError
+
+
+class FileSink(OutboxSink):
+    """
+    Ghi nối mỗi sự kiện thành một dòng JSON vào file (JSON Lines).
+    """
+
+    def __init__(self, path, name: str = 'file'):
+        self.path = Path(path)
+        self.name = name
+
+    def send(self, messages: list[dict]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open('a', encoding='utf-8') as stream:
+            for message in messages:
+                stream.write(json.dumps(message, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n')
+            stream.flush()
+
+
+class HttpSink(OutboxSink):
+    """
+    POST mỗi lô dưới dạng {"events": [...]} tới một endpoint HTTP. Mã trạng thái ngoài 2xx được coi là lỗi.
+    """
+
+    def __init__(self, url: str, name: str = 'http', timeout: float = 10.0):
+        self.url = url
+        self.name = name
+        self.timeout = timeout
+
+    def send(self, messages: list[dict]) -> None:
+        body = json.dumps({'events': messages}, cls=DjangoJSONEncoder).encode('utf-8')
+        request = urllib.request.Request(
+            self.url, data=body, method='POST', headers={'Content-Type': 'application/json'}
+        )
+        # urlopen ném HTTPError với mã 4xx/5xx
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class CallbackSink(OutboxSink):
+    """
+    Gọi lần lượt các hàm trong tiến trình với cả lô sự kiện.
+    """
+
+    def __init__(self, callbacks, name: str = 'callback'):
+        self.callbacks = list(callbacks)
+        self.name = name
+
+    def send(self, messages: list[dict]) -> None:
+        for callback in self.callbacks:
+            callback(messages)
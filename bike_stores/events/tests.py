@@ -0,0 +1,192 @@
+import asyncio
+import json
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+
+from production.models import Brand, Category, Product, Stock
+from sales.models import Store
+from .broadcaster import EventBroadcaster, broadcaster
+from .models import OutboxCheckpoint, OutboxEvent
+from .outbox import dispatch_batch, get_outbox_lag, prune_dispatched_events
+from .sinks import CallbackSink, HttpSink
+
+
+class EventBroadcasterTest(TestCase):
+    async def test_publish_from_other_thread_respects_store_filter(self):
+        events = EventBroadcaster(queue_size=10)
+        subscription = events.subscribe(store_ids=[1])
+
+        await asyncio.to_thread(events.publish, 'order', 'created', 2, {'order_id': 1})
+        await asyncio.to_thread(events.publish, 'order', 'created', 1, {'order_id': 2})
+
+        event = await asyncio.wait_for(subscription.queue.get(), timeout=1)
+        self.assertEqual((event['store_id'], event['data']), (1, {'order_id': 2}))
+        self.assertTrue(subscription.queue.empty())
+
+    async def test_slow_subscriber_drops_oldest_and_resumes_from_history(self):
+        events = EventBroadcaster(queue_size=2)
+        subscription = events.subscribe()
+        for order_id in range(1, 4):
+            events.publish('order', 'created', 1, {'order_id': order_id})
+        await asyncio.sleep(0)
+
+        self.assertEqual(subscription.dropped, 1)
+        self.assertEqual([subscription.queue.get_nowait()['id'] for _ in range(2)], [2, 3])
+
+        events.unsubscribe(subscription)
+        self.assertEqual(events.subscriber_count, 0)
+        resumed = events.subscribe(last_event_id=2)
+        self.assertEqual(resumed.queue.get_nowait()['id'], 3)
+
+
+class EventStreamTest(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(store_id=1, store_name='Store A')
+        brand = Brand.objects.create(brand_id=1, brand_name='Brand')
+        category = Category.objects.create(category_id=1, category_name='Category')
+        self.product = Product.objects.create(
+            product_id=1, product_name='Bike', brand_id=brand, category_id=category, model_year=2024, list_price=100
+        )
+        Stock.objects.create(store_id=self.store, product_id=self.product, quantity=5)
+
+    def test_stock_patch_publishes_after_commit(self):
+        with patch.object(broadcaster, 'publish') as mock_publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.patch(
+                    reverse('stock-detail', args=[1, 1]), data=json.dumps({'quantity': 3}),
+                    content_type='application/json'
+                )
+        self.assertEqual(response.status_code, 200)
+        mock_publish.assert_called_once_with('stock', 'updated', 1, {'store_id': 1, 'product_id': 1, 'quantity': 3})
+
+    async def test_stream_delivers_filtered_events(self):
+        response = await self.async_client.get(reverse('event-stream'), {'store_id': 1})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+
+        broadcaster.publish('order', 'created', 2, {'order_id': 1})
+        event = broadcaster.publish('order', 'created', 1, {'order_id': 2})
+        chunk = (await asyncio.wait_for(anext(stream), timeout=1)).decode()
+        self.assertTrue(chunk.startswith(f"id: {event['id']}\nevent: order\n"))
+        self.assertEqual(json.loads(chunk.split('data: ', 1)[1])['data'], {'order_id': 2})
+
+        # Client ngắt kết nối: ASGI handler hủy task đang chờ sự kiện
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+        self.assertEqual(broadcaster.subscriber_count, 0)
+
+    async def test_stream_rejects_invalid_store_filter(self):
+        response = await self.async_client.get(reverse('event-stream'), {'store_id': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+
+class OutboxTest(TestCase):
+    def setUp(self):
+        self.store = Store.objects.create(store_id=1, store_name='Store A')
+        brand = Brand.objects.create(brand_id=1, brand_name='Brand')
+        category = Category.objects.create(category_id=1, category_name='Category')
+        self.product = Product.objects.create(
+            product_id=1, product_name='Bike', brand_id=brand, category_id=category, model_year=2024, list_price=100
+        )
+
+    def _post_stock(self, quantity=5):
+        return self.client.post(
+            reverse('stock-list-create'), data=json.dumps({'store_id': 1, 'product_id': 1, 'quantity': quantity}),
+            content_type='application/json'
+        )
+
+    def test_writes_record_events_in_same_transaction(self):
+        self.assertEqual(self._post_stock().status_code, 201)
+        self.client.patch(
+            reverse('product-detail', args=[1]), data=json.dumps({'list_price': '120.00'}),
+            content_type='application/json'
+        )
+
+        events = list(OutboxEvent.objects.order_by('id').values_list('event_type', 'action', 'aggregate_id', 'store_id'))
+        self.assertEqual(events, [('stock', 'created', '1:1', 1), ('product', 'updated', '1', None)])
+
+        # Thao tác ghi bị rollback thì không để lại sự kiện
+        with patch('production.views.invalidate_report_cache', side_effect=RuntimeError('boom')):
+            response = self.client.delete(reverse('stock-detail', args=[1, 1]))
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(OutboxEvent.objects.count(), 2)
+        self.assertTrue(Stock.objects.filter(store_id=1, product_id=1).exists())
+
+    def test_dispatch_command_checkpoints_and_reports_lag(self):
+        self._post_stock()
+        self.client.patch(
+            reverse('stock-detail', args=[1, 1]), data=json.dumps({'quantity': 2}), content_type='application/json'
+        )
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / 'events.jsonl'
+            out = StringIO()
+            call_command('dispatch_outbox', '--sink', 'file', '--path', str(path), '--batch-size', '1', stdout=out)
+            self.assertIn('Dispatched 2 events in 2 batches to file', out.getvalue())
+            self.assertIn('pending: 0', out.getvalue())
+
+            call_command('dispatch_outbox', '--sink', 'file', '--path', str(path), stdout=StringIO())
+            lines = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+
+        self.assertEqual([(line['type'], line['action'], line['payload']['quantity']) for line in lines],
+                         [('stock', 'created', 5), ('stock', 'updated', 2)])
+        self.assertEqual(OutboxCheckpoint.objects.get(sink='file').dispatched_count, 2)
+
+    def test_failed_sink_keeps_checkpoint_for_redelivery(self):
+        self._post_stock()
+        received = []
+
+        def flaky(messages):
+            if not received:
+                received.append(None)
+                raise ConnectionError('sink down')
+            received.extend(messages)
+
+        sink = CallbackSink([flaky])
+        with self.assertRaises(ConnectionError):
+            dispatch_batch(sink)
+        self.assertEqual(get_outbox_lag('callback')['pending_events'], 1)
+
+        self.assertEqual(dispatch_batch(sink), 1)
+        self.assertEqual(received[1]['aggregate_id'], '1:1')
+        self.assertEqual(get_outbox_lag('callback')['pending_events'], 0)
+        self.assertEqual(prune_dispatched_events(), 1)
+
+    def test_http_sink_posts_batches(self):
+        received = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                received.append(json.loads(self.rfile.read(int(self.headers['Content-Length']))))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            self._post_stock()
+            self.assertEqual(dispatch_batch(HttpSink(f'http://127.0.0.1:{server.server_port}/events')), 1)
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(received[0]['events'][0]['payload'], {'store_id': 1, 'product_id': 1, 'quantity': 5})
+
+    def test_command_requires_sink_options(self):
+        with self.assertRaises(CommandError):
+            call_command('dispatch_outbox', '--sink', 'http')
@@ -0,0 +1,55 @@
+import asyncio
+import json
+
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+
+from .broadcaster import broadcaster
+
+
+def format_sse(event: dict) -> str:
+    """
+    Định dạng một sự kiện theo chuẩn text/event-stream.
+    """
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+# Server-Sent Events feed
+class EventStreamView(View):
+    """
+    Luồng SSE các thay đổi đơn hàng, dòng hàng và tồn kho ngay khi được commit.
+    Lọc theo cửa hàng bằng ?store_id=1&store_id=2. Cần chạy qua ASGI (bike_stores.asgi).
+    """
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            store_ids = {int(value) for value in request.GET.getlist('store_id')}
+            last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+            last_event_id = int(last_event_id) if last_event_id else None
+        except (ValueError, TypeError):
+            return JsonResponse({'error': "Định dạng tham số không hợp lệ (store_id, last_event_id)."}, status=400)
+
+        response = StreamingHttpResponse(
+            self._stream(store_ids, last_event_id),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def _stream(self, store_ids: set[int], last_event_id: int | None):
+        subscription = broadcaster.subscribe(store_ids, last_event_id)
+        heartbeat = settings.EVENTS_HEARTBEAT_SECONDS
+        try:
+            yield f"retry: {settings.EVENTS_RETRY_MILLISECONDS}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    # Giữ kết nối qua proxy; không truy vấn gì trong lúc chờ
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            broadcaster.unsubscribe(subscription)
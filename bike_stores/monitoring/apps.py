@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class MonitoringConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'monitoring'
+
+    def ready(self):
+        from .slow_queries import install_slow_query_logging
+        from .timing import install_query_timing
+
+        connection_created.connect(install_query_timing, dispatch_uid='monitoring.timing')
+        connection_created.connect(install_slow_query_logging, dispatch_uid='monitoring.slow_queries')
@@ -0,0 +1,13 @@
+from django import http
+
+from .timing import phase
+
+
+class JsonResponse(http.JsonResponse):
+    """
+    django.http.JsonResponse có đo thời gian tuần tự hóa JSON vào giai đoạn 'serialize' của yêu cầu.
+    """
+
+    def __init__(self, *args, **kwargs):
+        with phase('serialize'):
+            super().__init__(*args, **kwargs)
@@ -0,0 +1,59 @@
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoring.profiling import merge_profiles, route_slug
+
+
+class Command(BaseCommand):
+    help = 'Merges sampled request profiles per route into .pstats and collapsed-stack files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir',
+            help='Profile directory (default: settings.MONITORING_PROFILE_DIR).',
+        )
+        parser.add_argument(
+            '--route',
+            help='Only merge profiles of this route, e.g. /api/report/revenue-report/.',
+        )
+        parser.add_argument(
+            '--output',
+            help='Directory for the merged files (default: <dir>/merged).',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=15,
+            help='Number of functions by cumulative time to print per route, 0 prints none (default: 15).',
+        )
+
+    def handle(self, *args, **options):
+        directory = Path(options['dir'] or settings.MONITORING_PROFILE_DIR)
+        if not directory.is_dir():
+            raise CommandError(f'Profile directory {directory} does not exist.')
+        output = Path(options['output'] or directory / 'merged')
+
+        merged = merge_profiles(directory, route=options['route'])
+        if not merged:
+            self.stdout.write('No profiles to merge.')
+            return
+
+        output.mkdir(parents=True, exist_ok=True)
+        for route, result in merged.items():
+            base = output / route_slug(route)
+            result['stats'].dump_stats(f'{base}.pstats')
+            Path(f'{base}.collapsed').write_text(
+                ''.join(f'{stack} {count}\n' for stack, count in result['stacks'].most_common())
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'{route}: {result["profiles"]} profiles, {result["duration_ms"]:.1f} ms total -> {base}.pstats, '
+                f'{base}.collapsed'
+            ))
+            if options['top'] > 0:
+                report = StringIO()
+                result['stats'].stream = report
+                result['stats'].sort_stats('cumulative').print_stats(options['top'])
+                self.stdout.write(report.getvalue())
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from monitoring.slow_queries import read_slow_queries, summarize_slow_queries
+
+
+class Command(BaseCommand):
+    help = 'Summarizes the slow query log: statement shapes ranked by total time, with callers and query plans.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--log',
+            help='Slow query log file; rotated files next to it are read too '
+                 '(default: settings.MONITORING_SLOW_QUERY_LOG).',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help='Number of statement shapes to print (default: 10).',
+        )
+
+    def handle(self, *args, **options):
+        entries = read_slow_queries(options['log'] or settings.MONITORING_SLOW_QUERY_LOG)
+        if not entries:
+            self.stdout.write('No slow queries logged.')
+            return
+
+        summary = summarize_slow_queries(entries)
+        self.stdout.write(f'{len(entries)} slow queries, {len(summary)} distinct statements.')
+        for rank, item in enumerate(summary[:options['top']], start=1):
+            self.stdout.write(self.style.SUCCESS(
+                f'\n#{rank} total {item["total_ms"]:.1f} ms, {item["count"]} calls, '
+                f'mean {item["total_ms"] / item["count"]:.1f} ms, max {item["max_ms"]:.1f} ms'
+            ))
+            self.stdout.write(f'  SQL: {item["shape"]}')
+            for view in item['views']:
+                self.stdout.write(f'  view: {view}')
+            for caller in item['callers']:
+                self.stdout.write(f'  caller: {caller}')
+            for line in item['plan'] or []:
+                self.stdout.write(f'  plan: {line}')
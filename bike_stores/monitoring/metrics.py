@@ -0,0 +1,227 @@
+"""
+Bộ đếm metrics trong tiến trình, gộp giữa các worker qua một file SQLite dùng chung.
+
+Mỗi lần ghi nhận chỉ cập nhật dict trong bộ nhớ dưới một khóa (vài micro giây). Định kỳ mỗi worker cộng
+phần tăng thêm vào file SQLite (UPSERT value = value + delta); /metrics đọc file đó và xuất theo
+định dạng văn bản của Prometheus. Gauge (ví dụ số yêu cầu đang xử lý) được lưu theo từng pid và cộng lại
+khi xuất, bỏ qua worker không cập nhật quá MONITORING_METRICS_GAUGE_TTL giây.
+"""
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS = {
+    'http_requests_total': ('counter', 'HTTP requests by route, method and status code.'),
+    'http_request_duration_seconds': ('histogram', 'HTTP request latency by route and method.'),
+    'http_requests_in_flight': ('gauge', 'HTTP requests currently being processed.'),
+    'db_queries_total': ('counter', 'SQL queries executed by route.'),
+    'db_query_duration_seconds_total': ('counter', 'Time spent in SQL queries by route.'),
+    'report_requests_total': (
+        'counter', 'Report requests by report and result (computed, or coalesced onto an identical in-flight one).'
+    ),
+    'report_coalesced_ratio': ('gauge', 'Share of report requests that shared an in-flight computation.'),
+}
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS metric_samples (
+        name TEXT NOT NULL, labels TEXT NOT NULL, value REAL NOT NULL,
+        PRIMARY KEY (name, labels)
+    );
+    CREATE TABLE IF NOT EXISTS metric_gauges (
+        name TEXT NOT NULL, labels TEXT NOT NULL, pid INTEGER NOT NULL, value REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (name, labels, pid)
+    );
+"""
+
+
+def format_labels(**labels) -> str:
+    """
+    Nhãn theo cú pháp Prometheus (route="...",method="GET"), đã escape và sắp xếp theo tên.
+    """
+    return ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in sorted(labels.items())
+    )
+
+
+def _join_labels(labels: str, extra: str) -> str:
+    return f'{labels},{extra}' if labels else extra
+
+
+def _sample_sort_key(sample: tuple[str, str, float]) -> tuple:
+    # Bucket của histogram phải theo thứ tự le tăng dần, sau cùng là _sum và _count của cùng bộ nhãn
+    sample_name, labels, _ = sample
+    base_labels, _, le = labels.partition('le="')
+    le = le.rstrip('"')
+    suffix_rank = 1 if sample_name.endswith('_sum') else 2 if sample_name.endswith('_count') else 0
+    return base_labels.rstrip(','), suffix_rank, float('inf') if le == '+Inf' else float(le or 0)
+
+
+def _format_value(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class MetricsRegistry:
+    """
+    Metrics của một tiến trình. Các giá trị chưa flush nằm trong bộ nhớ; flush() cộng chúng vào kho SQLite.
+    Với path rỗng kho là SQLite trong bộ nhớ (chỉ số liệu của tiến trình hiện tại).
+    """
+
+    def __init__(self, path: str | None = None, buckets: tuple = DEFAULT_BUCKETS):
+        self.path = path
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._store_lock = threading.Lock()
+        self._connection = None
+        self._connection_path = None
+        self._pid = None
+        self._reset_pending()
+        self._gauges = defaultdict(float)
+        self._last_flush = time.monotonic()
+
+    def _reset_pending(self) -> None:
+        self._counters = defaultdict(float)
+        # (name, labels) -> [số lần rơi vào từng bucket (+Inf ở cuối), tổng]
+        self._histograms = {}
+
+    def inc(self, name: str, labels: str = '', value: float = 1) -> None:
+        with self._lock:
+            self._counters[(name, labels)] += value
+
+    def observe(self, name: str, labels: str, value: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[(name, labels)] = [[0] * (len(self.buckets) + 1), 0.0]
+            histogram[0][bisect_left(self.buckets, value)] += 1
+            histogram[1] += value
+
+    def gauge_add(self, name: str, labels: str = '', value: float = 1) -> None:
+        with self._lock:
+            self._gauges[(name, labels)] += value
+
+    def maybe_flush(self) -> None:
+        if time.monotonic() - self._last_flush >= settings.MONITORING_METRICS_FLUSH_SECONDS:
+            self.flush()
+
+    def _store(self) -> sqlite3.Connection:
+        path = self.path if self.path is not None else settings.MONITORING_METRICS_DB
+        if self._connection is None or self._pid != os.getpid() or self._connection_path != path:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            if path:
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(path or ':memory:', timeout=5, check_same_thread=False,
+                                               isolation_level=None)
+            if path:
+                self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.executescript(SCHEMA)
+            self._pid = os.getpid()
+            self._connection_path = path
+        return self._connection
+
+    def flush(self) -> None:
+        """
+        Cộng các giá trị chưa flush vào kho và ghi giá trị gauge hiện tại của tiến trình.
+        """
+        with self._lock:
+            counters, histograms = self._counters, self._histograms
+            gauges = dict(self._gauges)
+            self._reset_pending()
+            self._last_flush = time.monotonic()
+
+        samples = list(counters.items())
+        for (name, labels), (bucket_counts, total) in histograms.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), bucket_counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _format_value(bound)
+                samples.append(((f'{name}_bucket', _join_labels(labels, f'le="{le}"')), cumulative))
+            samples.append(((f'{name}_sum', labels), total))
+            samples.append(((f'{name}_count', labels), cumulative))
+
+        now = time.time()
+        with self._store_lock:
+            store = self._store()
+            with store:
+                store.execute('BEGIN IMMEDIATE')
+                store.executemany(
+                    'INSERT INTO metric_samples (name, labels, value) VALUES (?, ?, ?) '
+                    'ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value',
+                    [(name, labels, value) for (name, labels), value in samples]
+                )
+                store.executemany(
+                    'INSERT OR REPLACE INTO metric_gauges (name, labels, pid, value, updated_at) VALUES (?, ?, ?, ?, ?)',
+                    [(name, labels, self._pid, value, now) for (name, labels), value in gauges.items()]
+                )
+
+    def collect(self) -> dict[str, list[tuple[str, str, float]]]:
+        """
+        Toàn bộ mẫu trong kho sau khi flush: {tên metric: [(tên mẫu, nhãn, giá trị)]}.
+        """
+        self.flush()
+        with self._store_lock:
+            store = self._store()
+            samples = store.execute('SELECT name, labels, value FROM metric_samples ORDER BY name, labels').fetchall()
+            gauges = store.execute(
+                'SELECT name, labels, SUM(value) FROM metric_gauges WHERE updated_at >= ? '
+                'GROUP BY name, labels ORDER BY name, labels',
+                (time.time() - settings.MONITORING_METRICS_GAUGE_TTL,)
+            ).fetchall()
+
+        families = defaultdict(list)
+        for sample_name, labels, value in samples + gauges:
+            name = sample_name
+            for suffix in ('_bucket', '_sum', '_count'):
+                if sample_name.endswith(suffix) and sample_name[:-len(suffix)] in METRICS:
+                    name = sample_name[:-len(suffix)]
+            families[name].append((sample_name, labels, value))
+
+        requests = defaultdict(lambda: {'computed': 0.0, 'coalesced': 0.0})
+        for _, labels, value in families.get('report_requests_total', []):
+            report_label, result = labels.split(',result=')
+            requests[report_label][result.strip('"')] = value
+        for report_label, counts in sorted(requests.items()):
+            total = counts['computed'] + counts['coalesced']
+            families['report_coalesced_ratio'].append(
+                ('report_coalesced_ratio', report_label, counts['coalesced'] / total if total else 0.0)
+            )
+        return families
+
+    def render(self) -> str:
+        """
+        Định dạng văn bản Prometheus (text/plain; version=0.0.4).
+        """
+        lines = []
+        for name, samples in sorted(self.collect().items()):
+            samples = sorted(samples, key=_sample_sort_key)
+            metric_type, help_text = METRICS.get(name, ('untyped', ''))
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for sample_name, labels, value in samples:
+                lines.append(f'{sample_name}{{{labels}}} {_format_value(value)}' if labels
+                             else f'{sample_name} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def record_report_request(report: str, computed: bool) -> None:
+    """
+    Ghi nhận một yêu cầu báo cáo: computed nếu yêu cầu này tự tính, coalesced nếu dùng chung kết quả
+    của một lần tính giống hệt đang diễn ra (single-flight).
+    """
+    result = 'computed' if computed else 'coalesced'
+    registry.inc('report_requests_total', format_labels(report=report, result=result))
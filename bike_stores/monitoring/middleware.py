@@ -0,0 +1,139 @@
+import json
+import logging
+import time
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from .metrics import format_labels, registry
+from .profiling import profile_request, should_profile
+from .timing import RequestTimings, tracking_request
+
+logger = logging.getLogger('monitoring.requests')
+
+SERVER_TIMING_PHASES = ('view', 'service', 'serialize')
+
+
+def server_timing_header(timings: RequestTimings, total: float, repeated: list[tuple[str, int]]) -> str:
+    """
+    Giá trị header Server-Timing (thời gian theo mili giây).
+    """
+    entries = [f'db;dur={timings.db_time * 1000:.1f};desc="{timings.query_count} queries"']
+    entries += [
+        f'{name};dur={timings.phases[name] * 1000:.1f}' for name in SERVER_TIMING_PHASES if name in timings.phases
+    ]
+    if repeated:
+        entries.append(f'nplusone;desc="{len(repeated)} repeated query shapes, max {repeated[0][1]}x"')
+    entries.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(entries)
+
+
+class RequestTimingMiddleware:
+    """
+    Đếm truy vấn SQL và thời gian cơ sở dữ liệu của mỗi yêu cầu (qua hàm bọc cài trên mọi kết nối, xem
+    monitoring.timing.install_query_timing),
+    đo thời gian các giai đoạn view/service/serialize, trả về trong header Server-Timing và ghi một dòng
+    log JSON vào logger 'monitoring.requests'. Các số liệu này cùng số yêu cầu đang xử lý cũng được ghi vào
+    metrics (xem monitoring.metrics) để xuất ở /metrics.
+
+    Dạng truy vấn lặp lại từ MONITORING_N_PLUS_ONE_THRESHOLD lần trở lên được đánh dấu là N+1 và log ở mức WARNING.
+    Đặt middleware này đầu tiên để thời gian tổng gồm cả thời gian chờ ở các middleware khác.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        registry.gauge_add('http_requests_in_flight', value=1)
+        try:
+            with tracking_request() as timings:
+                response = self.get_response(request)
+                self._finish(request, response, timings)
+        finally:
+            registry.gauge_add('http_requests_in_flight', value=-1)
+        registry.maybe_flush()
+        return response
+
+    async def __acall__(self, request):
+        registry.gauge_add('http_requests_in_flight', value=1)
+        try:
+            with tracking_request() as timings:
+                response = await self.get_response(request)
+                self._finish(request, response, timings)
+        finally:
+            registry.gauge_add('http_requests_in_flight', value=-1)
+        # flush ghi vào kho SQLite nên không chạy trên event loop
+        await sync_to_async(registry.maybe_flush, thread_sensitive=False)()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._monitoring_view_started = time.perf_counter()
+
+    def _finish(self, request, response, timings: RequestTimings) -> None:
+        view_started = getattr(request, '_monitoring_view_started', None)
+        if view_started is not None:
+            timings.phases['view'] = time.perf_counter() - view_started
+        total = timings.elapsed
+        repeated = timings.repeated_queries(settings.MONITORING_N_PLUS_ONE_THRESHOLD)
+        response['Server-Timing'] = server_timing_header(timings, total, repeated)
+
+        match = getattr(request, 'resolver_match', None)
+        route = f'/{match.route}' if match else 'unmatched'
+        registry.inc('http_requests_total', format_labels(route=route, method=request.method,
+                                                          status=response.status_code))
+        registry.observe('http_request_duration_seconds', format_labels(route=route, method=request.method), total)
+        registry.inc('db_queries_total', format_labels(route=route), timings.query_count)
+        registry.inc('db_query_duration_seconds_total', format_labels(route=route), timings.db_time)
+
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(total * 1000, 1),
+            'db_ms': round(timings.db_time * 1000, 1),
+            'queries': timings.query_count,
+            'phases_ms': {name: round(seconds * 1000, 1) for name, seconds in timings.phases.items()},
+        }
+        if repeated:
+            record['repeated_queries'] = [{'sql': shape, 'count': count} for shape, count in repeated]
+            logger.warning(json.dumps(record, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False))
+
+
+class ProfilingMiddleware:
+    """
+    Profile một phần yêu cầu (xem monitoring.profiling): tỉ lệ MONITORING_PROFILE_SAMPLE_RATE, hoặc yêu cầu
+    có header X-Profile-Token khớp MONITORING_PROFILE_TOKEN. Mặc định tắt.
+    cProfile chỉ theo dõi luồng đã bật nó, nên dưới ASGI profile được chạy trong luồng sync_to_async
+    (thread_sensitive) mà view sync cũng chạy trong đó; view async chạy trên event loop không có trong profile.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if should_profile(request):
+            return profile_request(self.get_response, request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if not should_profile(request):
+            return await self.get_response(request)
+        # Phần còn lại của chuỗi middleware chạy lại trên event loop qua async_to_sync; view sync được
+        # sync_to_async đưa về đúng luồng đang profile
+        return await sync_to_async(profile_request, thread_sensitive=True)(async_to_sync(self.get_response), request)
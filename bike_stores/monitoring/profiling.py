@@ -0,0 +1,202 @@
+"""
+Lấy mẫu profile của các yêu cầu thật.
+
+Một yêu cầu được chọn (theo tỉ lệ MONITORING_PROFILE_SAMPLE_RATE hoặc vì mang header token tin cậy) chạy dưới
+cProfile, đồng thời một luồng phụ chụp stack của luồng xử lý theo chu kỳ. Mỗi profile gồm ba file cùng tên:
+.pstats (cProfile), .collapsed (stack gộp cho flamegraph.pl/speedscope) và .json (route, thời gian...).
+Thư mục chỉ giữ MONITORING_PROFILE_KEEP profile mới nhất.
+"""
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+
+PROFILE_SUFFIXES = ('.pstats', '.collapsed', '.json')
+
+# cProfile từ Python 3.12 chỉ cho một profiler hoạt động mỗi tiến trình, và cũng để giới hạn chi phí:
+# mỗi worker chỉ profile một yêu cầu tại một thời điểm
+_profiling_lock = threading.Lock()
+
+
+def should_profile(request) -> bool:
+    """
+    Yêu cầu có được profile không. Với yêu cầu không được chọn chỉ tốn một phép so sánh và một lần đọc header.
+    """
+    token = settings.MONITORING_PROFILE_TOKEN
+    if token:
+        supplied = request.headers.get('X-Profile-Token')
+        if supplied and hmac.compare_digest(supplied, token):
+            return True
+    rate = settings.MONITORING_PROFILE_SAMPLE_RATE
+    return rate > 0 and random.random() < rate
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f'{getattr(code, "co_qualname", code.co_name)} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+def collapse_stack(frame) -> str:
+    """
+    Stack từ gốc tới frame, dạng 'gốc;...;lá' của định dạng collapsed.
+    """
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame).replace(';', ':'))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class StackSampler:
+    """
+    Luồng phụ chụp stack của một luồng mỗi interval giây và đếm số lần gặp từng stack.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse_stack(frame)] += 1
+
+    def __enter__(self) -> 'StackSampler':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def route_slug(route: str) -> str:
+    return re.sub(r'[^A-Za-z0-9]+', '-', route).strip('-') or 'root'
+
+
+class RequestProfile:
+    """
+    Profile của một yêu cầu: dùng làm context manager quanh phần xử lý rồi gọi save().
+    """
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.sampler = StackSampler(threading.get_ident(), settings.MONITORING_PROFILE_SAMPLE_INTERVAL)
+        self.started_at = None
+        self.duration = None
+
+    def __enter__(self) -> 'RequestProfile':
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self.sampler.__enter__()
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.profiler.disable()
+        self.sampler.__exit__(*exc_info)
+        self.duration = time.perf_counter() - self._started
+
+    def save(self, directory, metadata: dict) -> Path:
+        """
+        Ghi ba file của profile vào directory rồi xóa bớt profile cũ. Trả về đường dẫn không kèm đuôi.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        base = directory / (
+            f'{self.started_at:%Y%m%dT%H%M%S%f}-{os.getpid()}-{route_slug(metadata.get("route", ""))}'
+        )
+        self.profiler.dump_stats(f'{base}.pstats')
+        Path(f'{base}.collapsed').write_text(
+            ''.join(f'{stack} {count}\n' for stack, count in self.sampler.stacks.most_common())
+        )
+        # File .json ghi sau cùng: profile chỉ được coi là hoàn chỉnh khi đã có file này
+        Path(f'{base}.json').write_text(json.dumps({
+            **metadata,
+            'started_at': self.started_at.isoformat(),
+            'duration_ms': round(self.duration * 1000, 1),
+            'samples': sum(self.sampler.stacks.values()),
+        }, ensure_ascii=False))
+        rotate_profiles(directory, settings.MONITORING_PROFILE_KEEP)
+        return base
+
+
+def profile_request(get_response, request):
+    """
+    Gọi get_response(request) dưới profiler nếu worker đang không profile yêu cầu nào khác,
+    ngược lại xử lý bình thường.
+    """
+    if not _profiling_lock.acquire(blocking=False):
+        return get_response(request)
+    try:
+        with RequestProfile() as profile:
+            response = get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        profile.save(settings.MONITORING_PROFILE_DIR, {
+            'route': f'/{match.route}' if match else 'unmatched',
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+        })
+        return response
+    finally:
+        _profiling_lock.release()
+
+
+def list_profiles(directory) -> list[Path]:
+    """
+    Các profile hoàn chỉnh trong thư mục (đường dẫn không kèm đuôi), cũ nhất trước.
+    """
+    return sorted(path.with_suffix('') for path in Path(directory).glob('*.json'))
+
+
+def rotate_profiles(directory, keep: int) -> None:
+    profiles = list_profiles(directory)
+    for base in profiles[:max(len(profiles) - keep, 0)]:
+        for suffix in PROFILE_SUFFIXES:
+            Path(f'{base}{suffix}').unlink(missing_ok=True)
+
+
+def merge_profiles(directory, route: str | None = None) -> dict[str, dict]:
+    """
+    Gộp các profile theo route.
+
+    Returns:
+        dict: {route: {'profiles': số profile, 'duration_ms': tổng thời gian, 'stats': pstats.Stats,
+        'stacks': Counter stack gộp}}
+    """
+    groups = defaultdict(list)
+    for base in list_profiles(directory):
+        metadata = json.loads(Path(f'{base}.json').read_text())
+        if route is None or metadata['route'] == route:
+            groups[metadata['route']].append((base, metadata))
+
+    merged = {}
+    for group_route, profiles in sorted(groups.items()):
+        stacks = Counter()
+        for base, _ in profiles:
+            for line in Path(f'{base}.collapsed').read_text().splitlines():
+                stack, _, count = line.rpartition(' ')
+                stacks[stack] += int(count)
+        merged[group_route] = {
+            'profiles': len(profiles),
+            'duration_ms': sum(metadata['duration_ms'] for _, metadata in profiles),
+            'stats': pstats.Stats(*(f'{base}.pstats' for base, _ in profiles)),
+            'stacks': stacks,
+        }
+    return merged
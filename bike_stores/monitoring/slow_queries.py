@@ -0,0 +1,166 @@
+"""
+Nhật ký truy vấn chậm.
+
+Mọi kết nối cơ sở dữ liệu được gắn một execute wrapper (xem MonitoringConfig.ready). Câu SQL chạy lâu hơn
+MONITORING_SLOW_QUERY_MS được ghi thành một dòng JSON gồm tham số, view và hàm gọi (lấy từ stack) và kết quả
+EXPLAIN QUERY PLAN, vào file xoay vòng MONITORING_SLOW_QUERY_LOG. Lệnh slow_query_report tổng hợp file này.
+"""
+import json
+import logging
+import sys
+import time
+from collections import defaultdict
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from .timing import sql_shape
+
+logger = logging.getLogger('monitoring.slow_queries')
+logger.propagate = False
+logger.setLevel(logging.INFO)
+
+PROJECT_DIR = Path(settings.BASE_DIR).resolve()
+MONITORING_DIR = Path(__file__).resolve().parent
+
+EXPLAIN_PREFIXES = {'sqlite': 'EXPLAIN QUERY PLAN ', 'postgresql': 'EXPLAIN '}
+
+
+def _log_handler() -> logging.Handler:
+    """
+    Handler ghi vào MONITORING_SLOW_QUERY_LOG, tạo lại khi đường dẫn trong settings thay đổi.
+    """
+    path = Path(settings.MONITORING_SLOW_QUERY_LOG)
+    for handler in logger.handlers:
+        if Path(handler.baseFilename) == path.resolve():
+            return handler
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+        handler.close()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handler = RotatingFileHandler(
+        path, maxBytes=settings.MONITORING_SLOW_QUERY_LOG_BYTES,
+        backupCount=settings.MONITORING_SLOW_QUERY_LOG_BACKUPS, encoding='utf-8', delay=True,
+    )
+    logger.addHandler(handler)
+    return handler
+
+
+def find_callers() -> tuple[str | None, str | None]:
+    """
+    (view, hàm gọi) gần nhất trong mã của dự án, dạng 'sales/views.py:120 OrderListView.get'.
+    Hàm gọi là frame trong dự án gần truy vấn nhất không nằm trong views.py.
+    """
+    view = caller = None
+    frame = sys._getframe(1)
+    while frame is not None and view is None:
+        path = Path(frame.f_code.co_filename)
+        if path.is_relative_to(PROJECT_DIR) and not path.is_relative_to(MONITORING_DIR):
+            code = frame.f_code
+            location = f'{path.relative_to(PROJECT_DIR).as_posix()}:{frame.f_lineno} ' \
+                       f'{getattr(code, "co_qualname", code.co_name)}'
+            if path.name == 'views.py':
+                view = location
+            elif caller is None:
+                caller = location
+        frame = frame.f_back
+    return view, caller
+
+
+def explain(connection, sql: str, params) -> list[str] | None:
+    """
+    Kế hoạch thực thi của câu SQL, chạy trên một cursor mới của backend (không qua execute wrapper
+    và không làm mất kết quả của cursor đang dùng). Trả về None nếu backend không hỗ trợ hoặc lỗi.
+    """
+    prefix = EXPLAIN_PREFIXES.get(connection.vendor)
+    if prefix is None:
+        return None
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(prefix + sql, params)
+        # Cột cuối là mô tả từng bước (detail của SQLite, QUERY PLAN của PostgreSQL)
+        return [str(row[-1]) for row in cursor.fetchall()]
+    except Exception:
+        return None
+    finally:
+        cursor.close()
+
+
+def record_slow_queries(execute, sql, params, many, context):
+    """
+    Execute wrapper ghi lại câu SQL chậm hơn MONITORING_SLOW_QUERY_MS.
+    """
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration_ms = (time.perf_counter() - started) * 1000
+        threshold = settings.MONITORING_SLOW_QUERY_MS
+        if 0 < threshold <= duration_ms:
+            connection = context['connection']
+            view, caller = find_callers()
+            _log_handler()
+            logger.info(json.dumps({
+                'time': timezone.now().isoformat(),
+                'database': connection.alias,
+                'duration_ms': round(duration_ms, 3),
+                'sql': sql,
+                # Với executemany chỉ ghi số bộ tham số (có thể là hàng chục nghìn dòng)
+                'params': len(params) if many and hasattr(params, '__len__') else None if many else params,
+                'many': many,
+                'view': view,
+                'caller': caller,
+                'plan': None if many else explain(connection, sql, params),
+            }, ensure_ascii=False, default=str))
+
+
+def install_slow_query_logging(sender, connection, **kwargs) -> None:
+    """
+    Receiver của tín hiệu connection_created: gắn record_slow_queries vào kết nối (một lần).
+    """
+    if record_slow_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_slow_queries)
+
+
+def read_slow_queries(path) -> list[dict]:
+    """
+    Các bản ghi trong file nhật ký và các file đã xoay vòng (path.1, path.2, ...).
+    """
+    path = Path(path)
+    # File xoay vòng có số lớn hơn là cũ hơn: đọc cũ nhất trước
+    rotated = [log_file for log_file in path.parent.glob(f'{path.name}.*') if log_file.suffix[1:].isdigit()]
+    rotated.sort(key=lambda log_file: int(log_file.suffix[1:]), reverse=True)
+    entries = []
+    for log_file in [*rotated, path]:
+        if not log_file.exists():
+            continue
+        for line in log_file.read_text(encoding='utf-8').splitlines():
+            if line.strip():
+                entries.append(json.loads(line))
+    return entries
+
+
+def summarize_slow_queries(entries: list[dict]) -> list[dict]:
+    """
+    Gom bản ghi theo dạng SQL, sắp xếp giảm dần theo tổng thời gian.
+    """
+    groups = defaultdict(list)
+    for entry in entries:
+        groups[sql_shape(entry['sql'])].append(entry)
+
+    summary = []
+    for shape, group in groups.items():
+        slowest = max(group, key=lambda entry: entry['duration_ms'])
+        summary.append({
+            'shape': shape,
+            'count': len(group),
+            'total_ms': sum(entry['duration_ms'] for entry in group),
+            'max_ms': slowest['duration_ms'],
+            'views': sorted({entry['view'] for entry in group if entry['view']}),
+            'callers': sorted({entry['caller'] for entry in group if entry['caller']}),
+            'plan': slowest['plan'],
+        })
+    summary.sort(key=lambda item: item['total_ms'], reverse=True)
+    return summary
@@ -0,0 +1,273 @@
+import json
+import os
+import pstats
+import sqlite3
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from production.models import Brand, Category, Product, Stock
+from sales.models import Store
+from .metrics import MetricsRegistry, format_labels, record_report_request
+from .profiling import list_profiles
+from .timing import phase, sql_shape, tracking_request
+
+
+class TemporaryMetricsDbMixin:
+    """
+    Ghi metrics của các yêu cầu trong test vào file tạm thay vì var/metrics.sqlite3.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.metrics_db = str(Path(self.enterContext(tempfile.TemporaryDirectory())) / 'metrics.sqlite3')
+        self.enterContext(self.settings(MONITORING_METRICS_DB=self.metrics_db))
+
+
+class SqlShapeTest(TestCase):
+    def test_literals_and_placeholder_lists_are_collapsed(self):
+        self.assertEqual(
+            sql_shape('SELECT * FROM "stores"  WHERE "store_id" = %s AND name = \'A\'\n LIMIT 21'),
+            'SELECT * FROM "stores" WHERE "store_id" = %s AND name = ? LIMIT ?'
+        )
+        self.assertEqual(
+            sql_shape('SELECT 1 FROM t WHERE id IN (%s, %s, %s)'), sql_shape('SELECT 2 FROM t WHERE id IN (%s)')
+        )
+
+    def test_nested_phase_counted_once(self):
+        with tracking_request() as timings:
+            with phase('service'):
+                with phase('service'):
+                    pass
+        self.assertEqual(list(timings.phases), ['service'])
+        with phase('service'):  # ngoài yêu cầu: không làm gì
+            pass
+
+
+class RequestTimingMiddlewareTest(TemporaryMetricsDbMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.store = Store.objects.create(store_id=1, store_name='Store A')
+        brand = Brand.objects.create(brand_id=1, brand_name='Trek')
+        category = Category.objects.create(category_id=1, category_name='Road Bikes')
+        for i in range(1, 5):
+            product = Product.objects.create(product_id=i, product_name=f'Bike {i}', brand_id=brand,
+                                             category_id=category, model_year=2024, list_price=100)
+            Stock.objects.create(store_id=self.store, product_id=product, quantity=i)
+
+    def _server_timing(self, response) -> dict[str, str]:
+        entries = {}
+        for entry in response['Server-Timing'].split(', '):
+            name, *params = entry.split(';')
+            entries[name] = ';'.join(params)
+        return entries
+
+    def test_server_timing_reports_queries_and_phases(self):
+        with self.assertLogs('monitoring.requests', 'INFO') as logs:
+            response = self.client.get(reverse('store-list'))
+        self.assertEqual(response.status_code, 200)
+
+        timing = self._server_timing(response)
+        self.assertEqual(set(timing), {'db', 'view', 'serialize', 'total'})
+        self.assertIn('desc="1 queries"', timing['db'])
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record['path'], record['status'], record['queries']), ('/api/sales/stores/', 200, 1))
+        self.assertNotIn('repeated_queries', record)
+
+    def test_report_requests_record_service_phase(self):
+        response = self.client.get(reverse('inventory-report'))
+        self.assertIn('service', self._server_timing(response))
+
+    async def test_async_requests_count_queries_of_sync_views(self):
+        with self.assertLogs('monitoring.requests', 'INFO') as logs:
+            response = await self.async_client.get(reverse('store-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('desc="1 queries"', self._server_timing(response)['db'])
+        self.assertEqual(json.loads(logs.records[0].getMessage())['queries'], 1)
+
+    @override_settings(MONITORING_METRICS_FLUSH_SECONDS=0)
+    async def test_async_requests_flush_metrics(self):
+        await self.async_client.get(reverse('store-list'))
+        with sqlite3.connect(self.metrics_db) as store:
+            value = store.execute(
+                "SELECT value FROM metric_samples WHERE name = 'http_requests_total' AND labels = ?",
+                [format_labels(route='/api/sales/stores/', method='GET', status=200)],
+            ).fetchone()
+        self.assertIsNotNone(value)
+
+    @override_settings(MONITORING_N_PLUS_ONE_THRESHOLD=4)
+    def test_repeated_query_shapes_are_flagged(self):
+        # StockListView đọc store và product của từng dòng tồn kho: 1 + 2 x 4 truy vấn
+        with self.assertLogs('monitoring.requests', 'WARNING') as logs:
+            response = self.client.get(reverse('stock-list-create'))
+
+        self.assertIn('nplusone', self._server_timing(response))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['queries'], 9)
+        self.assertEqual([item['count'] for item in record['repeated_queries']], [4, 4])
+        self.assertIn('FROM "products"', record['repeated_queries'][0]['sql'] + record['repeated_queries'][1]['sql'])
+
+
+class TestRunMetricsStoreTest(TestCase):
+    def test_test_run_keeps_metrics_in_memory(self):
+        registry = MetricsRegistry()
+        registry.inc('http_requests_total')
+        registry.flush()
+        self.assertEqual(settings.MONITORING_METRICS_DB, '')
+        self.assertEqual(registry._connection_path, '')
+
+
+class MetricsTest(TemporaryMetricsDbMixin, TestCase):
+
+    def test_workers_are_aggregated_through_shared_store(self):
+        workers = [MetricsRegistry(self.metrics_db, buckets=(0.1, 1.0)) for _ in range(2)]
+        labels = format_labels(route='/api/sales/stores/', method='GET')
+        for worker, latency in zip(workers, (0.05, 0.5)):
+            worker.inc('http_requests_total', format_labels(route='/x', method='GET', status=200))
+            worker.observe('http_request_duration_seconds', labels, latency)
+            worker.flush()
+        workers[0].observe('http_request_duration_seconds', labels, 0.1)  # biên trên của bucket được tính vào bucket
+        workers[1].gauge_add('http_requests_in_flight', value=2)
+
+        lines = workers[0].render().splitlines()
+        self.assertIn('http_requests_total{method="GET",route="/x",status="200"} 2', lines)
+        histogram = [line for line in lines if line.startswith('http_request_duration_seconds')]
+        self.assertEqual(histogram, [
+            'http_request_duration_seconds_bucket{method="GET",route="/api/sales/stores/",le="0.1"} 2',
+            'http_request_duration_seconds_bucket{method="GET",route="/api/sales/stores/",le="1"} 3',
+            'http_request_duration_seconds_bucket{method="GET",route="/api/sales/stores/",le="+Inf"} 3',
+            'http_request_duration_seconds_sum{method="GET",route="/api/sales/stores/"} 0.65',
+            'http_request_duration_seconds_count{method="GET",route="/api/sales/stores/"} 3',
+        ])
+        # Gauge của worker 1 chỉ có sau khi worker đó flush
+        self.assertNotIn('http_requests_in_flight 2', lines)
+        workers[1].flush()
+        self.assertIn('http_requests_in_flight 2', workers[0].render().splitlines())
+
+    def test_coalesced_ratio(self):
+        registry = MetricsRegistry(self.metrics_db)
+        self.enterContext(patch('monitoring.metrics.registry', registry))
+        record_report_request('revenue', computed=True)
+        for _ in range(3):
+            record_report_request('revenue', computed=False)
+
+        lines = registry.render().splitlines()
+        self.assertIn('report_requests_total{report="revenue",result="coalesced"} 3', lines)
+        self.assertIn('report_coalesced_ratio{report="revenue"} 0.75', lines)
+
+    def test_metrics_endpoint(self):
+        registry = MetricsRegistry()
+        self.enterContext(patch('monitoring.middleware.registry', registry))
+        self.enterContext(patch('monitoring.metrics.registry', registry))
+        self.enterContext(patch('monitoring.views.registry', registry))
+        self.addCleanup(cache.clear)
+
+        self.client.get(reverse('store-list'))
+        self.client.get(reverse('fulfillment-report'))
+        self.client.get(reverse('fulfillment-report'))
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        lines = response.content.decode().splitlines()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', lines)
+        self.assertIn('http_requests_total{method="GET",route="/api/sales/stores/",status="200"} 1', lines)
+        self.assertIn('db_queries_total{route="/api/sales/stores/"} 1', lines)
+        # Hai lời gọi nối tiếp không dùng chung lần tính nào
+        self.assertIn('report_requests_total{report="fulfillment",result="computed"} 2', lines)
+        self.assertIn('report_coalesced_ratio{report="fulfillment"} 0', lines)
+        # Chính yêu cầu /metrics đang được xử lý
+        self.assertIn('http_requests_in_flight 1', lines)
+
+
+class ProfilingMiddlewareTest(TemporaryMetricsDbMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(self.settings(
+            MONITORING_PROFILE_DIR=str(self.directory), MONITORING_PROFILE_TOKEN='secret',
+            MONITORING_PROFILE_SAMPLE_RATE=0, MONITORING_PROFILE_SAMPLE_INTERVAL=0.001,
+        ))
+
+    def test_only_trusted_header_or_sampled_requests_are_profiled(self):
+        self.client.get(reverse('store-list'))
+        self.client.get(reverse('store-list'), headers={'X-Profile-Token': 'wrong'})
+        self.assertEqual(list_profiles(self.directory), [])
+
+        self.client.get(reverse('store-list'), headers={'X-Profile-Token': 'secret'})
+        [profile] = list_profiles(self.directory)
+        self.assertTrue(profile.with_suffix('.pstats').exists())
+        self.assertTrue(profile.with_suffix('.collapsed').exists())
+        metadata = json.loads(profile.with_suffix('.json').read_text())
+        self.assertEqual((metadata['route'], metadata['status']), ('/api/sales/stores/', 200))
+
+        with self.settings(MONITORING_PROFILE_SAMPLE_RATE=1, MONITORING_PROFILE_KEEP=2):
+            for _ in range(3):
+                self.client.get(reverse('inventory-report'))
+        self.assertEqual(len(list_profiles(self.directory)), 2)
+
+    async def test_async_requests_profile_the_sync_view(self):
+        response = await self.async_client.get(reverse('store-list'), headers={'X-Profile-Token': 'secret'})
+        self.assertEqual(response.status_code, 200)
+
+        [profile] = list_profiles(self.directory)
+        stats = pstats.Stats(str(profile.with_suffix('.pstats')))
+        self.assertTrue(any(function == 'get' and filename.endswith(os.path.join('sales', 'views.py'))
+                            for filename, _, function in stats.stats))
+
+    def test_merge_profiles_per_route(self):
+        with self.settings(MONITORING_PROFILE_SAMPLE_RATE=1):
+            self.client.get(reverse('store-list'))
+            self.client.get(reverse('store-list'))
+            self.client.get(reverse('customer-list'))
+
+        out = StringIO()
+        call_command('merge_profiles', '--top', '3', stdout=out)
+        self.assertIn('/api/sales/stores/: 2 profiles', out.getvalue())
+        self.assertIn('/api/sales/customer/: 1 profiles', out.getvalue())
+        merged = sorted(path.name for path in (self.directory / 'merged').iterdir())
+        self.assertEqual(merged, [
+            'api-sales-customer.collapsed', 'api-sales-customer.pstats',
+            'api-sales-stores.collapsed', 'api-sales-stores.pstats',
+        ])
+
+
+class SlowQueryLogTest(TemporaryMetricsDbMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.log = Path(self.enterContext(tempfile.TemporaryDirectory())) / 'slow_queries.jsonl'
+        # Ngưỡng rất nhỏ để mọi truy vấn đều bị coi là chậm
+        self.enterContext(self.settings(MONITORING_SLOW_QUERY_MS=1e-6, MONITORING_SLOW_QUERY_LOG=str(self.log)))
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_slow_queries_are_logged_with_callers_and_plan(self):
+        self.client.get(reverse('inventory-report'))
+
+        [entry] = [json.loads(line) for line in self.log.read_text().splitlines()]
+        self.assertIn('FROM "stocks"', entry['sql'])
+        self.assertEqual(entry['view'].split(' ')[1], 'InventoryReportView.get')
+        self.assertEqual(entry['caller'].split(' ')[1], 'get_inventory_report_data')
+        self.assertIn('SCAN stocks', entry['plan'])
+
+    def test_report_ranks_statements_by_total_time(self):
+        Store.objects.create(store_id=1, store_name='Store A')
+        for _ in range(3):
+            self.client.get(reverse('store-list'))
+        with self.settings(MONITORING_SLOW_QUERY_MS=0):
+            self.client.get(reverse('inventory-report'))
+
+        out = StringIO()
+        call_command('slow_query_report', stdout=out)
+        output = out.getvalue()
+        self.assertIn('4 slow queries, 2 distinct statements.', output)
+        self.assertIn('3 calls', output)
+        self.assertIn('view: sales/views.py', output)
+        self.assertNotIn('FROM "stocks"', output)
@@ -0,0 +1,123 @@
+"""
+Số liệu thời gian của một yêu cầu: số truy vấn SQL, thời gian cơ sở dữ liệu và thời gian từng giai đoạn
+(view, service, serialize). Yêu cầu đang xử lý được giữ trong một ContextVar nên phase() gọi ở bất kỳ đâu
+trong cùng luồng/coroutine đều cộng vào đúng yêu cầu.
+"""
+import re
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current = ContextVar('request_timings', default=None)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def sql_shape(sql: str) -> str:
+    """
+    Dạng chuẩn của một câu SQL: bỏ hằng số, gộp danh sách IN (%s, %s, ...) và khoảng trắng,
+    để các truy vấn chỉ khác tham số có cùng một dạng.
+    """
+    shape = _STRING_LITERAL.sub('?', sql)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = _PLACEHOLDER_LIST.sub('(...)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+class RequestTimings:
+    """
+    Số liệu của một yêu cầu. Thời gian tính bằng giây; các giai đoạn lồng nhau được tính bao gồm
+    (ví dụ thời gian service đã gồm thời gian truy vấn do service phát ra).
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = defaultdict(float)
+        self.query_count = 0
+        self.db_time = 0.0
+        self.query_shapes = Counter()
+        self.active_phases = set()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def record_query(self, execute, sql, params, many, context):
+        """
+        Hàm bọc dùng với connection.execute_wrapper().
+        """
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.query_count += 1
+            self.query_shapes[sql_shape(sql)] += 1
+
+    def repeated_queries(self, threshold: int) -> list[tuple[str, int]]:
+        """
+        Các dạng truy vấn lặp lại ít nhất threshold lần trong yêu cầu (dấu hiệu N+1), nhiều nhất trước.
+        """
+        if threshold <= 0:
+            return []
+        return [(shape, count) for shape, count in self.query_shapes.most_common() if count >= threshold]
+
+
+def current_timings() -> RequestTimings | None:
+    return _current.get()
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Hàm bọc cài trên mọi kết nối: cộng truy vấn vào yêu cầu đang xử lý, nếu có.
+    """
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings.record_query(execute, sql, params, many, context)
+
+
+def install_query_timing(sender, connection, **kwargs) -> None:
+    """
+    Receiver của connection_created. Hàm bọc nằm trên chính kết nối nên truy vấn của view async (chạy qua
+    sync_to_async trên kết nối của luồng khác) vẫn được tính, vì sync_to_async mang theo ContextVar của yêu cầu.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def tracking_request():
+    """
+    Bắt đầu thu số liệu cho một yêu cầu trong ngữ cảnh hiện tại.
+    """
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def phase(name: str):
+    """
+    Cộng thời gian của khối lệnh vào giai đoạn name của yêu cầu hiện tại (không làm gì ngoài yêu cầu).
+    Giai đoạn lồng trong chính nó (service gọi service) chỉ được tính một lần.
+    """
+    timings = _current.get()
+    if timings is None or name in timings.active_phases:
+        yield
+        return
+    timings.active_phases.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.phases[name] += time.perf_counter() - started
+        timings.active_phases.discard(name)
+
@@ -0,0 +1,13 @@
+from django.http import HttpResponse
+from django.views import View
+
+from .metrics import registry
+
+
+class MetricsView(View):
+    """
+    Metrics của mọi worker theo định dạng văn bản Prometheus.
+    """
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
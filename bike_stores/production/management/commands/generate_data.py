@@ -0,0 +1,73 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from production.synthetic_data import SyntheticDataGenerator, clear_tables
+from report.aggregates import AGGREGATE_REBUILDERS, mark_aggregates_stale
+from report.cache import invalidate_report_cache
+from sales.models import Order
+
+
+class Command(BaseCommand):
+    help = ('Generates a synthetic BikeStores dataset (stores, staff, customers, products, stocks, orders and '
+            'order items) at a configurable scale.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=100_000,
+                            help='Number of orders; each has 1-5 lines, about 2.8 on average (default: 100000).')
+        parser.add_argument('--customers', type=int,
+                            help='Number of customers (default: a quarter of --orders).')
+        parser.add_argument('--products', type=int, default=500, help='Number of products (default: 500).')
+        parser.add_argument('--stores', type=int, default=10, help='Number of stores (default: 10).')
+        parser.add_argument('--staff-per-store', type=int, default=5,
+                            help='Sales staff per store, besides the store manager (default: 5).')
+        parser.add_argument('--start-date', type=date.fromisoformat, default=date(2016, 1, 1),
+                            help='First order date, YYYY-MM-DD (default: 2016-01-01).')
+        parser.add_argument('--years', type=int, default=3, help='Years of orders (default: 3).')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42).')
+        parser.add_argument('--batch-size', type=int, default=50_000,
+                            help='Orders (or customers) written per transaction (default: 50000).')
+        parser.add_argument('--date-format', choices=['int', 'iso'], default='int',
+                            help='Store dates as YYYYMMDD integers like the sample data, or as ISO strings '
+                                 '(default: int).')
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete existing sales, product and report aggregate data first.')
+        parser.add_argument('--skip-aggregates', action='store_true',
+                            help='Do not rebuild the report aggregate tables afterwards.')
+
+    def handle(self, *args, **options):
+        for name in ('orders', 'products', 'stores', 'staff_per_store', 'years', 'batch_size'):
+            if options[name] < 1:
+                raise CommandError(f'--{name.replace("_", "-")} must be at least 1.')
+        customers = options['customers'] or max(options['orders'] // 4, 1)
+
+        if options['clear']:
+            clear_tables()
+        elif Order.objects.exists():
+            raise CommandError('The database already has orders. Use --clear to replace them.')
+
+        generator = SyntheticDataGenerator(
+            orders=options['orders'], customers=customers, products=options['products'],
+            stores=options['stores'], staff_per_store=options['staff_per_store'],
+            start_date=options['start_date'], years=options['years'], seed=options['seed'],
+            batch_size=options['batch_size'], date_format=options['date_format'],
+        )
+        started = time.perf_counter()
+
+        def progress(orders, lines):
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'{orders}/{options["orders"]} orders, {lines} lines ({elapsed:.1f}s)')
+
+        counts = generator.generate(progress)
+        self.stdout.write(self.style.SUCCESS(
+            'Generated ' + ', '.join(f'{count} {table}' for table, count in counts.items())
+            + f' in {time.perf_counter() - started:.1f}s'
+        ))
+
+        if options['skip_aggregates']:
+            mark_aggregates_stale()
+        else:
+            for name, rebuild in AGGREGATE_REBUILDERS.items():
+                self.stdout.write(self.style.SUCCESS(f'Rebuilt {name}: {rebuild()} rows'))
+        invalidate_report_cache()
@@ -1,29 +1,86 @@
 import os
+import time
+
 from django.conf import settings
-from django.core.management.base import BaseCommand
-from django.db import connection, transaction
+from django.core.management.base import BaseCommand, CommandError
+
+from production.sql_loader import SqlFileLoader, SqlLoadError
+from report.aggregates import AGGREGATE_REBUILDERS, mark_aggregates_stale
+from report.cache import invalidate_report_cache
+
 
 class Command(BaseCommand):
-    help = 'Loads initial data from load_data_modified.sql into the database.'
+    help = ('Loads the initial data SQL file (load_data_modified_<language>.sql by default) into the database, '
+            'streaming it in batched transactions and resuming from the last checkpoint after a failure.')
 
-    def handle(self, *args, **options):
-        sql_file_path = os.path.join(settings.BASE_DIR, 'load_data_modified.sql')
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            help='SQL file to load (default: load_data_modified_<language>.sql next to manage.py).',
+        )
+        parser.add_argument(
+            '--language',
+            choices=['vie', 'eng'],
+            default='vie',
+            help='Dataset language when --file is not given (default: vie).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per executemany of consecutive INSERTs into the same table (default: 1000).',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=10000,
+            help='Statements per transaction and checkpoint (default: 10000).',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore the checkpoint and load the file from the beginning.',
+        )
 
+    def handle(self, *args, **options):
+        sql_file_path = options['file'] or os.path.join(
+            settings.BASE_DIR, f'load_data_modified_{options["language"]}.sql'
+        )
         if not os.path.exists(sql_file_path):
-            self.stdout.write(self.style.ERROR(f"Error: SQL file not found at {sql_file_path}"))
-            return
-
-        self.stdout.write(self.style.SUCCESS(f"Attempting to load data from {sql_file_path}..."))
+            raise CommandError(f'SQL file not found at {sql_file_path}')
+        if options['batch_size'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--batch-size and --chunk-size must be at least 1.')
 
-        try:
-            with open(sql_file_path, 'r', encoding='utf-8') as f:
-                sql_script = f.read()
+        started = time.perf_counter()
+        chunks = 0
 
-                with transaction.atomic():
-                    with connection.cursor() as cursor:
-                        cursor.execute(sql_script)
+        def progress(offset, total_size, statements, rows):
+            nonlocal chunks
+            chunks += 1
+            if chunks == 1:
+                # Dữ liệu nạp thẳng bằng SQL: bảng tổng hợp không còn đầy đủ cho tới khi được dựng lại ở cuối lệnh
+                mark_aggregates_stale()
+            percent = offset / total_size * 100 if total_size else 100
+            self.stdout.write(f'{offset}/{total_size} bytes ({percent:.1f}%), {statements} statements, '
+                              f'{rows} rows ({time.perf_counter() - started:.1f}s)')
 
-            self.stdout.write(self.style.SUCCESS('Successfully loaded data from SQL file.'))
+        loader = SqlFileLoader(sql_file_path, batch_size=options['batch_size'], chunk_size=options['chunk_size'],
+                               progress=progress)
+        self.stdout.write(self.style.SUCCESS(f'Loading data from {sql_file_path}...'))
+        try:
+            checkpoint = loader.load(restart=options['restart'])
+        except SqlLoadError as e:
+            raise CommandError(f'{e}\nFix the problem and rerun the command to resume from the last checkpoint.')
 
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f'An error occurred during SQL loading: {e}'))
\ No newline at end of file
+        if not chunks:
+            self.stdout.write(self.style.WARNING(
+                f'{sql_file_path} was already loaded on {checkpoint.updated_at:%Y-%m-%d %H:%M}. '
+                f'Use --restart to load it again.'
+            ))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Loaded {checkpoint.statements} statements ({checkpoint.rows} rows) from {sql_file_path}.'
+        ))
+        for name, rebuild in AGGREGATE_REBUILDERS.items():
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {name}: {rebuild()} rows'))
+        invalidate_report_cache()
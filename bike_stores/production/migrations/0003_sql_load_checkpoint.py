@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-19 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('production', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SqlLoadCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_name', models.CharField(max_length=255, unique=True)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('offset', models.BigIntegerField(default=0)),
+                ('statements', models.BigIntegerField(default=0)),
+                ('rows', models.BigIntegerField(default=0)),
+                ('completed', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'sql_load_checkpoints',
+            },
+        ),
+    ]
@@ -44,4 +44,20 @@ class Stock(models.Model):
 
     class Meta:
         unique_together = ('store_id', 'product_id')
-        db_table = 'stocks'
\ No newline at end of file
+        db_table = 'stocks'
+
+class SqlLoadCheckpoint(models.Model):
+    """
+    Tiến độ nạp một file SQL bằng load_initial_sql, ghi cùng transaction với từng lô dữ liệu:
+    mọi câu lệnh kết thúc trước byte offset đã được commit.
+    """
+    file_name = models.CharField(max_length=255, unique=True)
+    fingerprint = models.CharField(max_length=64)
+    offset = models.BigIntegerField(default=0)
+    statements = models.BigIntegerField(default=0)
+    rows = models.BigIntegerField(default=0)
+    completed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'sql_load_checkpoints'
@@ -0,0 +1,229 @@
+"""
+Nạp file SQL lớn theo luồng.
+
+File được đọc từng dòng và tách thành câu lệnh (bỏ qua chú thích, không tách trong chuỗi). Các câu INSERT liên
+tiếp vào cùng bảng và cùng danh sách cột được gộp thành executemany; mỗi chunk_size câu lệnh là một transaction,
+commit cùng với checkpoint (byte offset đã nạp) trong bảng sql_load_checkpoints. Nạp lại sau lỗi sẽ tiếp tục từ
+checkpoint thay vì chèn lại dữ liệu đã commit.
+"""
+import hashlib
+import re
+from pathlib import Path
+
+from django.db import connection, transaction
+
+from .models import SqlLoadCheckpoint
+
+_TOKENS = re.compile(r"'|\"|;|--|/\*|\*/")
+_INSERT = re.compile(r'\s*INSERT\s+INTO\s+"?(\w+)"?\s*\(([^)]*)\)\s*VALUES\s*', re.IGNORECASE)
+_VALUE = re.compile(r"\s*(?:'((?:[^']|'')*)'|(NULL)\b|([-+]?\d+(\.\d*)?(?:[eE][-+]?\d+)?))\s*", re.IGNORECASE)
+_COLUMN = re.compile(r'\s*"?(\w+)"?\s*')
+_ROW_SEPARATOR = re.compile(r'\s*,?\s*')
+
+
+class SqlLoadError(Exception):
+    pass
+
+
+def iter_statements(stream, offset: int = 0):
+    """
+    Các câu lệnh trong stream (mở ở chế độ nhị phân, đã seek tới offset) kèm byte offset ngay sau dấu ';'.
+    Chú thích -- và /* */ bị bỏ; câu lệnh cuối không có ';' vẫn được trả về.
+    """
+    parts = []
+    quote = None
+    in_comment = False
+    for raw_line in stream:
+        line = raw_line.decode('utf-8')
+        position = 0
+        segment_start = 0
+        while True:
+            match = _TOKENS.search(line, position)
+            if match is None:
+                break
+            token = match.group()
+            position = match.end()
+            if in_comment:
+                if token == '*/':
+                    in_comment = False
+                    segment_start = position
+            elif quote is not None:
+                if token == quote:
+                    quote = None
+            elif token in ("'", '"'):
+                quote = token
+            elif token == '--':
+                parts.append(line[segment_start:match.start()])
+                segment_start = position = len(line)
+            elif token == '/*':
+                parts.append(line[segment_start:match.start()])
+                in_comment = True
+            elif token == ';':
+                parts.append(line[segment_start:match.start()])
+                statement = ''.join(parts).strip()
+                parts = []
+                segment_start = position
+                if statement:
+                    yield statement, offset + len(line[:position].encode('utf-8'))
+        if not in_comment:
+            parts.append(line[segment_start:])
+        offset += len(raw_line)
+    statement = ''.join(parts).strip()
+    if statement:
+        yield statement, offset
+
+
+def parse_insert(statement: str) -> tuple[str, tuple[str, ...], list[tuple]] | None:
+    """
+    (bảng, cột, các dòng giá trị) của câu INSERT ... VALUES chỉ chứa hằng số (chuỗi, số, NULL),
+    None với các câu lệnh khác (được thực thi nguyên văn).
+    """
+    header = _INSERT.match(statement)
+    if header is None:
+        return None
+    columns = []
+    for column in header.group(2).split(','):
+        match = _COLUMN.fullmatch(column)
+        if match is None:
+            return None
+        columns.append(match.group(1))
+
+    rows = []
+    position = header.end()
+    while True:
+        if not statement.startswith('(', position):
+            return None
+        position += 1
+        row = []
+        while True:
+            match = _VALUE.match(statement, position)
+            if match is None:
+                return None
+            string, null, number, fraction = match.groups()
+            if string is not None:
+                row.append(string.replace("''", "'"))
+            elif null is not None:
+                row.append(None)
+            else:
+                row.append(float(number) if fraction or 'e' in number.lower() else int(number))
+            position = match.end()
+            if statement.startswith(',', position):
+                position += 1
+            elif statement.startswith(')', position):
+                position += 1
+                break
+            else:
+                return None
+        if len(row) != len(columns):
+            return None
+        rows.append(tuple(row))
+        separator = _ROW_SEPARATOR.match(statement, position)
+        if separator.end() == len(statement):
+            return header.group(1), tuple(columns), rows
+        if ',' not in separator.group():
+            return None
+        position = separator.end()
+
+
+def file_fingerprint(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as stream:
+        for block in iter(lambda: stream.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SqlFileLoader:
+    """
+    Nạp một file SQL. progress(offset, kích thước file, số câu lệnh, số dòng) được gọi sau mỗi transaction.
+    """
+
+    def __init__(self, path, batch_size: int = 1000, chunk_size: int = 10000, progress=None):
+        self.path = Path(path).resolve()
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self._batch_key = None
+        self._batch = []
+
+    def _flush(self, cursor) -> None:
+        if not self._batch:
+            return
+        table, columns = self._batch_key
+        cursor.executemany('INSERT INTO {} ({}) VALUES ({})'.format(
+            connection.ops.quote_name(table),
+            ', '.join(connection.ops.quote_name(column) for column in columns),
+            ', '.join(['%s'] * len(columns)),
+        ), self._batch)
+        self._batch = []
+
+    def _execute(self, cursor, statement: str) -> int:
+        """
+        Đưa câu lệnh vào lô executemany hiện tại (INSERT hằng số) hoặc thực thi ngay. Trả về số dòng INSERT.
+        """
+        insert = parse_insert(statement)
+        if insert is None:
+            self._flush(cursor)
+            cursor.execute(statement)
+            return 0
+        table, columns, rows = insert
+        if (table, columns) != self._batch_key:
+            self._flush(cursor)
+            self._batch_key = (table, columns)
+        self._batch.extend(rows)
+        if len(self._batch) >= self.batch_size:
+            self._flush(cursor)
+        return len(rows)
+
+    def load(self, restart: bool = False) -> SqlLoadCheckpoint:
+        """
+        Nạp file từ checkpoint (hoặc từ đầu với restart=True) và trả về checkpoint sau cùng.
+        File đã nạp xong thì không làm gì.
+        """
+        fingerprint = file_fingerprint(self.path)
+        total_size = self.path.stat().st_size
+        checkpoint, _ = SqlLoadCheckpoint.objects.get_or_create(
+            file_name=str(self.path), defaults={'fingerprint': fingerprint}
+        )
+        if restart:
+            checkpoint.fingerprint, checkpoint.offset, checkpoint.statements = fingerprint, 0, 0
+            checkpoint.rows, checkpoint.completed = 0, False
+            checkpoint.save()
+        elif checkpoint.fingerprint != fingerprint:
+            raise SqlLoadError(
+                f'{self.path.name} đã thay đổi kể từ lần nạp trước (checkpoint tại byte {checkpoint.offset}). '
+                f'Dùng --restart để nạp lại từ đầu.'
+            )
+        if checkpoint.completed:
+            return checkpoint
+
+        self._batch_key, self._batch = None, []
+        with open(self.path, 'rb') as stream:
+            stream.seek(checkpoint.offset)
+            statements = iter_statements(stream, checkpoint.offset)
+            while not checkpoint.completed:
+                chunk_statements = chunk_rows = 0
+                end = checkpoint.offset
+                try:
+                    with transaction.atomic(), connection.cursor() as cursor:
+                        for statement, end in statements:
+                            chunk_rows += self._execute(cursor, statement)
+                            chunk_statements += 1
+                            if chunk_statements >= self.chunk_size:
+                                break
+                        self._flush(cursor)
+                        checkpoint.offset = end
+                        checkpoint.statements += chunk_statements
+                        checkpoint.rows += chunk_rows
+                        checkpoint.completed = chunk_statements < self.chunk_size
+                        checkpoint.save()
+                except Exception as e:
+                    # Cả transaction đã rollback: checkpoint vẫn ở cuối transaction trước
+                    checkpoint.refresh_from_db()
+                    raise SqlLoadError(
+                        f'Lỗi trong các câu lệnh {checkpoint.statements + 1}-'
+                        f'{checkpoint.statements + chunk_statements + 1} (từ byte {checkpoint.offset}): {e}'
+                    ) from e
+                if self.progress is not None:
+                    self.progress(checkpoint.offset, total_size, checkpoint.statements, checkpoint.rows)
+        return checkpoint
@@ -0,0 +1,312 @@
+"""
+Sinh dữ liệu giả cho lược đồ BikeStores ở quy mô lớn (tới hàng chục triệu dòng order_items).
+
+Phân phối có độ lệch như dữ liệu thật: khách hàng theo Pareto (số ít khách mua phần lớn), sản phẩm bán chạy
+theo Zipf, ngày đặt hàng theo mùa (cao điểm giữa năm, cuối tuần đông hơn, tăng dần theo năm). Cùng seed cho
+cùng dữ liệu. Đơn hàng được sinh và ghi theo từng lô bằng numpy + executemany, mỗi lô một transaction.
+"""
+import unicodedata
+from datetime import date, timedelta
+from functools import lru_cache
+
+import numpy as np
+from django.db import connection, transaction
+
+BRANDS = ['Electra', 'Haro', 'Heller', 'Pure Cycles', 'Ritchey', 'Strider', 'Sun Bicycles', 'Surly', 'Trek']
+CATEGORIES = ['Children Bicycles', 'Comfort Bicycles', 'Cruisers Bicycles', 'Cyclocross Bicycles',
+              'Electric Bikes', 'Mountain Bikes', 'Road Bikes']
+SERIES = ['Domane', 'Fuel EX', 'Marlin', 'Verve', 'Townie', 'Cruiser', 'Timberwolf', 'Wednesday', 'Straggler',
+          'Precaliber', 'Powerfly', 'Emonda', 'Madone', 'Checkpoint', 'Roscoe', 'Downtown', 'Revel', 'Kids']
+
+LAST_NAMES = ['Nguyễn', 'Trần', 'Lê', 'Phạm', 'Hoàng', 'Huỳnh', 'Phan', 'Vũ', 'Võ', 'Đặng', 'Bùi', 'Đỗ',
+              'Hồ', 'Ngô', 'Dương', 'Lý', 'Cao', 'Đào', 'Vương', 'Trịnh']
+MIDDLE_NAMES = ['Văn', 'Thị', 'Đức', 'Thu', 'Minh', 'Thành', 'Ngọc', 'Quốc', 'Hoài', 'Gia', 'Thanh', 'Hữu']
+FIRST_NAMES = ['An', 'Bình', 'Cường', 'Dũng', 'Giang', 'Hà', 'Hạnh', 'Hùng', 'Hương', 'Khánh', 'Lan', 'Linh',
+               'Long', 'Mai', 'Nam', 'Như', 'Oanh', 'Phương', 'Quân', 'Sơn', 'Thảo', 'Trang', 'Tuấn', 'Tuyết',
+               'Vy', 'Yến']
+EMAIL_DOMAINS = ['gmail.com', 'yahoo.com', 'hotmail.com', 'aol.com', 'msn.com']
+STREETS = ['Lê Duẩn', 'Điện Biên Phủ', 'Lê Lợi', 'Cách Mạng Tháng 8', 'Bùi Viện', 'Nguyễn Huệ', 'Trần Hưng Đạo',
+           'Hai Bà Trưng', 'Lý Thường Kiệt', 'Nguyễn Trãi', 'Võ Văn Tần', 'Pasteur']
+DISTRICTS = {
+    'Hà Nội': ['Hoàng Mai', 'Ba Đình', 'Cầu Giấy', 'Đống Đa', 'Hai Bà Trưng'],
+    'TP. Hồ Chí Minh': ['Bình Thạnh', 'Tân Bình', 'Quận 1', 'Quận 3', 'Quận 7', 'Gò Vấp'],
+    'Đà Nẵng': ['Hải Châu', 'Thanh Khê', 'Sơn Trà', 'Ngũ Hành Sơn'],
+    'Hải Phòng': ['Lê Chân', 'Ngô Quyền', 'Hồng Bàng'],
+    'Cần Thơ': ['Ninh Kiều', 'Cái Răng', 'Bình Thủy'],
+}
+CITIES = list(DISTRICTS)
+DISCOUNTS = (0.05, 0.07, 0.1, 0.2)
+
+# Bảng bị xóa khi sinh lại dữ liệu, bảng phụ thuộc trước
+CLEARED_TABLES = [
+    'product_recommendations', 'product_affinity', 'sales_cube', 'customer_stats', 'order_status_counters',
+    'aggregate_builds', 'report_snapshots', 'order_items', 'orders', 'stocks', 'staffs', 'customers', 'products',
+    'brands', 'categories', 'stores',
+]
+
+INSERTS = {
+    'stores': ('store_id', 'store_name', 'phone', 'email', 'street', 'city', 'district', 'zip_code'),
+    'staffs': ('staff_id', 'first_name', 'last_name', 'email', 'phone', 'active', 'store_id', 'manager_id'),
+    'customers': ('customer_id', 'first_name', 'last_name', 'email', 'phone', 'street', 'city', 'district',
+                  'zip_code'),
+    'brands': ('brand_id', 'brand_name'),
+    'categories': ('category_id', 'category_name'),
+    'products': ('product_id', 'product_name', 'brand_id', 'category_id', 'model_year', 'list_price'),
+    'stocks': ('store_id', 'product_id', 'quantity'),
+    'orders': ('order_id', 'order_status', 'order_date', 'required_date', 'shipped_date', 'customer_id',
+               'staff_id', 'store_id'),
+    'order_items': ('order_id', 'item_id', 'product_id', 'quantity', 'list_price', 'discount'),
+}
+
+
+@lru_cache(maxsize=None)
+def ascii_name(text: str) -> str:
+    """
+    Bỏ dấu tiếng Việt để dùng trong email ('Đặng' -> 'dang').
+    """
+    text = text.replace('Đ', 'D').replace('đ', 'd')
+    return ''.join(ch for ch in unicodedata.normalize('NFKD', text) if not unicodedata.combining(ch)).lower()
+
+
+def insert_rows(table: str, rows: list[tuple]) -> None:
+    columns = INSERTS[table]
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        connection.ops.quote_name(table),
+        ', '.join(connection.ops.quote_name(column) for column in columns),
+        ', '.join(['%s'] * len(columns)),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def _probabilities(weights: np.ndarray) -> np.ndarray:
+    return weights / weights.sum()
+
+
+def _cdf(weights: np.ndarray) -> np.ndarray:
+    # Lấy mẫu theo trọng số bằng np.searchsorted(cdf, rng.random(n)), không phải dựng lại bảng mỗi lô
+    cdf = np.cumsum(weights, dtype=np.float64)
+    return cdf / cdf[-1]
+
+
+class SyntheticDataGenerator:
+    """
+    Sinh toàn bộ dữ liệu bằng generate(). Mã cửa hàng, nhân viên, khách hàng, sản phẩm và đơn hàng đánh số
+    liên tục từ 1; đơn hàng được đánh số theo thứ tự ngày đặt.
+
+    date_format: 'int' ghi ngày dạng số YYYYMMDD như dữ liệu mẫu, 'iso' ghi 'YYYY-MM-DD' như ORM.
+    """
+
+    def __init__(self, orders: int, customers: int, products: int, stores: int, staff_per_store: int,
+                 start_date: date, years: int, seed: int = 42, batch_size: int = 50_000, date_format: str = 'int'):
+        self.order_count = orders
+        self.customer_count = customers
+        self.product_count = products
+        self.store_count = stores
+        self.staff_per_store = staff_per_store
+        self.start_date = start_date
+        self.days = (date(start_date.year + years, start_date.month, start_date.day) - start_date).days
+        self.batch_size = batch_size
+        self.date_format = date_format
+        self.rng = np.random.default_rng(seed)
+
+    def _date_values(self) -> np.ndarray:
+        # Giá trị ghi vào cơ sở dữ liệu của từng ngày, thêm vài ngày sau cùng cho required/shipped_date
+        days = [self.start_date + timedelta(days=offset) for offset in range(self.days + 10)]
+        if self.date_format == 'iso':
+            return np.array([day.isoformat() for day in days], dtype=object)
+        return np.array([day.year * 10000 + day.month * 100 + day.day for day in days], dtype=np.int64)
+
+    def _day_weights(self) -> np.ndarray:
+        """
+        Trọng số theo mùa của từng ngày: cao điểm giữa năm, cuối tuần đông hơn, tăng 15% mỗi năm.
+        """
+        offsets = np.arange(self.days)
+        ordinals = self.start_date.toordinal() + offsets
+        day_of_year = np.array([date.fromordinal(int(ordinal)).timetuple().tm_yday for ordinal in ordinals])
+        seasonal = 1 + 0.35 * np.cos(2 * np.pi * (day_of_year - 172) / 365.25)
+        # toordinal() % 7: 0 là Chủ nhật, 6 là thứ Bảy
+        weekend = np.where(np.isin(ordinals % 7, (0, 6)), 1.25, 1.0)
+        growth = 1.15 ** (offsets / 365.25)
+        return seasonal * weekend * growth
+
+    def _person_names(self, count: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        rng = self.rng
+        return (rng.integers(0, len(FIRST_NAMES), count), rng.integers(0, len(LAST_NAMES), count),
+                rng.integers(0, len(MIDDLE_NAMES), count))
+
+    def _phones(self, count: int) -> list[str]:
+        return [f'0{number:09d}' for number in self.rng.integers(300_000_000, 1_000_000_000, count).tolist()]
+
+    def _addresses(self, count: int) -> list[tuple[str, str, str, str]]:
+        rng = self.rng
+        cities = rng.integers(0, len(CITIES), count).tolist()
+        districts = rng.integers(0, 100, count).tolist()
+        numbers = rng.integers(1, 1000, count).tolist()
+        streets = rng.integers(0, len(STREETS), count).tolist()
+        zip_codes = rng.integers(100_000, 1_000_000, count).tolist()
+        addresses = []
+        for city, district, number, street, zip_code in zip(cities, districts, numbers, streets, zip_codes):
+            city_name = CITIES[city]
+            city_districts = DISTRICTS[city_name]
+            addresses.append((f'{number} {STREETS[street]}', city_name,
+                              city_districts[district % len(city_districts)], str(zip_code)))
+        return addresses
+
+    def generate_catalog(self) -> dict[str, int]:
+        """
+        Cửa hàng, nhân viên (người đứng đầu -> quản lý cửa hàng -> nhân viên bán hàng), nhãn hàng, danh mục,
+        sản phẩm và tồn kho.
+        """
+        rng = self.rng
+        insert_rows('brands', list(enumerate(BRANDS, start=1)))
+        insert_rows('categories', list(enumerate(CATEGORIES, start=1)))
+
+        stores = []
+        for store_id, (street, city, district, zip_code), phone in zip(
+                range(1, self.store_count + 1), self._addresses(self.store_count), self._phones(self.store_count)):
+            if len(district) > 10:  # stores.district chỉ dài 10 ký tự
+                district = DISTRICTS[city][0]
+            stores.append((store_id, f'{district} Bikes {store_id}', phone, f'store{store_id}@bikes.shop', street,
+                           city, district, zip_code))
+        insert_rows('stores', stores)
+
+        # Nhân viên 1 đứng đầu chuỗi; mỗi cửa hàng một quản lý báo cáo cho nhân viên 1 và staff_per_store
+        # nhân viên bán hàng báo cáo cho quản lý cửa hàng
+        staff_count = 1 + self.store_count * (1 + self.staff_per_store)
+        first, last, _ = self._person_names(staff_count)
+        active = rng.random(staff_count) >= 0.05
+        phones = self._phones(staff_count)
+        staff_rows = []
+        self.sellers = np.empty((self.store_count, self.staff_per_store), dtype=np.int64)
+        hierarchy = [(1, 1, None)]
+        for store in range(self.store_count):
+            manager_id = 2 + store * (1 + self.staff_per_store)
+            hierarchy.append((manager_id, store + 1, 1))
+            for seller in range(self.staff_per_store):
+                self.sellers[store, seller] = manager_id + 1 + seller
+                hierarchy.append((manager_id + 1 + seller, store + 1, manager_id))
+        for staff_id, store_id, manager_id in hierarchy:
+            index = staff_id - 1
+            first_name, last_name = FIRST_NAMES[first[index]], LAST_NAMES[last[index]]
+            staff_rows.append((staff_id, first_name, last_name,
+                               f'{ascii_name(first_name)}.{ascii_name(last_name)}{staff_id}@bikes.shop',
+                               phones[index], bool(active[index] or staff_id == 1), store_id, manager_id))
+        insert_rows('staffs', staff_rows)
+
+        # Giá niêm yết theo phân phối log-normal quanh 15 triệu đồng
+        brands = rng.integers(1, len(BRANDS) + 1, self.product_count)
+        categories = rng.integers(1, len(CATEGORIES) + 1, self.product_count)
+        series = rng.integers(0, len(SERIES), self.product_count)
+        numbers = rng.integers(1, 10, self.product_count) * 100 + rng.integers(0, 100, self.product_count)
+        years = rng.integers(self.start_date.year, self.start_date.year + max(self.days // 365, 1),
+                             self.product_count)
+        self.prices = np.round(rng.lognormal(np.log(15_000_000), 0.8, self.product_count), 2)
+        insert_rows('products', [
+            (product_id, f'{BRANDS[brand - 1]} {SERIES[serie]} {number} - {year}', brand, category, year, price)
+            for product_id, brand, category, serie, number, year, price in zip(
+                range(1, self.product_count + 1), brands.tolist(), categories.tolist(), series.tolist(),
+                numbers.tolist(), years.tolist(), self.prices.tolist())
+        ])
+
+        stocked = rng.random((self.store_count, self.product_count)) < 0.8
+        store_index, product_index = np.nonzero(stocked)
+        quantities = rng.integers(0, 31, len(store_index))
+        insert_rows('stocks', list(zip((store_index + 1).tolist(), (product_index + 1).tolist(), quantities.tolist())))
+
+        return {'stores': self.store_count, 'staffs': staff_count, 'brands': len(BRANDS),
+                'categories': len(CATEGORIES), 'products': self.product_count, 'stocks': len(store_index)}
+
+    def generate_customers(self) -> int:
+        for start in range(0, self.customer_count, self.batch_size):
+            count = min(self.batch_size, self.customer_count - start)
+            first, last, middle = self._person_names(count)
+            domains = self.rng.integers(0, len(EMAIL_DOMAINS), count).tolist()
+            rows = []
+            for offset, (first_index, last_index, middle_index, domain, phone, address) in enumerate(zip(
+                    first.tolist(), last.tolist(), middle.tolist(), domains, self._phones(count),
+                    self._addresses(count))):
+                customer_id = start + offset + 1
+                first_name = FIRST_NAMES[first_index]
+                last_name = f'{LAST_NAMES[last_index]} {MIDDLE_NAMES[middle_index]}'
+                email = f'{ascii_name(first_name)}{ascii_name(LAST_NAMES[last_index])}{customer_id}@' \
+                        f'{EMAIL_DOMAINS[domain]}'
+                rows.append((customer_id, first_name, last_name, email, phone, *address))
+            with transaction.atomic():
+                insert_rows('customers', rows)
+        return self.customer_count
+
+    def generate_orders(self, progress=None) -> tuple[int, int]:
+        """
+        Đơn hàng và order_items theo từng lô batch_size đơn. progress(số đơn đã ghi, số dòng đã ghi) được
+        gọi sau mỗi lô. Trả về (số đơn, số dòng).
+        """
+        rng = self.rng
+        date_values = self._date_values()
+        # Số đơn của từng ngày theo trọng số mùa, rồi trải ra theo thứ tự ngày
+        orders_per_day = rng.multinomial(self.order_count, _probabilities(self._day_weights()))
+        order_days = np.repeat(np.arange(self.days), orders_per_day)
+
+        # Trọng số Pareto (alpha 1.16 ~ quy tắc 80/20), chặn trên để không có một khách chiếm áp đảo
+        customer_cdf = _cdf(np.minimum(rng.pareto(1.16, self.customer_count) + 1, 1000))
+        product_cdf = _cdf(rng.permutation(1 / np.arange(1, self.product_count + 1) ** 0.8))
+        store_cdf = _cdf(rng.uniform(0.5, 1.5, self.store_count))
+
+        line_count = 0
+        for start in range(0, self.order_count, self.batch_size):
+            days = order_days[start:start + self.batch_size]
+            count = len(days)
+            order_ids = np.arange(start + 1, start + count + 1)
+            stores = np.searchsorted(store_cdf, rng.random(count))
+            staffs = self.sellers[stores, rng.integers(0, self.staff_per_store, count)]
+            customers = np.searchsorted(customer_cdf, rng.random(count)) + 1
+
+            # Đơn gần cuối khoảng thời gian còn đang chờ/đang xử lý, còn lại phần lớn đã hoàn thành
+            age = self.days - 1 - days
+            roll = rng.random(count)
+            statuses = np.where(roll < 0.03, 3, 4)
+            statuses = np.where((age <= 7) & (roll >= 0.03) & (roll < 0.3), 2, statuses)
+            statuses = np.where((age <= 2) & (roll >= 0.03) & (roll < 0.5), 1, statuses)
+            statuses = np.where((age <= 2) & (roll >= 0.5) & (roll < 0.95), 2, statuses)
+            required = days + rng.integers(2, 6, count)
+            shipped = days + rng.integers(1, 4, count)
+            shipped_values = np.where(statuses == 4, date_values[shipped].astype(object), None)
+
+            orders = list(zip(order_ids.tolist(), statuses.tolist(), date_values[days].tolist(),
+                              date_values[required].tolist(), shipped_values.tolist(), customers.tolist(),
+                              staffs.tolist(), (stores + 1).tolist()))
+
+            lines_per_order = 1 + rng.binomial(4, 0.45, count)
+            line_orders = np.repeat(order_ids, lines_per_order)
+            item_ids = np.arange(len(line_orders)) - np.repeat(np.cumsum(lines_per_order) - lines_per_order,
+                                                               lines_per_order) + 1
+            products = np.searchsorted(product_cdf, rng.random(len(line_orders)))
+            quantities = 1 + rng.binomial(1, 0.5, len(line_orders))
+            discounts = np.array(DISCOUNTS)[rng.integers(0, len(DISCOUNTS), len(line_orders))]
+            items = list(zip(line_orders.tolist(), item_ids.tolist(), (products + 1).tolist(), quantities.tolist(),
+                             self.prices[products].tolist(), discounts.tolist()))
+
+            with transaction.atomic():
+                insert_rows('orders', orders)
+                insert_rows('order_items', items)
+            line_count += len(items)
+            if progress is not None:
+                progress(start + count, line_count)
+        return self.order_count, line_count
+
+    def generate(self, progress=None) -> dict[str, int]:
+        counts = {}
+        with transaction.atomic():
+            counts.update(self.generate_catalog())
+        counts['customers'] = self.generate_customers()
+        counts['orders'], counts['order_items'] = self.generate_orders(progress)
+        return counts
+
+
+def clear_tables() -> None:
+    """
+    Xóa dữ liệu bán hàng, sản phẩm và các bảng tổng hợp phụ thuộc.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        for table in CLEARED_TABLES:
+            cursor.execute(f'DELETE FROM {connection.ops.quote_name(table)}')
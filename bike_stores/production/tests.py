@@ -3,8 +3,20 @@ from django.urls import reverse
 from decimal import Decimal
 from production.models import Category, Brand, Product, Stock
 from sales.models import Store
+from events.models import OutboxEvent
+from report.aggregates import is_aggregate_built, rebuild_customer_stats
+from report.models import ProductRecommendation
+from report.recommendations import reset_recommendation_index
 from django.contrib.auth.models import User
 from django.urls import reverse
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from io import StringIO
+from sales.models import Order, OrderItem, Staff
+from production.models import SqlLoadCheckpoint
+from production.sql_loader import iter_statements, parse_insert
+import tempfile
+from pathlib import Path
 
 import json
 
@@ -533,6 +545,27 @@ class ProductionAPITests(TestCase):
         self.assertEqual(Product.objects.count(), initial_product_count - 1)
         self.assertFalse(Product.objects.filter(product_id=temp_product_to_delete.product_id).exists())
 
+    def test_product_delete_records_cascaded_events(self):
+        """
+        Xóa sản phẩm ghi sự kiện 'deleted' cho các dòng hàng và tồn kho bị xóa dây chuyền.
+        """
+        product_id = self.product_ritchey.product_id
+        items = list(OrderItem.objects.filter(product_id=product_id)
+                     .order_by('order_id', 'item_id').values_list('order_id', 'item_id'))
+        stores = list(Stock.objects.filter(product_id=product_id)
+                      .order_by('store_id').values_list('store_id', flat=True))
+        self.assertTrue(items)
+        self.assertTrue(stores)
+
+        response = self.client.delete(reverse('product-detail', args=[product_id]))
+        self.assertEqual(response.status_code, 200)
+        events = list(OutboxEvent.objects.order_by('id').values_list('event_type', 'action', 'aggregate_id'))
+        self.assertEqual(events, [
+            *[('order_item', 'deleted', f'{order_id}:{item_id}') for order_id, item_id in items],
+            *[('stock', 'deleted', f'{store_id}:{product_id}') for store_id in stores],
+            ('product', 'deleted', str(product_id)),
+        ])
+
     def test_product_delete_not_found(self):
         """
         Kiểm tra DELETE /api/production/products/<product_id>/ cho sản phẩm không tồn tại.
@@ -804,6 +837,36 @@ class ProductionAPITests(TestCase):
         response = self.client.delete(reverse('stock-detail', args=[999999, 999999])) # Cặp không tồn tại
         self.assertEqual(response.status_code, 404)
         self.assertIn('Bản ghi tồn kho không tồn tại', response.json()['error'])
+
+    # --- Test case cho gợi ý sản phẩm ---
+    def test_product_recommendations_served_from_memory(self):
+        """
+        Kiểm tra GET /api/production/products/<product_id>/recommendations/.
+        Expected trả về danh sách gợi ý theo thứ hạng, lần gọi sau không truy vấn cơ sở dữ liệu.
+        """
+        ProductRecommendation.objects.create(
+            product_id=self.product_trek_820, recommended_product_id=self.product_ritchey, rank=1, score=0.8
+        )
+        ProductRecommendation.objects.create(
+            product_id=self.product_trek_820, recommended_product_id=self.product_trek_slash8, rank=2, score=0.5
+        )
+        reset_recommendation_index()
+        self.addCleanup(reset_recommendation_index)
+
+        url = reverse('product-recommendations', args=[self.product_trek_820.product_id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['product_id'] for item in response.json()['recommendations']],
+            [self.product_ritchey.product_id, self.product_trek_slash8.product_id]
+        )
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'limit': 1})
+        self.assertEqual(len(response.json()['recommendations']), 1)
+
+        response = self.client.get(reverse('product-recommendations', args=[999999]))
+        self.assertEqual(response.status_code, 404)
         
 class ProductionAdminTests(TestCase):
     """
@@ -944,4 +1007,107 @@ class ProductionAdminTests(TestCase):
 
         # Kết quả chỉ nên chứa cửa hàng 'Rowlett Bikes'
         self.assertContains(response, 'Rowlett Bikes')
-        self.assertNotContains(response, 'Santa Cruz Bikes')
\ No newline at end of file
+        self.assertNotContains(response, 'Santa Cruz Bikes')
+
+
+class GenerateDataCommandTests(TestCase):
+
+    def _generate(self, **options):
+        options = {'orders': 300, 'products': 20, 'stores': 2, 'staff_per_store': 2, 'years': 1,
+                   'batch_size': 128, 'seed': 7, 'stdout': StringIO(), **options}
+        call_command('generate_data', **options)
+
+    def _snapshot(self):
+        return (list(Order.objects.values_list('order_id', 'order_date', 'customer_id', 'store_id', 'staff_id')),
+                list(OrderItem.objects.values_list('order_id', 'item_id', 'product_id', 'quantity')))
+
+    def test_generates_consistent_dataset(self):
+        self._generate()
+
+        self.assertEqual(Order.objects.count(), 300)
+        self.assertEqual(Product.objects.count(), 20)
+        # Người đứng đầu + (quản lý + 2 nhân viên) cho mỗi cửa hàng
+        self.assertEqual(Staff.objects.count(), 7)
+        self.assertEqual(Staff.objects.filter(manager_id__isnull=True).count(), 1)
+        for order in Order.objects.all()[:50]:
+            # Nhân viên bán hàng thuộc đúng cửa hàng của đơn và item_id đánh số liên tục từ 1
+            self.assertEqual(order.staff_id.store_id_id, order.store_id_id)
+            item_ids = list(OrderItem.objects.filter(order_id=order).order_by('item_id')
+                            .values_list('item_id', flat=True))
+            self.assertEqual(item_ids, list(range(1, len(item_ids) + 1)))
+
+    def test_same_seed_gives_same_data(self):
+        self._generate()
+        first = self._snapshot()
+
+        # Đã có dữ liệu: phải dùng --clear
+        with self.assertRaises(CommandError):
+            self._generate()
+
+        self._generate(clear=True)
+        self.assertEqual(self._snapshot(), first)
+        self._generate(clear=True, seed=8)
+        self.assertNotEqual(self._snapshot(), first)
+
+
+class LoadInitialSqlCommandTests(TestCase):
+
+    SQL = """/* Dữ liệu mẫu; có dấu ; trong chú thích */
+-- Brands --
+INSERT INTO brands(brand_id,brand_name) VALUES(1,'Electra');
+INSERT INTO brands(brand_id,brand_name) VALUES(2,'Girl''s; Bikes'), (3, 'Haro');
+INSERT INTO categories(category_id, category_name) VALUES(1, 'Road Bikes');
+INSERT INTO brands(brand_id,brand_name) VALUES(4,'Trek'); UPDATE brands SET brand_name = 'Heller' WHERE brand_id = 3;
+INSERT INTO brands(brand_id,brand_name) VALUES(5,'Surly');
+"""
+
+    def setUp(self):
+        self.path = Path(self.enterContext(tempfile.TemporaryDirectory())) / 'data.sql'
+        self.path.write_text(self.SQL, encoding='utf-8')
+
+    def test_statements_are_split_outside_strings_and_comments(self):
+        with open(self.path, 'rb') as stream:
+            statements = list(iter_statements(stream))
+        self.assertEqual(len(statements), 6)
+        self.assertEqual(statements[1][0],
+                         "INSERT INTO brands(brand_id,brand_name) VALUES(2,'Girl''s; Bikes'), (3, 'Haro')")
+        # Offset trỏ ngay sau dấu ';' của câu lệnh
+        self.assertTrue(self.path.read_bytes()[:statements[3][1]].decode('utf-8').endswith("'Trek');"))
+
+        self.assertEqual(parse_insert(statements[1][0]),
+                         ('brands', ('brand_id', 'brand_name'), [(2, "Girl's; Bikes"), (3, 'Haro')]))
+        self.assertEqual(parse_insert("INSERT INTO t(a, b, c) VALUES(NULL, -1.5, '')"),
+                         ('t', ('a', 'b', 'c'), [(None, -1.5, '')]))
+        self.assertIsNone(parse_insert(statements[4][0]))
+        self.assertIsNone(parse_insert("INSERT INTO t(a) VALUES(lower('X'))"))
+
+    def test_resumes_from_checkpoint_after_failure(self):
+        # Brand 5 đã có: lô thứ hai (câu lệnh 5-6) lỗi, lô đầu đã được commit
+        Brand.objects.create(brand_id=5, brand_name='Đã có')
+        rebuild_customer_stats()
+        with self.assertRaises(CommandError):
+            call_command('load_initial_sql', file=str(self.path), chunk_size=4, stdout=StringIO())
+        self.assertEqual(sorted(Brand.objects.values_list('brand_id', flat=True)), [1, 2, 3, 4, 5])
+        # Dữ liệu đã nạp một phần: customer_stats không còn được coi là đầy đủ
+        self.assertFalse(is_aggregate_built('customer_stats'))
+        checkpoint = SqlLoadCheckpoint.objects.get()
+        self.assertEqual((checkpoint.statements, checkpoint.rows, checkpoint.completed), (4, 5, False))
+
+        # Lần chạy sau chỉ nạp phần còn lại (nạp lại lô đầu sẽ trùng khóa chính)
+        Brand.objects.filter(brand_id=5).delete()
+        out = StringIO()
+        call_command('load_initial_sql', file=str(self.path), chunk_size=4, stdout=out)
+        self.assertIn('Loaded 6 statements (6 rows)', out.getvalue())
+        self.assertTrue(is_aggregate_built('customer_stats'))
+        self.assertEqual(Brand.objects.get(brand_id=3).brand_name, 'Heller')
+        self.assertEqual(Brand.objects.get(brand_id=5).brand_name, 'Surly')
+        self.assertEqual(Category.objects.get().category_name, 'Road Bikes')
+
+        out = StringIO()
+        call_command('load_initial_sql', file=str(self.path), stdout=out)
+        self.assertIn('already loaded', out.getvalue())
+
+        # File đổi nội dung: phải dùng --restart
+        self.path.write_text(self.SQL + "INSERT INTO brands(brand_id,brand_name) VALUES(6,'Sun');\n", encoding='utf-8')
+        with self.assertRaises(CommandError):
+            call_command('load_initial_sql', file=str(self.path), stdout=StringIO())
@@ -2,6 +2,7 @@ from django.urls import path
 from .views import (
     ProductListView,
     ProductDetailView,
+    ProductRecommendationsView,
     StockListView,
     StockDetailView,
 )
@@ -20,6 +21,12 @@ urlpatterns = [
         name="product-detail"
     ),  # GET: detail, PATCH: update, DELETE: delete
 
+    path(
+        "products/<int:product_id>/recommendations/",
+        ProductRecommendationsView.as_view(),
+        name="product-recommendations"
+    ),  # GET: "customers who bought X also bought"
+
     # Stock API
     path(
         "stocks/",
@@ -1,12 +1,17 @@
 from django.views import View
-from django.http import JsonResponse
 from django.core.exceptions import ValidationError
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
-from django.db import IntegrityError, models
+from django.db import IntegrityError, models, transaction
 from decimal import Decimal, InvalidOperation
 from .models import Category, Brand, Product, Stock
-from sales.models import Store
+from sales.models import Store, OrderItem
+from report.aggregates import refreshing_order_aggregates
+from report.cache import invalidate_report_cache
+from events.outbox import record_change
+from sales.cascades import record_cascaded_item_deletes, record_cascaded_stock_deletes
+from monitoring.http import JsonResponse
+from report.recommendations import get_recommendation_index
 
 import json
 
@@ -99,14 +104,23 @@ class ProductListView(View):
             except Category.DoesNotExist:
                 return JsonResponse({'error': f"Category với ID '{data.get('category_id')}' không tồn tại."}, status=404)
 
-            new_product = Product.objects.create(
-                product_id=data.get('product_id'),
-                product_name=data.get('product_name'),
-                brand_id=brand,
-                category_id=category,
-                model_year=data.get('model_year'),
-                list_price=data.get('list_price')
-            )
+            with transaction.atomic():
+                new_product = Product.objects.create(
+                    product_id=data.get('product_id'),
+                    product_name=data.get('product_name'),
+                    brand_id=brand,
+                    category_id=category,
+                    model_year=data.get('model_year'),
+                    list_price=data.get('list_price')
+                )
+                record_change('product', 'created', new_product.product_id, {
+                    'product_id': new_product.product_id,
+                    'product_name': new_product.product_name,
+                    'brand_id': new_product.brand_id_id,
+                    'category_id': new_product.category_id_id,
+                    'model_year': new_product.model_year,
+                    'list_price': str(new_product.list_price)
+                }, broadcast=False)
 
             response_data = {
                 'message': 'Product created successfully',
@@ -159,6 +173,7 @@ class ProductDetailView(View):
             data = json.loads(request.body.decode('utf-8'))
             updatable_fields = ['product_name', 'brand_id', 'category_id', 'model_year', 'list_price']
             has_changes = False
+            previous_grouping = (product.brand_id_id, product.category_id_id)
 
             for field in updatable_fields:
                 if field in data:
@@ -192,7 +207,20 @@ class ProductDetailView(View):
                     'list_price': str(product.list_price)
                 }, status=200)
 
-            product.save()
+            # Đổi thương hiệu/danh mục làm dịch chuyển doanh thu giữa các ô của sales_cube
+            order_ids = []
+            if (product.brand_id_id, product.category_id_id) != previous_grouping:
+                order_ids = OrderItem.objects.filter(product_id=product_id).values_list('order_id', flat=True).distinct()
+            with transaction.atomic(), refreshing_order_aggregates(order_ids):
+                product.save()
+                record_change('product', 'updated', product_id, {
+                    'product_id': product.product_id,
+                    'product_name': product.product_name,
+                    'brand_id': product.brand_id_id,
+                    'category_id': product.category_id_id,
+                    'model_year': product.model_year,
+                    'list_price': str(product.list_price)
+                }, broadcast=False)
 
             updated_product_data = {
                 'product_id': product.product_id,
@@ -219,7 +247,12 @@ class ProductDetailView(View):
                 return JsonResponse({'error': 'Sản phẩm không tồn tại'}, status=404)
 
             product_name = product.product_name
-            product.delete()
+            order_ids = OrderItem.objects.filter(product_id=product_id).values_list('order_id', flat=True).distinct()
+            with transaction.atomic(), refreshing_order_aggregates(order_ids):
+                record_cascaded_item_deletes(OrderItem.objects.filter(product_id=product_id))
+                record_cascaded_stock_deletes(Stock.objects.filter(product_id=product_id))
+                product.delete()
+                record_change('product', 'deleted', product_id, {'product_id': product_id}, broadcast=False)
 
             return JsonResponse(
                 {'message': f'Sản phẩm {product_name} (ID: {product_id}) đã được xóa thành công.'},
@@ -229,6 +262,27 @@ class ProductDetailView(View):
             return JsonResponse({'error': f'Đã có lỗi xảy ra trong quá trình xóa: {str(e)}'}, status=500)
 
 
+class ProductRecommendationsView(View):
+    """
+    Gợi ý "khách mua sản phẩm này cũng mua", phục vụ từ chỉ mục nạp sẵn trong bộ nhớ của worker.
+    Không truy vấn các bảng đơn hàng; chỉ kiểm tra bảng products khi sản phẩm chưa có trong chỉ mục.
+    """
+    def get(self, request, product_id):
+        try:
+            limit = int(request.GET.get('limit', 10))
+        except ValueError:
+            return JsonResponse({'error': 'limit phải là một số nguyên hợp lệ.'}, status=400)
+
+        index = get_recommendation_index()
+        if product_id not in index and not Product.objects.filter(product_id=product_id).exists():
+            return JsonResponse({'error': 'Sản phẩm không tồn tại'}, status=404)
+
+        return JsonResponse({
+            'product_id': product_id,
+            'recommendations': index.lookup(product_id, limit=limit),
+        })
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class StockListView(View):
     def get(self, request):
@@ -266,17 +320,21 @@ class StockListView(View):
             if Stock.objects.filter(store_id=store, product_id=product).exists():
                 return JsonResponse({'error': 'Bản ghi tồn kho cho sản phẩm này tại cửa hàng này đã tồn tại. Hãy dùng PATCH để cập nhật.'}, status=409)
 
-            new_stock = Stock.objects.create(
-                store_id=store,
-                product_id=product,
-                quantity=data.get('quantity')
-            )
-
-            response_data = {
-                'store_id': new_stock.store_id.store_id,
-                'product_id': new_stock.product_id.product_id,
-                'quantity': new_stock.quantity
-            }
+            with transaction.atomic():
+                new_stock = Stock.objects.create(
+                    store_id=store,
+                    product_id=product,
+                    quantity=data.get('quantity')
+                )
+                response_data = {
+                    'store_id': new_stock.store_id.store_id,
+                    'product_id': new_stock.product_id.product_id,
+                    'quantity': new_stock.quantity
+                }
+                record_change(
+                    'stock', 'created', f'{store.store_id}:{product.product_id}', response_data, store_id=store.store_id
+                )
+                invalidate_report_cache()
             return JsonResponse(response_data, status=201)
 
         except json.JSONDecodeError:
@@ -321,12 +379,17 @@ class StockDetailView(View):
             new_quantity = data.get('quantity')
             if stock.quantity != new_quantity:
                 stock.quantity = new_quantity
-                stock.save()
                 updated_stock_data = {
                     'store_id': stock.store_id.store_id,
                     'product_id': stock.product_id.product_id,
                     'quantity': stock.quantity
                 }
+                with transaction.atomic():
+                    stock.save()
+                    record_change(
+                        'stock', 'updated', f'{store_id}:{product_id}', updated_stock_data, store_id=store_id
+                    )
+                    invalidate_report_cache()
                 return JsonResponse(updated_stock_data, status=200)
             else:
                 return JsonResponse({'message': 'Không có thay đổi nào được thực hiện.'}, status=200)
@@ -345,7 +408,13 @@ class StockDetailView(View):
             except Stock.DoesNotExist:
                 return JsonResponse({'error': 'Bản ghi tồn kho không tồn tại'}, status=404)
 
-            stock.delete()
+            with transaction.atomic():
+                stock.delete()
+                record_change(
+                    'stock', 'deleted', f'{store_id}:{product_id}', {'store_id': store_id, 'product_id': product_id},
+                    store_id=store_id
+                )
+                invalidate_report_cache()
 
             return JsonResponse(
                 {'message': f'Bản ghi tồn kho cho sản phẩm ID {product_id} tại cửa hàng ID {store_id} đã được xóa thành công.'},
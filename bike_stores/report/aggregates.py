@@ -0,0 +1,271 @@
+import calendar
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date
+from functools import reduce
+import operator
+
+from django.db import models, transaction
+from django.db.models import functions as fn
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from sales.models import Order, OrderItem
+from .cache import invalidate_report_cache
+from .models import AggregateBuild, CustomerStats, OrderStatusCounter, SalesCube
+from .money import line_revenue_minor_expr
+from .utils import casted_order_date_expr
+
+
+def _build_customer_stats(order_items) -> list[CustomerStats]:
+    """
+    Gom nhóm các dòng hàng theo (khách hàng, cửa hàng) và tạo các bản ghi CustomerStats tương ứng.
+    """
+    grouped = (
+        order_items
+        .annotate(casted_order_date=casted_order_date_expr())
+        .exclude(casted_order_date__isnull=True)
+        .exclude(order_id__customer_id__isnull=True)
+        .values('order_id__customer_id', 'order_id__store_id')
+        .annotate(
+            first_order_date=models.Min('casted_order_date'),
+            last_order_date=models.Max('casted_order_date'),
+            order_count=models.Count('order_id', distinct=True),
+            lifetime_revenue_minor=models.Sum(line_revenue_minor_expr()),
+        )
+        .order_by()
+    )
+
+    return [
+        CustomerStats(
+            customer_id_id=row['order_id__customer_id'],
+            store_id_id=row['order_id__store_id'],
+            first_order_date=row['first_order_date'],
+            last_order_date=row['last_order_date'],
+            order_count=row['order_count'],
+            lifetime_revenue_minor=row['lifetime_revenue_minor'] or 0,
+        )
+        for row in grouped
+    ]
+
+
+def refresh_customer_stats(customer_ids) -> None:
+    """
+    Tính lại customer_stats cho các khách hàng bị ảnh hưởng bởi một thao tác ghi.
+    Chi phí tỉ lệ với số dòng hàng của các khách hàng này, không phải toàn bộ bảng order_items.
+    """
+    customer_ids = {customer_id for customer_id in customer_ids if customer_id is not None}
+    if not customer_ids:
+        return
+
+    with transaction.atomic():
+        CustomerStats.objects.filter(customer_id__in=customer_ids).delete()
+        CustomerStats.objects.bulk_create(
+            _build_customer_stats(OrderItem.objects.filter(order_id__customer_id__in=customer_ids))
+        )
+
+
+def is_aggregate_built(name: str) -> bool:
+    """
+    Bảng tổng hợp name đã được dựng lại đầy đủ và chưa bị nạp dữ liệu thẳng bằng SQL kể từ đó.
+    """
+    return AggregateBuild.objects.filter(name=name).exists()
+
+
+def mark_aggregates_stale() -> None:
+    """
+    Gọi khi dữ liệu đơn hàng được ghi thẳng bằng SQL (bỏ qua cập nhật tăng dần): các bảng tổng hợp không còn đầy đủ
+    cho tới khi được dựng lại.
+    """
+    AggregateBuild.objects.all().delete()
+
+
+def rebuild_customer_stats() -> int:
+    """
+    Dựng lại toàn bộ bảng customer_stats từ order_items. Trả về số bản ghi đã tạo.
+    """
+    with transaction.atomic():
+        CustomerStats.objects.all().delete()
+        created = CustomerStats.objects.bulk_create(_build_customer_stats(OrderItem.objects.all()), batch_size=1000)
+        AggregateBuild.objects.update_or_create(name='customer_stats', defaults={'built_at': timezone.now()})
+    return len(created)
+
+
+def _build_sales_cube(order_items) -> list[SalesCube]:
+    """
+    Gom nhóm các dòng hàng theo (cửa hàng, thương hiệu, danh mục, tháng) và tạo các ô SalesCube.
+    """
+    grouped = (
+        order_items
+        .annotate(month=fn.TruncMonth(casted_order_date_expr()))
+        .exclude(month__isnull=True)
+        .values('order_id__store_id', 'product_id__brand_id', 'product_id__category_id', 'month')
+        .annotate(
+            units=models.Sum('quantity'),
+            line_count=models.Count('id'),
+            revenue_minor=models.Sum(line_revenue_minor_expr()),
+        )
+        .order_by()
+    )
+
+    return [
+        SalesCube(
+            store_id_id=row['order_id__store_id'],
+            brand_id_id=row['product_id__brand_id'],
+            category_id_id=row['product_id__category_id'],
+            month=row['month'],
+            units=row['units'] or 0,
+            line_count=row['line_count'],
+            revenue_minor=row['revenue_minor'] or 0,
+        )
+        for row in grouped
+    ]
+
+
+def _cell_orders_sql(cells) -> RawSQL:
+    """
+    Truy vấn mã các đơn hàng thuộc các cặp (store_id, month), lọc trên giá trị order_date thô thay vì
+    biểu thức chuẩn hóa nên dùng được chỉ mục store_id. Mỗi tháng là hai khoảng, một cho mỗi dạng lưu trữ:
+    số nguyên YYYYMMDD (nạp từ file SQL) và chuỗi YYYY-MM-DD (tạo qua API).
+    """
+    conditions, params = [], []
+    for store_id, month in cells:
+        last_day = month.replace(day=calendar.monthrange(month.year, month.month)[1])
+        conditions.append('(store_id = %s AND (order_date BETWEEN %s AND %s OR order_date BETWEEN %s AND %s))')
+        params += [store_id, int(f'{month:%Y%m%d}'), int(f'{last_day:%Y%m%d}'), month.isoformat(),
+                   last_day.isoformat()]
+    return RawSQL(f"SELECT order_id FROM orders WHERE {' OR '.join(conditions)}", params)
+
+
+def refresh_sales_cube(cells) -> None:
+    """
+    Tính lại các ô của sales_cube thuộc những cặp (store_id, month) bị ảnh hưởng.
+    Mỗi cặp được xóa và dựng lại từ các dòng hàng của đúng cửa hàng và tháng đó; tháng chỉ được tính trên
+    các dòng hàng đã chọn bằng _cell_orders_sql, không phải trên toàn bộ order_items.
+    """
+    cells = {(store_id, month) for store_id, month in cells if store_id is not None and month is not None}
+    if not cells:
+        return
+
+    cube_filter = reduce(operator.or_, (
+        models.Q(store_id=store_id, month=month) for store_id, month in cells
+    ))
+
+    with transaction.atomic():
+        SalesCube.objects.filter(cube_filter).delete()
+        order_items = OrderItem.objects.filter(order_id__in=_cell_orders_sql(cells))
+        SalesCube.objects.bulk_create(_build_sales_cube(order_items))
+
+
+def rebuild_sales_cube() -> int:
+    """
+    Dựng lại toàn bộ bảng sales_cube từ order_items. Trả về số ô đã tạo.
+    """
+    with transaction.atomic():
+        SalesCube.objects.all().delete()
+        created = SalesCube.objects.bulk_create(_build_sales_cube(OrderItem.objects.all()), batch_size=1000)
+    return len(created)
+
+
+def _build_order_status_counters(orders) -> list[OrderStatusCounter]:
+    """
+    Đếm số đơn hàng theo (cửa hàng, trạng thái, ngày đặt) và tạo các bản ghi OrderStatusCounter.
+    """
+    grouped = (
+        orders
+        .annotate(day=casted_order_date_expr('order_date'))
+        .exclude(day__isnull=True)
+        .values('store_id', 'order_status', 'day')
+        .annotate(count=models.Count('order_id'))
+        .order_by()
+    )
+
+    return [
+        OrderStatusCounter(
+            store_id_id=row['store_id'],
+            order_status=row['order_status'],
+            day=row['day'],
+            count=row['count'],
+        )
+        for row in grouped
+    ]
+
+
+def apply_order_status_deltas(deltas: Counter) -> None:
+    """
+    Cộng các thay đổi (store_id, order_status, day) -> delta vào bảng order_status_counters.
+    Dùng F() để tăng/giảm trực tiếp trong câu UPDATE; khóa chưa có bản ghi thì được tạo mới.
+    """
+    with transaction.atomic():
+        for (store_id, order_status, day), delta in deltas.items():
+            if not delta or store_id is None or day is None:
+                continue
+            key = {'store_id_id': store_id, 'order_status': order_status, 'day': day}
+            updated = OrderStatusCounter.objects.filter(**key).update(count=models.F('count') + delta)
+            if not updated:
+                OrderStatusCounter.objects.create(count=delta, **key)
+
+
+def rebuild_order_status_counters() -> int:
+    """
+    Dựng lại toàn bộ bảng order_status_counters từ orders. Trả về số bản ghi đã tạo.
+    """
+    with transaction.atomic():
+        OrderStatusCounter.objects.all().delete()
+        created = OrderStatusCounter.objects.bulk_create(
+            _build_order_status_counters(Order.objects.all()), batch_size=1000
+        )
+    return len(created)
+
+
+def _order_aggregate_keys(order_ids: list) -> tuple[set, set[tuple[int, date]], Counter]:
+    """
+    Lấy các khóa tổng hợp (khách hàng, ô (cửa hàng, tháng), bộ đếm (cửa hàng, trạng thái, ngày))
+    mà các đơn hàng đang đóng góp vào.
+    """
+    if not order_ids:
+        return set(), set(), Counter()
+
+    rows = (
+        Order.objects
+        .filter(order_id__in=order_ids)
+        .annotate(day=casted_order_date_expr('order_date'))
+        .annotate(month=fn.TruncMonth('day'))
+        .values_list('customer_id', 'store_id', 'month', 'order_status', 'day')
+    )
+    customer_ids, cells, status_keys = set(), set(), Counter()
+    for customer_id, store_id, month, order_status, day in rows:
+        customer_ids.add(customer_id)
+        cells.add((store_id, month))
+        status_keys[(store_id, order_status, day)] += 1
+    return customer_ids, cells, status_keys
+
+
+@contextmanager
+def refreshing_order_aggregates(order_ids):
+    """
+    Bao quanh một thao tác ghi lên orders/order_items để cập nhật các bảng tổng hợp liên quan.
+
+    Ghi nhận các khóa bị ảnh hưởng trước và sau thao tác (ví dụ đơn hàng đổi khách hàng hoặc cửa hàng),
+    sau đó tính lại đúng các khóa đó và vô hiệu hóa cache báo cáo.
+    Bộ đếm trạng thái được chuyển từ khóa cũ sang khóa mới bằng các delta trong cùng giao dịch.
+    Nên dùng bên trong transaction.atomic() cùng với thao tác ghi.
+    """
+    order_ids = list(order_ids)
+    customer_ids, cells, status_keys = _order_aggregate_keys(order_ids)
+    yield
+    new_customer_ids, new_cells, new_status_keys = _order_aggregate_keys(order_ids)
+    refresh_customer_stats(customer_ids | new_customer_ids)
+    refresh_sales_cube(cells | new_cells)
+    deltas = Counter(new_status_keys)
+    deltas.subtract(status_keys)
+    apply_order_status_deltas(deltas)
+    invalidate_report_cache()
+
+
+# Các bảng tổng hợp có thể dựng lại bằng lệnh rebuild_aggregates
+AGGREGATE_REBUILDERS = {
+    'customer_stats': rebuild_customer_stats,
+    'sales_cube': rebuild_sales_cube,
+    'order_status_counters': rebuild_order_status_counters,
+}
@@ -0,0 +1,122 @@
+import math
+
+import numpy as np
+from django.db import transaction
+
+from sales.models import OrderItem
+from .models import ProductAffinity
+
+
+def count_product_pairs(order_ids: np.ndarray, product_ids: np.ndarray,
+                        min_count: int) -> tuple[np.ndarray, np.ndarray, np.ndarray, dict[int, int], int]:
+    """
+    Đếm số đơn hàng chứa từng sản phẩm và từng cặp sản phẩm.
+
+    Sản phẩm có số đơn dưới min_count bị loại trước khi sinh cặp (một cặp không thể phổ biến hơn
+    từng sản phẩm của nó). Các cặp trong cùng đơn được sinh bằng chỉ số mảng, mã hóa thành khóa int64
+    a * P + b rồi đếm bằng np.unique, không có vòng lặp Python theo đơn hàng.
+
+    Returns:
+        tuple: (first, second, pair_counts, item_counts, order_count) với first < second,
+        chỉ gồm các cặp có số đơn >= min_count.
+    """
+    empty = np.empty(0, dtype=np.int64)
+    if len(order_ids) == 0:
+        return empty, empty, empty, {}, 0
+
+    # Mỗi (đơn, sản phẩm) chỉ tính một lần
+    rows = np.unique(np.stack([order_ids, product_ids], axis=1), axis=0)
+    order_count = len(np.unique(rows[:, 0]))
+
+    items, item_totals = np.unique(rows[:, 1], return_counts=True)
+    item_counts = dict(zip(items.tolist(), item_totals.tolist()))
+    frequent_items = items[item_totals >= min_count]
+    rows = rows[np.isin(rows[:, 1], frequent_items)]
+    if len(rows) == 0:
+        return empty, empty, empty, item_counts, order_count
+
+    # rows đã sắp theo (đơn, sản phẩm): vị trí của từng dòng trong đơn và số dòng còn lại phía sau
+    orders = rows[:, 0]
+    products = rows[:, 1]
+    block_starts = np.flatnonzero(np.r_[True, orders[1:] != orders[:-1]])
+    block_sizes = np.diff(np.r_[block_starts, len(rows)])
+    position = np.arange(len(rows)) - np.repeat(block_starts, block_sizes)
+    partners = np.repeat(block_sizes, block_sizes) - position - 1
+
+    total_pairs = int(partners.sum())
+    if total_pairs == 0:
+        return empty, empty, empty, item_counts, order_count
+
+    left = np.repeat(np.arange(len(rows)), partners)
+    offsets = np.repeat(np.cumsum(partners) - partners, partners)
+    right = left + 1 + (np.arange(total_pairs) - offsets)
+
+    base = int(products.max()) + 1
+    keys, pair_counts = np.unique(products[left] * base + products[right], return_counts=True)
+    keep = pair_counts >= min_count
+    keys, pair_counts = keys[keep], pair_counts[keep]
+
+    return keys // base, keys % base, pair_counts, item_counts, order_count
+
+
+def build_product_affinities(min_support: float = 0.002) -> list[ProductAffinity]:
+    """
+    Tính support, confidence và lift cho mọi cặp sản phẩm có support >= min_support (theo cả hai chiều).
+    """
+    pairs = list(OrderItem.objects.values_list('order_id', 'product_id').order_by())
+    order_ids = np.fromiter((pair[0] for pair in pairs), dtype=np.int64, count=len(pairs))
+    product_ids = np.fromiter((pair[1] for pair in pairs), dtype=np.int64, count=len(pairs))
+
+    order_count = len(np.unique(order_ids))
+    min_count = max(1, math.ceil(min_support * order_count))
+    first, second, pair_counts, item_counts, order_count = count_product_pairs(order_ids, product_ids, min_count)
+
+    affinities = []
+    for a, b, pair_count in zip(first.tolist(), second.tolist(), pair_counts.tolist()):
+        support = pair_count / order_count
+        for antecedent, consequent in ((a, b), (b, a)):
+            confidence = pair_count / item_counts[antecedent]
+            affinities.append(ProductAffinity(
+                product_id_id=antecedent,
+                other_product_id_id=consequent,
+                pair_count=pair_count,
+                support=support,
+                confidence=confidence,
+                lift=confidence / (item_counts[consequent] / order_count),
+            ))
+    return affinities
+
+
+def refresh_product_affinity(min_support: float = 0.002) -> int:
+    """
+    Tính lại toàn bộ bảng product_affinity. Trả về số luật đã lưu.
+    """
+    affinities = build_product_affinities(min_support)
+    with transaction.atomic():
+        ProductAffinity.objects.all().delete()
+        ProductAffinity.objects.bulk_create(affinities, batch_size=1000)
+    return len(affinities)
+
+
+def get_frequently_bought_with(product_id: int, limit: int = 10, sort_by: str = 'lift') -> list[dict]:
+    """
+    Danh sách sản phẩm thường được mua cùng product_id, sắp xếp theo lift hoặc confidence.
+    """
+    affinities = (
+        ProductAffinity.objects
+        .filter(product_id=product_id)
+        .order_by(f'-{sort_by}', '-pair_count', 'other_product_id')
+        .values('other_product_id', 'other_product_id__product_name', 'pair_count', 'support', 'confidence', 'lift')
+    )[:limit]
+
+    return [
+        {
+            'product_id': row['other_product_id'],
+            'product_name': row['other_product_id__product_name'],
+            'pair_count': row['pair_count'],
+            'support': row['support'],
+            'confidence': row['confidence'],
+            'lift': row['lift'],
+        }
+        for row in affinities
+    ]
@@ -0,0 +1,69 @@
+from functools import wraps
+from urllib.parse import urlencode
+import inspect
+
+from django.core.cache import cache
+from django.db import transaction
+
+from monitoring.metrics import record_report_request
+from monitoring.timing import phase
+from .singleflight import single_flight
+
+VERSION_KEY = 'report:version'
+
+
+def get_report_cache_version() -> int:
+    """
+    Phiên bản dữ liệu hiện tại của cache báo cáo. Mọi khóa cache đều gắn phiên bản này.
+    """
+    return cache.get_or_set(VERSION_KEY, 1, timeout=None)
+
+
+def invalidate_report_cache() -> None:
+    """
+    Vô hiệu hóa toàn bộ cache báo cáo bằng cách tăng phiên bản (các khóa cũ tự hết hạn).
+    Khi đang trong transaction, chỉ thực hiện sau khi commit để không cache lại dữ liệu cũ.
+    """
+    def bump():
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, 2, timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def report_cache_key(name: str, **params) -> str:
+    """
+    Khóa cache cho một báo cáo và bộ tham số (tham số None bị bỏ qua).
+    """
+    query = urlencode(sorted((key, value) for key, value in params.items() if value is not None))
+    return f'report:{name}:v{get_report_cache_version()}:{query}'
+
+
+def coalesced(name: str):
+    """
+    Decorator gộp các lời gọi đồng thời có cùng tham số của một hàm báo cáo thành một lần tính.
+    Khóa gồm tên báo cáo, phiên bản cache và toàn bộ tham số nên sau mỗi thao tác ghi sẽ tính lại.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = report_cache_key(name, **bound.arguments)
+            computed = False
+
+            def compute():
+                nonlocal computed
+                computed = True
+                return func(*args, **kwargs)
+
+            with phase('service'):
+                result = single_flight(key, compute)
+            record_report_request(name, computed=computed)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,378 @@
+"""
+Bộ máy phân tích dạng cột trong bộ nhớ cho các dòng hàng (order_items ⨝ orders).
+
+Mỗi worker mở một lần các cột kiểu cố định (mảng NumPy, hoặc np.memmap từ snapshot ghi bởi lệnh
+snapshot_order_lines) rồi cập nhật tăng dần theo outbox: sự kiện order/order_item chỉ nạp lại các dòng
+của đơn hàng bị ảnh hưởng, sự kiện xóa product bỏ các dòng của sản phẩm đó.
+Doanh thu được giữ ở minor units (int64) nên kết quả trùng khớp đường ORM.
+"""
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+
+from events.models import OutboxEvent
+from .columnar_snapshots import SnapshotError, current_version, open_snapshot, write_snapshot
+from .money import line_revenue_minor_sql
+from .utils import normalized_date_sql
+
+COLUMN_TYPES = {
+    'line_id': np.int64,
+    'order_id': np.int64,
+    'store_id': np.int32,
+    'customer_id': np.int32,
+    'product_id': np.int32,
+    'day': np.int32,
+    'revenue_minor': np.int64,
+}
+
+NO_CUSTOMER = -1
+# Dòng có ngày đặt hàng không hợp lệ vẫn được giữ (để đếm khớp với bảng) nhưng không rơi vào khoảng ngày nào
+NO_DAY = np.iinfo(np.int32).min
+
+ORDER_LINES_SQL = """
+    SELECT oi.id, oi.order_id, o.store_id, COALESCE(o.customer_id, -1), oi.product_id,
+           {order_date}, {line_revenue}
+    FROM order_items oi
+    JOIN orders o ON o.order_id = oi.order_id
+    {where}
+"""
+
+_FETCH_CHUNK_SIZE = 100_000
+_ORDER_ID_BATCH_SIZE = 500
+
+
+def _empty_columns() -> dict[str, np.ndarray]:
+    return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMN_TYPES.items()}
+
+
+def _rows_to_columns(rows: list[tuple]) -> dict[str, np.ndarray]:
+    if not rows:
+        return _empty_columns()
+    line_ids, order_ids, store_ids, customer_ids, product_ids, order_dates, revenues = zip(*rows)
+    days = np.array(order_dates, dtype='datetime64[D]').astype(np.int64)
+    days[days == np.iinfo(np.int64).min] = NO_DAY  # NaT
+    return {
+        'line_id': np.array(line_ids, dtype=np.int64),
+        'order_id': np.array(order_ids, dtype=np.int64),
+        'store_id': np.array(store_ids, dtype=np.int32),
+        'customer_id': np.array(customer_ids, dtype=np.int32),
+        'product_id': np.array(product_ids, dtype=np.int32),
+        'day': days.astype(np.int32),
+        'revenue_minor': np.array(revenues, dtype=np.int64),
+    }
+
+
+def _concat(parts: list[dict[str, np.ndarray]]) -> dict[str, np.ndarray]:
+    parts = [part for part in parts if len(part['line_id'])]
+    if not parts:
+        return _empty_columns()
+    return {name: np.concatenate([part[name] for part in parts]) for name in COLUMN_TYPES}
+
+
+def fetch_order_lines(order_ids: list[int] | None = None) -> dict[str, np.ndarray]:
+    """
+    Đọc các dòng hàng (toàn bộ, hoặc chỉ của các đơn hàng cho trước) thành các cột NumPy.
+    """
+    sql = ORDER_LINES_SQL.format(
+        order_date=normalized_date_sql('o.order_date'),
+        line_revenue=line_revenue_minor_sql('oi'),
+        where='{where}',
+    )
+    parts = []
+    with connection.cursor() as cursor:
+        if order_ids is None:
+            cursor.execute(sql.format(where=''))
+            while rows := cursor.fetchmany(_FETCH_CHUNK_SIZE):
+                parts.append(_rows_to_columns(rows))
+        else:
+            for start in range(0, len(order_ids), _ORDER_ID_BATCH_SIZE):
+                batch = order_ids[start:start + _ORDER_ID_BATCH_SIZE]
+                placeholders = ', '.join(['%s'] * len(batch))
+                cursor.execute(sql.format(where=f'WHERE oi.order_id IN ({placeholders})'), batch)
+                parts.append(_rows_to_columns(cursor.fetchall()))
+    return _concat(parts)
+
+
+def _table_fingerprint() -> tuple[int, int]:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM order_items")
+        count, max_line_id = cursor.fetchone()
+    return count, max_line_id
+
+
+def _latest_outbox_id() -> int:
+    return OutboxEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def _window_mask(columns: dict[str, np.ndarray], start_day: int | None, end_day: int | None,
+                 store_id: int | None) -> np.ndarray:
+    days = columns['day']
+    mask = days != NO_DAY
+    if start_day is not None:
+        mask &= days >= start_day
+    if end_day is not None:
+        mask &= days <= end_day
+    if store_id:
+        mask &= columns['store_id'] == store_id
+    return mask
+
+
+class OrderLineColumns:
+    """
+    Các cột dòng hàng của một worker kèm vị trí outbox đã áp dụng.
+
+    Dữ liệu gồm phần nền (có thể là np.memmap mở từ snapshot, dùng chung page cache giữa các worker),
+    mặt nạ alive đánh dấu các dòng nền còn hiệu lực (None nếu còn nguyên) và phần delta chứa các dòng nạp lại.
+    Cập nhật không ghi vào phần nền; bộ ba (base, alive, delta) mới được gán thay thế một lần nên luồng
+    đang đọc bản cũ không bị ảnh hưởng.
+    """
+
+    def __init__(self, base: dict[str, np.ndarray], outbox_position: int, snapshot_version: str | None = None):
+        self._state = (base, None, _empty_columns())
+        self.outbox_position = outbox_position
+        self.snapshot_version = snapshot_version
+        self.source = 'snapshot' if snapshot_version else 'database'
+        self.verified_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls) -> 'OrderLineColumns':
+        # Đọc vị trí outbox trước khi đọc dữ liệu: sự kiện ghi xen giữa sẽ được áp dụng lại (vô hại)
+        outbox_position = _latest_outbox_id()
+        return cls(fetch_order_lines(), outbox_position)
+
+    def __len__(self) -> int:
+        base, alive, delta = self._state
+        return (len(base['line_id']) if alive is None else int(alive.sum())) + len(delta['line_id'])
+
+    def select(self, fields: list[str], start_date=None, end_date=None,
+               store_id: int | None = None) -> dict[str, np.ndarray]:
+        """
+        Các cột fields của những dòng còn hiệu lực có ngày đặt hàng hợp lệ trong khoảng và thuộc cửa hàng cho trước.
+        """
+        start_day, end_day = to_day(start_date), to_day(end_date)
+        base, alive, delta = self._state
+        parts = []
+        for columns, columns_alive in ((base, alive), (delta, None)):
+            mask = _window_mask(columns, start_day, end_day, store_id)
+            if columns_alive is not None:
+                mask &= columns_alive
+            parts.append([columns[name][mask] for name in fields])
+        return {name: np.concatenate([part[index] for part in parts]) for index, name in enumerate(fields)}
+
+    def fingerprint(self) -> tuple[int, int]:
+        """
+        (số dòng, id dòng lớn nhất) đang giữ, để so với bảng order_items.
+        """
+        base, alive, delta = self._state
+        line_ids = base['line_id'] if alive is None else base['line_id'][alive]
+        max_line_id = max(int(line_ids.max()) if len(line_ids) else 0,
+                          int(delta['line_id'].max()) if len(delta['line_id']) else 0)
+        return len(self), max_line_id
+
+    def reload(self) -> None:
+        outbox_position = _latest_outbox_id()
+        self._state = (fetch_order_lines(), None, _empty_columns())
+        self.outbox_position = outbox_position
+        self.source = 'database'
+        self.verified_at = time.monotonic()
+
+    def refresh(self, verify: bool = False) -> int:
+        """
+        Áp dụng các sự kiện outbox mới. Trả về số sự kiện đã áp dụng.
+
+        Nạp lại toàn bộ khi có sự kiện đã bị prune trước khi kịp đọc, hoặc khi số dòng/id lớn nhất
+        không còn khớp bảng order_items (thay đổi không qua outbox, ví dụ xóa dây chuyền từ store).
+        Việc so khớp chạy mỗi REPORT_COLUMNAR_VERIFY_SECONDS giây, hoặc ngay lập tức nếu verify=True.
+        """
+        with self._lock:
+            events = list(
+                OutboxEvent.objects
+                .filter(id__gt=self.outbox_position)
+                .order_by('id')
+                .values_list('id', 'event_type', 'action', 'aggregate_id')
+            )
+            if events and events[0][0] > self.outbox_position + 1:
+                self.reload()
+                return len(events)
+
+            if events:
+                self._apply(events)
+                self.outbox_position = events[-1][0]
+
+            if verify or time.monotonic() - self.verified_at >= settings.REPORT_COLUMNAR_VERIFY_SECONDS:
+                if _table_fingerprint() != self.fingerprint():
+                    self.reload()
+                self.verified_at = time.monotonic()
+            return len(events)
+
+    def _apply(self, events: list[tuple]) -> None:
+        order_ids = set()
+        deleted_product_ids = set()
+        for _, event_type, action, aggregate_id in events:
+            if event_type in ('order', 'order_item'):
+                order_ids.add(int(aggregate_id.split(':')[0]))
+            elif event_type == 'product' and action == 'deleted':
+                deleted_product_ids.add(int(aggregate_id))
+        if not order_ids and not deleted_product_ids:
+            return
+
+        def affected(columns):
+            rows = np.isin(columns['order_id'], list(order_ids))
+            if deleted_product_ids:
+                rows |= np.isin(columns['product_id'], list(deleted_product_ids))
+            return rows
+
+        base, alive, delta = self._state
+        affected_base = affected(base)
+        if affected_base.any():
+            alive = ~affected_base if alive is None else alive & ~affected_base
+        keep_delta = ~affected(delta)
+        delta = _concat([{name: values[keep_delta] for name, values in delta.items()},
+                         fetch_order_lines(sorted(order_ids))])
+        self._state = (base, alive, delta)
+
+
+def group_sum(keys: np.ndarray, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Cộng values theo keys. Trả về (khóa duy nhất đã sắp xếp, tổng int64 tương ứng).
+    Dùng argsort + reduceat thay cho bincount có trọng số để tổng luôn là số nguyên chính xác.
+    """
+    if not len(keys):
+        return keys[:0], values[:0]
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    return sorted_keys[starts], np.add.reduceat(values[order], starts)
+
+
+def period_start_days(days: np.ndarray, period: str) -> np.ndarray:
+    """
+    Ngày bắt đầu kỳ (số ngày tính từ 1970-01-01) cho mỗi phần tử; tuần bắt đầu từ thứ Hai như TruncWeek.
+    """
+    days = days.astype(np.int64)
+    if period == 'day':
+        return days
+    if period == 'week':
+        return days - (days + 3) % 7  # 1970-01-01 là thứ Năm
+    dates = days.astype('datetime64[D]')
+    if period == 'year':
+        return dates.astype('datetime64[Y]').astype('datetime64[D]').astype(np.int64)
+    months = dates.astype('datetime64[M]').astype(np.int64)
+    if period == 'quarter':
+        months -= months % 3
+    return months.astype('datetime64[M]').astype('datetime64[D]').astype(np.int64)
+
+
+def to_day(value) -> int | None:
+    return None if value is None else int(np.datetime64(value, 'D').astype(np.int64))
+
+
+def from_day(day: int):
+    return np.datetime64(int(day), 'D').item()
+
+
+def order_date_range(lines: OrderLineColumns, store_id: int | None = None) -> tuple:
+    """
+    Ngày đặt hàng sớm nhất và muộn nhất (date), (None, None) nếu không có dòng nào.
+    """
+    days = lines.select(['day'], store_id=store_id)['day']
+    if not len(days):
+        return None, None
+    return from_day(days.min()), from_day(days.max())
+
+
+def revenue_by_period(lines: OrderLineColumns, start_date, end_date, period: str,
+                      store_id: int | None = None) -> dict[str, int]:
+    """
+    Doanh thu (minor units) theo kỳ trong [start_date, end_date], khóa là ngày bắt đầu kỳ dạng ISO.
+    """
+    selected = lines.select(['day', 'revenue_minor'], start_date, end_date, store_id)
+    periods, totals = group_sum(period_start_days(selected['day'], period), selected['revenue_minor'])
+    return {from_day(day).isoformat(): int(total) for day, total in zip(periods, totals)}
+
+
+def customer_revenues(lines: OrderLineColumns, start_date=None, end_date=None,
+                      store_id: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Doanh thu (minor units) theo khách hàng, sắp xếp giảm dần theo doanh thu rồi tăng dần theo customer_id.
+    Bỏ qua dòng hàng của đơn không có khách hàng (customer_id -1).
+    """
+    selected = lines.select(['customer_id', 'revenue_minor'], start_date, end_date, store_id)
+    has_customer = selected['customer_id'] >= 0
+    customer_ids, totals = group_sum(selected['customer_id'][has_customer], selected['revenue_minor'][has_customer])
+    order = np.lexsort((customer_ids, -totals))
+    return customer_ids[order], totals[order]
+
+
+def write_order_line_snapshot(directory=None, keep: int = 2) -> dict:
+    """
+    Ghi toàn bộ dòng hàng thành một phiên bản snapshot mới. Trả về manifest.
+
+    Dữ liệu, vị trí outbox và dấu vân tay bảng được đọc trong cùng một transaction nên nhất quán với nhau;
+    worker mở snapshot sẽ áp dụng tiếp các sự kiện outbox sau vị trí này.
+    """
+    with transaction.atomic():
+        outbox_position = _latest_outbox_id()
+        columns = fetch_order_lines()
+        row_count, max_line_id = _table_fingerprint()
+    metadata = {'outbox_position': outbox_position, 'table_row_count': row_count, 'max_line_id': max_line_id}
+    return write_snapshot(directory or settings.REPORT_COLUMNAR_SNAPSHOT_DIR, columns, metadata, keep=keep)
+
+
+def open_order_line_columns() -> OrderLineColumns:
+    """
+    Mở bộ cột từ snapshot đang dùng nếu có và còn khớp cơ sở dữ liệu, ngược lại đọc từ cơ sở dữ liệu.
+
+    Snapshot bị bỏ qua khi sai định dạng/kiểu cột hoặc có vị trí outbox vượt quá outbox hiện tại
+    (snapshot của một cơ sở dữ liệu khác). Sau khi áp dụng các sự kiện outbox mới, số dòng và id lớn nhất
+    được so ngay với bảng order_items; lệch thì nạp lại từ cơ sở dữ liệu.
+    """
+    directory = settings.REPORT_COLUMNAR_SNAPSHOT_DIR
+    try:
+        snapshot = open_snapshot(directory, COLUMN_TYPES) if directory else None
+    except SnapshotError:
+        snapshot = None
+    if snapshot is None:
+        return OrderLineColumns.load()
+
+    manifest, columns = snapshot
+    if manifest['outbox_position'] > _latest_outbox_id():
+        lines = OrderLineColumns.load()
+    else:
+        lines = OrderLineColumns(columns, manifest['outbox_position'], manifest['version'])
+        lines.refresh(verify=True)
+    lines.snapshot_version = manifest['version']
+    return lines
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_columnar_engine() -> OrderLineColumns:
+    """
+    Bộ cột dùng chung cho cả worker: mở ở lần gọi đầu tiên (từ snapshot nếu có), mở lại khi CURRENT
+    trỏ sang snapshot mới, các lần khác chỉ áp dụng sự kiện outbox mới.
+    """
+    global _engine
+    engine = _engine
+    directory = settings.REPORT_COLUMNAR_SNAPSHOT_DIR
+    if engine is None or (directory and current_version(directory) not in (None, engine.snapshot_version)):
+        with _engine_lock:
+            if _engine is engine:
+                _engine = open_order_line_columns()
+            return _engine
+    engine.refresh()
+    return engine
+
+
+def reset_columnar_engine() -> None:
+    """
+    Bỏ bộ cột đang nạp để lần gọi sau đọc lại toàn bộ từ cơ sở dữ liệu.
+    """
+    global _engine
+    _engine = None
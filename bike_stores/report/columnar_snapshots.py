@@ -0,0 +1,126 @@
+"""
+Snapshot dạng cột trên đĩa: mỗi phiên bản là một thư mục gồm các file .npy (một file mỗi cột) và manifest.json.
+
+Các worker mở file bằng np.load(mmap_mode='r') nên cùng dùng chung page cache của hệ điều hành, không sao chép.
+Phiên bản đang dùng được ghi trong file CURRENT; phiên bản mới được ghi vào thư mục tạm, đổi tên rồi mới
+thay CURRENT bằng os.replace, nên người đọc luôn thấy trọn vẹn phiên bản cũ hoặc phiên bản mới.
+"""
+import json
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from django.utils import timezone
+
+FORMAT_VERSION = 1
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+
+
+class SnapshotError(Exception):
+    """
+    Snapshot không đọc được hoặc không khớp định dạng/kiểu cột mong đợi.
+    """
+
+
+def _fsync(path: Path) -> None:
+    with open(path, 'rb') as f:
+        os.fsync(f.fileno())
+
+
+def current_version(directory) -> str | None:
+    """
+    Phiên bản snapshot đang dùng, None nếu thư mục chưa có snapshot nào.
+    """
+    try:
+        return (Path(directory) / CURRENT_FILE).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def write_snapshot(directory, columns: dict[str, np.ndarray], metadata: dict, keep: int = 2) -> dict:
+    """
+    Ghi một phiên bản snapshot mới, chuyển CURRENT sang phiên bản đó rồi xóa bớt phiên bản cũ
+    (giữ lại keep phiên bản trước đó cho các worker còn đang mở). Trả về manifest đã ghi.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    version = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+    staging = directory / f'.{version}.tmp'
+    staging.mkdir()
+
+    try:
+        row_counts = {len(values) for values in columns.values()}
+        if len(row_counts) > 1:
+            raise SnapshotError('Các cột phải có cùng số dòng.')
+        for name, values in columns.items():
+            np.save(staging / f'{name}.npy', np.ascontiguousarray(values), allow_pickle=False)
+            _fsync(staging / f'{name}.npy')
+
+        manifest = {
+            'format': FORMAT_VERSION,
+            'version': version,
+            'created_at': timezone.now().isoformat(),
+            'row_count': row_counts.pop() if row_counts else 0,
+            'columns': {name: np.asarray(values).dtype.str for name, values in columns.items()},
+            **metadata,
+        }
+        (staging / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+        _fsync(staging / MANIFEST_FILE)
+        os.rename(staging, directory / version)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    pointer = directory / f'.{CURRENT_FILE}.tmp'
+    pointer.write_text(version)
+    _fsync(pointer)
+    os.replace(pointer, directory / CURRENT_FILE)
+
+    if keep >= 0:
+        older = sorted(
+            (path for path in directory.iterdir() if path.is_dir() and not path.name.startswith('.')),
+            reverse=True,
+        )[keep + 1:]
+        for path in older:
+            # Trên Windows file đang được map không xóa được; lần ghi sau sẽ thử lại
+            shutil.rmtree(path, ignore_errors=True)
+    return manifest
+
+
+def open_snapshot(directory, expected_types: dict[str, type]) -> tuple[dict, dict[str, np.ndarray]] | None:
+    """
+    Mở phiên bản snapshot đang dùng dưới dạng np.memmap chỉ đọc.
+
+    Returns:
+        tuple | None: (manifest, {tên cột: mảng}), None nếu chưa có snapshot.
+
+    Raises:
+        SnapshotError: manifest khác định dạng, thiếu cột, sai kiểu hoặc sai số dòng.
+    """
+    version = current_version(directory)
+    if version is None:
+        return None
+    path = Path(directory) / version
+    try:
+        manifest = json.loads((path / MANIFEST_FILE).read_text())
+    except (OSError, ValueError) as exc:
+        raise SnapshotError(f'Không đọc được manifest của snapshot {version}: {exc}')
+
+    if manifest.get('format') != FORMAT_VERSION:
+        raise SnapshotError(f'Snapshot {version} có định dạng {manifest.get("format")}, cần {FORMAT_VERSION}.')
+
+    columns = {}
+    for name, dtype in expected_types.items():
+        if manifest['columns'].get(name) != np.dtype(dtype).str:
+            raise SnapshotError(f'Cột {name} của snapshot {version} không khớp kiểu {np.dtype(dtype).str}.')
+        try:
+            values = np.load(path / f'{name}.npy', mmap_mode='r', allow_pickle=False)
+        except (OSError, ValueError) as exc:
+            raise SnapshotError(f'Không mở được cột {name} của snapshot {version}: {exc}')
+        if values.shape != (manifest['row_count'],):
+            raise SnapshotError(f'Cột {name} của snapshot {version} có {len(values)} dòng, cần {manifest["row_count"]}.')
+        columns[name] = values
+    return manifest, columns
@@ -0,0 +1,180 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+from django.db import models
+
+from production.models import Product
+from sales.models import OrderItem, Store
+from .cache import coalesced
+from .services import get_latest_order_date
+from .utils import casted_order_date_expr
+
+
+def load_daily_unit_series(end_date: date, history_days: int = 365, store_id: int | None = None,
+                           product_id: int | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray, date]:
+    """
+    Dựng chuỗi số lượng bán theo ngày cho từng cặp (cửa hàng, sản phẩm) từ order_items.
+
+    Returns:
+        tuple: (store_ids, product_ids, matrix, start_date) với matrix có dạng (số chuỗi, history_days),
+        cột cuối cùng ứng với end_date. Chỉ gồm các cặp có phát sinh bán trong khoảng lịch sử.
+    """
+    start_date = end_date - timedelta(days=history_days - 1)
+
+    queryset = (
+        OrderItem.objects
+        .annotate(casted_order_date=casted_order_date_expr())
+        .filter(casted_order_date__range=[start_date, end_date])
+    )
+    if store_id:
+        queryset = queryset.filter(order_id__store_id=store_id)
+    if product_id:
+        queryset = queryset.filter(product_id=product_id)
+
+    rows = list(
+        queryset
+        .values_list('order_id__store_id', 'product_id', 'casted_order_date')
+        .annotate(units=models.Sum('quantity'))
+        .order_by()
+    )
+    if not rows:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.zeros((0, history_days)), start_date
+
+    stores = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    products = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+    days = np.fromiter((row[2].toordinal() for row in rows), dtype=np.int64, count=len(rows))
+    units = np.fromiter((row[3] for row in rows), dtype=np.float64, count=len(rows))
+
+    # Mỗi cặp (store, product) được đánh chỉ số hàng bằng np.unique trên khóa ghép
+    pairs = np.stack([stores, products], axis=1)
+    unique_pairs, series_index = np.unique(pairs, axis=0, return_inverse=True)
+    matrix = np.zeros((len(unique_pairs), history_days))
+    np.add.at(matrix, (series_index.ravel(), days - start_date.toordinal()), units)
+
+    return unique_pairs[:, 0], unique_pairs[:, 1], matrix, start_date
+
+
+def exponential_smoothing_levels(matrix: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    Mức làm trơn hàm mũ đơn (SES) tại ngày cuối cho mọi chuỗi cùng lúc.
+
+    Khai triển l_t = alpha * y_t + (1 - alpha) * l_(t-1) với l_0 = y_0 thành một tích vô hướng
+    với vector trọng số, nên toàn bộ ma trận được xử lý bằng một phép nhân ma trận.
+    """
+    n_days = matrix.shape[1]
+    if n_days == 0:
+        return np.zeros(matrix.shape[0])
+    age = np.arange(n_days - 1, -1, -1, dtype=np.float64)
+    weights = alpha * (1.0 - alpha) ** age
+    weights[0] = (1.0 - alpha) ** (n_days - 1)
+    return matrix @ weights
+
+
+def moving_average_levels(matrix: np.ndarray, window: int) -> np.ndarray:
+    """
+    Trung bình trượt của `window` ngày cuối cho mọi chuỗi cùng lúc.
+    """
+    window = max(1, min(window, matrix.shape[1]))
+    return matrix[:, -window:].mean(axis=1)
+
+
+def _forecast_chunk(matrix: np.ndarray, alpha: float, window: int) -> tuple[np.ndarray, np.ndarray]:
+    return exponential_smoothing_levels(matrix, alpha), moving_average_levels(matrix, window)
+
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def get_forecast_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Process pool dùng chung cho mọi yêu cầu của tiến trình: tạo ở lần gọi đầu tiên, tạo lại khi số worker đổi.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+
+def forecast_levels(matrix: np.ndarray, alpha: float, window: int,
+                    workers: int = 1) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Tính mức dự báo SES và trung bình trượt, có thể chia các chuỗi cho process pool dùng chung.
+    """
+    if workers <= 1 or matrix.shape[0] < workers:
+        return _forecast_chunk(matrix, alpha, window)
+
+    chunks = np.array_split(matrix, workers)
+    executor = get_forecast_pool(workers)
+    results = list(executor.map(_forecast_chunk, chunks, [alpha] * workers, [window] * workers))
+    return (
+        np.concatenate([ses for ses, _ in results]),
+        np.concatenate([moving_average for _, moving_average in results]),
+    )
+
+
+@coalesced('demand-forecast')
+def get_demand_forecast(horizon: int, end_date: date | None = None, history_days: int = 365,
+                        alpha: float = 0.3, window: int = 28, store_id: int | None = None,
+                        product_id: int | None = None, workers: int = 1) -> dict:
+    """
+    Dự báo nhu cầu (số lượng bán/ngày) cho mọi cặp (cửa hàng, sản phẩm) trong `horizon` ngày tới.
+
+    Chuỗi lịch sử kết thúc tại end_date (mặc định là ngày có đơn hàng gần nhất).
+    Cả hai phương pháp (SES và trung bình trượt) cho dự báo phẳng: mức cuối cùng lặp lại mỗi ngày.
+    """
+    if store_id:
+        try:
+            store_name = Store.objects.get(pk=store_id).store_name
+        except Store.DoesNotExist:
+            store_name = f"Không tìm thấy cửa hàng ID {store_id}"
+    else:
+        store_name = "Toàn hệ thống"
+
+    if end_date is None:
+        end_date = get_latest_order_date()
+        if end_date is None:
+            return {'store_name': store_name, 'horizon': horizon, 'data': []}
+
+    store_ids, product_ids, matrix, start_date = load_daily_unit_series(
+        end_date, history_days=history_days, store_id=store_id, product_id=product_id
+    )
+    ses_levels, moving_average_levels_ = forecast_levels(matrix, alpha, window, workers=workers)
+
+    product_names = dict(
+        Product.objects.filter(product_id__in=product_ids.tolist()).values_list('product_id', 'product_name')
+    )
+    history_units = matrix.sum(axis=1)
+    # Sắp xếp theo nhu cầu dự báo giảm dần
+    order = np.argsort(-ses_levels, kind='stable')
+
+    data = [
+        {
+            'store_id': int(store_ids[i]),
+            'product_id': int(product_ids[i]),
+            'product_name': product_names.get(int(product_ids[i]), 'Không xác định'),
+            'history_units': int(history_units[i]),
+            'ses_daily': float(ses_levels[i]),
+            'ses_total': float(ses_levels[i] * horizon),
+            'moving_average_daily': float(moving_average_levels_[i]),
+            'moving_average_total': float(moving_average_levels_[i] * horizon),
+        }
+        for i in order
+    ]
+
+    return {
+        'store_name': store_name,
+        'history_start_date': start_date,
+        'history_end_date': end_date,
+        'forecast_start_date': end_date + timedelta(days=1),
+        'horizon': horizon,
+        'data': data,
+    }
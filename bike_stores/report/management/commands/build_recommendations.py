@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from report.recommendations import build_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Builds the item-to-item recommendation index (top-K similar products per product) from order_items.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=10,
+            help='Number of neighbours stored per product (default: 10).',
+        )
+
+    def handle(self, *args, **options):
+        top_k = options['top_k']
+        if top_k < 1:
+            raise CommandError('--top-k must be at least 1.')
+
+        started = time.perf_counter()
+        row_count = build_recommendations(top_k)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Stored {row_count} recommendations in {elapsed:.2f}s'))
+        self.stdout.write('Running workers load the new index on their next staleness check '
+                          f'(every {settings.REPORT_RECOMMENDATIONS_CHECK_SECONDS:g}s).')
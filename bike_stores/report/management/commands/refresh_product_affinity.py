@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from report.basket import refresh_product_affinity
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the product_affinity table (support, confidence, lift of product pairs) from order_items.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-support',
+            type=float,
+            default=0.002,
+            help='Minimum fraction of orders a product pair must appear in to be kept (default: 0.002).',
+        )
+
+    def handle(self, *args, **options):
+        min_support = options['min_support']
+        if not 0 < min_support <= 1:
+            raise CommandError('--min-support must be in (0, 1].')
+
+        started = time.perf_counter()
+        rule_count = refresh_product_affinity(min_support)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Stored {rule_count} product affinity rules in {elapsed:.2f}s'))
@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from report.columnar import write_order_line_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Writes order lines as memory-mapped column files that report workers open at startup.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir',
+            help='Snapshot directory (default: settings.REPORT_COLUMNAR_SNAPSHOT_DIR).',
+        )
+        parser.add_argument(
+            '--keep',
+            type=int,
+            default=2,
+            help='Number of previous versions to keep for workers that still map them (default: 2).',
+        )
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or settings.REPORT_COLUMNAR_SNAPSHOT_DIR
+        if not directory:
+            raise CommandError('No snapshot directory: pass --dir or set REPORT_COLUMNAR_SNAPSHOT_DIR.')
+        if options['keep'] < 0:
+            raise CommandError('--keep must not be negative.')
+
+        started = time.perf_counter()
+        manifest = write_order_line_snapshot(directory, keep=options['keep'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote order line snapshot {manifest["version"]} ({manifest["row_count"]} rows, '
+            f'outbox position {manifest["outbox_position"]}) to {directory} in {time.perf_counter() - started:.2f}s'
+        ))
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-19 11:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('sales', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_order_date', models.DateField()),
+                ('last_order_date', models.DateField()),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('lifetime_revenue', models.DecimalField(decimal_places=4, default=0, max_digits=24)),
+                ('customer_id', models.ForeignKey(db_column='customer_id', on_delete=django.db.models.deletion.CASCADE, to='sales.customer')),
+                ('store_id', models.ForeignKey(db_column='store_id', on_delete=django.db.models.deletion.CASCADE, to='sales.store')),
+            ],
+            options={
+                'db_table': 'customer_stats',
+                'unique_together': {('customer_id', 'store_id')},
+            },
+        ),
+    ]
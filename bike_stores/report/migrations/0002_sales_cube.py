@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-19 11:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('production', '0002_initial'),
+        ('report', '0001_initial'),
+        ('sales', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesCube',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('units', models.IntegerField(default=0)),
+                ('line_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=4, default=0, max_digits=24)),
+                ('brand_id', models.ForeignKey(db_column='brand_id', on_delete=django.db.models.deletion.CASCADE, to='production.brand')),
+                ('category_id', models.ForeignKey(db_column='category_id', on_delete=django.db.models.deletion.CASCADE, to='production.category')),
+                ('store_id', models.ForeignKey(db_column='store_id', on_delete=django.db.models.deletion.CASCADE, to='sales.store')),
+            ],
+            options={
+                'db_table': 'sales_cube',
+                'unique_together': {('store_id', 'brand_id', 'category_id', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-19 11:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('production', '0002_initial'),
+        ('report', '0002_sales_cube'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductAffinity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pair_count', models.IntegerField()),
+                ('support', models.FloatField()),
+                ('confidence', models.FloatField()),
+                ('lift', models.FloatField()),
+                ('other_product_id', models.ForeignKey(db_column='other_product_id', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='production.product')),
+                ('product_id', models.ForeignKey(db_column='product_id', on_delete=django.db.models.deletion.CASCADE, to='production.product')),
+            ],
+            options={
+                'db_table': 'product_affinity',
+                'unique_together': {('product_id', 'other_product_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-19 11:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('production', '0002_initial'),
+        ('report', '0003_product_affinity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('product_id', models.ForeignKey(db_column='product_id', on_delete=django.db.models.deletion.CASCADE, to='production.product')),
+                ('recommended_product_id', models.ForeignKey(db_column='recommended_product_id', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='production.product')),
+            ],
+            options={
+                'db_table': 'product_recommendations',
+                'unique_together': {('product_id', 'rank')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-19 11:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('report', '0004_product_recommendations'),
+        ('sales', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatusCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_status', models.PositiveSmallIntegerField()),
+                ('day', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('store_id', models.ForeignKey(db_column='store_id', on_delete=django.db.models.deletion.CASCADE, to='sales.store')),
+            ],
+            options={
+                'db_table': 'order_status_counters',
+                'unique_together': {('store_id', 'order_status', 'day')},
+            },
+        ),
+    ]
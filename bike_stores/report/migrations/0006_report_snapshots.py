@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-19 11:50
+
+import report.utils
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('report', '0005_order_status_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField()),
+                ('report', models.CharField(max_length=32)),
+                ('store_id', models.IntegerField(blank=True, null=True)),
+                ('period', models.CharField(blank=True, default='', max_length=10)),
+                ('as_of', models.DateField()),
+                ('row_count', models.IntegerField(default=0)),
+                ('data', models.JSONField(decoder=report.utils.SnapshotJSONDecoder, encoder=report.utils.SnapshotJSONEncoder)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'report_snapshots',
+                'indexes': [models.Index(fields=['report', 'store_id', 'period', 'version'], name='report_snap_report_260c95_idx')],
+            },
+        ),
+    ]
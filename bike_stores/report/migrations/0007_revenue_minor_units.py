@@ -0,0 +1,60 @@
+# Generated by Django 5.2 on 2026-10-19 11:52
+
+from decimal import ROUND_HALF_EVEN, Decimal
+
+from django.db import migrations, models
+
+
+def _to_minor(value) -> int:
+    return int(Decimal(str(value or 0)).quantize(Decimal('0.0001'), rounding=ROUND_HALF_EVEN).scaleb(4))
+
+
+def decimal_to_minor(apps, schema_editor):
+    CustomerStats = apps.get_model('report', 'CustomerStats')
+    SalesCube = apps.get_model('report', 'SalesCube')
+    for stats in CustomerStats.objects.all().only('id', 'lifetime_revenue').iterator():
+        stats.lifetime_revenue_minor = _to_minor(stats.lifetime_revenue)
+        stats.save(update_fields=['lifetime_revenue_minor'])
+    for cell in SalesCube.objects.all().only('id', 'revenue').iterator():
+        cell.revenue_minor = _to_minor(cell.revenue)
+        cell.save(update_fields=['revenue_minor'])
+
+
+def minor_to_decimal(apps, schema_editor):
+    CustomerStats = apps.get_model('report', 'CustomerStats')
+    SalesCube = apps.get_model('report', 'SalesCube')
+    for stats in CustomerStats.objects.all().only('id', 'lifetime_revenue_minor').iterator():
+        stats.lifetime_revenue = Decimal(stats.lifetime_revenue_minor).scaleb(-4)
+        stats.save(update_fields=['lifetime_revenue'])
+    for cell in SalesCube.objects.all().only('id', 'revenue_minor').iterator():
+        cell.revenue = Decimal(cell.revenue_minor).scaleb(-4)
+        cell.save(update_fields=['revenue'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('report', '0006_report_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customerstats',
+            name='lifetime_revenue_minor',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='salescube',
+            name='revenue_minor',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(decimal_to_minor, minor_to_decimal),
+        migrations.RemoveField(
+            model_name='customerstats',
+            name='lifetime_revenue',
+        ),
+        migrations.RemoveField(
+            model_name='salescube',
+            name='revenue',
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-19 12:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('report', '0007_revenue_minor_units'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AggregateBuild',
+            fields=[
+                ('name', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('built_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'aggregate_builds',
+            },
+        ),
+    ]
@@ -1,3 +1,124 @@
 from django.db import models
 
+from .utils import SnapshotJSONDecoder, SnapshotJSONEncoder
+
 # Create your models here.
+
+
+class CustomerStats(models.Model):
+    """
+    Số liệu tổng hợp trọn đời của khách hàng theo từng cửa hàng.
+    Được cập nhật bởi các API ghi đơn hàng/dòng hàng và có thể dựng lại bằng lệnh rebuild_aggregates.
+    """
+    customer_id = models.ForeignKey('sales.Customer', db_column='customer_id', on_delete=models.CASCADE)
+    store_id = models.ForeignKey('sales.Store', db_column='store_id', on_delete=models.CASCADE)
+    first_order_date = models.DateField()
+    last_order_date = models.DateField()
+    order_count = models.PositiveIntegerField(default=0)
+    # Doanh thu theo minor units (1/10000), xem report.money
+    lifetime_revenue_minor = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('customer_id', 'store_id')
+        db_table = 'customer_stats'
+
+
+class AggregateBuild(models.Model):
+    """
+    Thời điểm một bảng tổng hợp được dựng lại đầy đủ lần gần nhất. Không có bản ghi nghĩa là bảng có thể
+    chưa đầy đủ (chưa từng dựng, hoặc dữ liệu được nạp thẳng bằng SQL), khi đó báo cáo tính lại từ order_items.
+    """
+    name = models.CharField(max_length=32, primary_key=True)
+    built_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'aggregate_builds'
+
+
+class SalesCube(models.Model):
+    """
+    Khối dữ liệu bán hàng tổng hợp sẵn theo (cửa hàng, thương hiệu, danh mục, tháng).
+    Mọi truy vấn roll-up/drill-down đều cộng các ô của bảng này, không đọc lại order_items.
+    """
+    store_id = models.ForeignKey('sales.Store', db_column='store_id', on_delete=models.CASCADE)
+    brand_id = models.ForeignKey('production.Brand', db_column='brand_id', on_delete=models.CASCADE)
+    category_id = models.ForeignKey('production.Category', db_column='category_id', on_delete=models.CASCADE)
+    month = models.DateField()
+    units = models.IntegerField(default=0)
+    line_count = models.IntegerField(default=0)
+    # Doanh thu theo minor units (1/10000), xem report.money
+    revenue_minor = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('store_id', 'brand_id', 'category_id', 'month')
+        db_table = 'sales_cube'
+
+
+class ProductAffinity(models.Model):
+    """
+    Luật kết hợp giữa hai sản phẩm thường được mua cùng nhau (product_id -> other_product_id).
+    Được làm mới bằng lệnh refresh_product_affinity.
+    """
+    product_id = models.ForeignKey('production.Product', db_column='product_id', on_delete=models.CASCADE)
+    other_product_id = models.ForeignKey(
+        'production.Product', db_column='other_product_id', on_delete=models.CASCADE, related_name='+'
+    )
+    pair_count = models.IntegerField()
+    support = models.FloatField()
+    confidence = models.FloatField()
+    lift = models.FloatField()
+
+    class Meta:
+        unique_together = ('product_id', 'other_product_id')
+        db_table = 'product_affinity'
+
+
+class ProductRecommendation(models.Model):
+    """
+    Danh sách top-K sản phẩm tương tự (khách mua X cũng mua Y) theo độ tương đồng cosine.
+    Được dựng bằng lệnh build_recommendations.
+    """
+    product_id = models.ForeignKey('production.Product', db_column='product_id', on_delete=models.CASCADE)
+    recommended_product_id = models.ForeignKey(
+        'production.Product', db_column='recommended_product_id', on_delete=models.CASCADE, related_name='+'
+    )
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        unique_together = ('product_id', 'rank')
+        db_table = 'product_recommendations'
+
+
+class OrderStatusCounter(models.Model):
+    """
+    Số đơn hàng theo (cửa hàng, trạng thái, ngày đặt), được tăng/giảm ngay trong giao dịch ghi đơn hàng.
+    Dùng cho các dashboard theo dõi funnel trạng thái mà không phải COUNT trên bảng orders.
+    """
+    store_id = models.ForeignKey('sales.Store', db_column='store_id', on_delete=models.CASCADE)
+    order_status = models.PositiveSmallIntegerField()
+    day = models.DateField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('store_id', 'order_status', 'day')
+        db_table = 'order_status_counters'
+
+
+class ReportSnapshot(models.Model):
+    """
+    Kết quả báo cáo tính sẵn theo cửa hàng (store_id rỗng = toàn hệ thống), tạo bởi lệnh precompute_reports.
+    Mỗi lần chạy ghi một version mới; các view trả về version mới nhất khi có tham số snapshot=latest.
+    """
+    version = models.PositiveIntegerField()
+    report = models.CharField(max_length=32)
+    store_id = models.IntegerField(null=True, blank=True)
+    period = models.CharField(max_length=10, blank=True, default='')
+    as_of = models.DateField()
+    row_count = models.IntegerField(default=0)
+    data = models.JSONField(encoder=SnapshotJSONEncoder, decoder=SnapshotJSONDecoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['report', 'store_id', 'period', 'version'])]
+        db_table = 'report_snapshots'
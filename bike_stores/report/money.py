@@ -0,0 +1,59 @@
+"""
+Tiền tệ dạng số nguyên (minor units) cho các phép tổng hợp báo cáo.
+
+Một dòng hàng có doanh thu quantity * list_price * (1 - discount) với list_price và discount đều có
+2 chữ số thập phân, nên doanh thu luôn là bội của 0.0001. Lưu theo đơn vị 1/10000 giúp mọi phép cộng
+(SQL SUM, sum() của Python, mảng int64 của NumPy) đều chính xác, và chỉ đổi sang Decimal ở đầu ra.
+"""
+from decimal import ROUND_HALF_EVEN, Decimal
+
+from django.db import models
+from django.db.models import functions as fn
+
+MINOR_UNIT_DIGITS = 4
+MINOR_UNITS = 10 ** MINOR_UNIT_DIGITS
+_QUANTUM = Decimal(1).scaleb(-MINOR_UNIT_DIGITS)
+
+
+def to_minor(value) -> int:
+    """
+    Đổi một số tiền (Decimal, int, float hoặc chuỗi) sang minor units, làm tròn half-even ở chữ số thứ 4.
+    """
+    if value is None:
+        return 0
+    if isinstance(value, float):
+        value = repr(value)
+    return int(Decimal(value).quantize(_QUANTUM, rounding=ROUND_HALF_EVEN).scaleb(MINOR_UNIT_DIGITS))
+
+
+def from_minor(minor: int | None) -> Decimal:
+    """
+    Đổi minor units về Decimal 4 chữ số thập phân (chỉ dùng ở đầu ra của service).
+    """
+    return Decimal(int(minor or 0)).scaleb(-MINOR_UNIT_DIGITS)
+
+
+def line_revenue_minor_expr(prefix: str = '') -> models.Expression:
+    """
+    Biểu thức doanh thu một dòng hàng theo minor units:
+    quantity * (list_price tính bằng cent) * (100 - discount tính bằng phần trăm), toàn bộ là số nguyên.
+
+    Args:
+        prefix (str): Tiền tố quan hệ tới OrderItem (ví dụ 'orderitem__' khi truy vấn từ Order).
+    """
+    price_cents = fn.Cast(fn.Round(models.F(f'{prefix}list_price') * 100), output_field=models.BigIntegerField())
+    discount_percent = fn.Cast(fn.Round(models.F(f'{prefix}discount') * 100), output_field=models.BigIntegerField())
+    return models.ExpressionWrapper(
+        models.F(f'{prefix}quantity') * price_cents * (models.Value(100) - discount_percent),
+        output_field=models.BigIntegerField()
+    )
+
+
+def line_revenue_minor_sql(alias: str) -> str:
+    """
+    Đoạn SQL thuần tương đương line_revenue_minor_expr cho bảng order_items có alias cho trước.
+    """
+    return (
+        f"({alias}.quantity * CAST(ROUND({alias}.list_price * 100) AS INTEGER) "
+        f"* (100 - CAST(ROUND({alias}.discount * 100) AS INTEGER)))"
+    )
@@ -0,0 +1,202 @@
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from production.models import Product
+from sales.models import OrderItem
+from .models import AggregateBuild, ProductRecommendation
+
+# Tên bản ghi aggregate_builds đánh dấu lần dựng product_recommendations gần nhất
+BUILD_NAME = 'product_recommendations'
+
+
+def compute_item_neighbors(customer_ids: np.ndarray, product_ids: np.ndarray, top_k: int,
+                           block_size: int = 512) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Tìm top_k sản phẩm tương đồng nhất cho mỗi sản phẩm theo cosine trên vector khách hàng đã mua.
+
+    Số khách mua chung của từng cặp sản phẩm được đếm thưa: với mỗi khối block_size sản phẩm, các cặp
+    (sản phẩm trong khối, sản phẩm khác của cùng khách hàng) được cộng dồn bằng np.add.at vào ma trận
+    khối x sản phẩm. Bộ nhớ tỉ lệ với block_size x số sản phẩm, không phụ thuộc số khách hàng.
+
+    Returns:
+        tuple: (products, neighbors, scores) với neighbors/scores có dạng (số sản phẩm, top_k);
+        ô không có láng giềng có neighbor = -1 và score = 0.
+    """
+    products, product_index = np.unique(product_ids, return_inverse=True)
+    customers, customer_index = np.unique(customer_ids, return_inverse=True)
+    top_k = min(top_k, max(len(products) - 1, 0))
+
+    neighbors = np.full((len(products), top_k), -1, dtype=np.int64)
+    scores = np.zeros((len(products), top_k), dtype=np.float64)
+    if top_k == 0:
+        return products, neighbors, scores
+
+    # Các cặp (khách hàng, sản phẩm) không trùng, sắp theo khách hàng để mỗi khách là một đoạn liền nhau
+    pairs = np.unique(customer_index.astype(np.int64) * len(products) + product_index)
+    pair_customers, pair_products = np.divmod(pairs, len(products))
+    basket_sizes = np.bincount(pair_customers, minlength=len(customers))
+    basket_starts = np.cumsum(basket_sizes) - basket_sizes
+    norms = np.sqrt(np.bincount(pair_products, minlength=len(products)).astype(np.float64))
+
+    for start in range(0, len(products), block_size):
+        stop = min(start + block_size, len(products))
+        rows = np.arange(stop - start)
+
+        # Mỗi lần mua một sản phẩm trong khối ghép với toàn bộ giỏ sản phẩm của khách hàng đó
+        left = np.flatnonzero((pair_products >= start) & (pair_products < stop))
+        repeats = basket_sizes[pair_customers[left]]
+        within_basket = np.arange(repeats.sum()) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+        right = pair_products[np.repeat(basket_starts[pair_customers[left]], repeats) + within_basket]
+        co_purchases = np.zeros((stop - start, len(products)), dtype=np.float64)
+        np.add.at(co_purchases, (np.repeat(pair_products[left] - start, repeats), right), 1.0)
+
+        similarity = co_purchases / np.outer(norms[start:stop], norms)
+        similarity[rows, start + rows] = 0.0
+
+        # argpartition lấy top_k không cần sắp xếp toàn bộ, sau đó chỉ sắp xếp top_k phần tử
+        candidates = np.argpartition(-similarity, top_k - 1, axis=1)[:, :top_k]
+        candidate_scores = np.take_along_axis(similarity, candidates, axis=1)
+        order = np.lexsort((products[candidates], -candidate_scores), axis=1)
+        candidates = np.take_along_axis(candidates, order, axis=1)
+        candidate_scores = np.take_along_axis(candidate_scores, order, axis=1)
+
+        has_score = candidate_scores > 0
+        neighbors[start:stop] = np.where(has_score, products[candidates], -1)
+        scores[start:stop] = np.where(has_score, candidate_scores, 0.0)
+
+    return products, neighbors, scores
+
+
+def build_recommendations(top_k: int = 10) -> int:
+    """
+    Dựng lại bảng product_recommendations từ order_items. Trả về số dòng đã lưu.
+    """
+    pairs = list(
+        OrderItem.objects
+        .exclude(order_id__customer_id__isnull=True)
+        .values_list('order_id__customer_id', 'product_id')
+        .distinct()
+        .order_by()
+    )
+    customer_ids = np.fromiter((pair[0] for pair in pairs), dtype=np.int64, count=len(pairs))
+    product_ids = np.fromiter((pair[1] for pair in pairs), dtype=np.int64, count=len(pairs))
+
+    products, neighbors, scores = compute_item_neighbors(customer_ids, product_ids, top_k)
+
+    recommendations = [
+        ProductRecommendation(
+            product_id_id=int(product_id),
+            recommended_product_id_id=int(neighbor),
+            rank=rank,
+            score=float(score),
+        )
+        for product_id, row_neighbors, row_scores in zip(products, neighbors, scores)
+        for rank, (neighbor, score) in enumerate(zip(row_neighbors, row_scores), start=1)
+        if neighbor >= 0
+    ]
+    with transaction.atomic():
+        ProductRecommendation.objects.all().delete()
+        ProductRecommendation.objects.bulk_create(recommendations, batch_size=1000)
+        # Worker khác so thời điểm này với chỉ mục đang nạp để biết cần nạp lại
+        AggregateBuild.objects.update_or_create(name=BUILD_NAME, defaults={'built_at': timezone.now()})
+    reset_recommendation_index()
+    return len(recommendations)
+
+
+class RecommendationIndex:
+    """
+    Chỉ mục gợi ý nạp sẵn trong bộ nhớ: mảng láng giềng/điểm liền nhau kèm vị trí bắt đầu của từng sản phẩm.
+    Tra cứu là O(1) và không truy vấn cơ sở dữ liệu.
+    """
+
+    def __init__(self, product_names: dict[int, str], offsets: dict[int, tuple[int, int]],
+                 neighbors: np.ndarray, scores: np.ndarray, build_version=None):
+        self.product_names = product_names
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.scores = scores
+        self.build_version = build_version
+        self.checked_at = time.monotonic()
+
+    @classmethod
+    def load(cls) -> 'RecommendationIndex':
+        build_version = current_build_version()
+        rows = list(
+            ProductRecommendation.objects
+            .order_by('product_id', 'rank')
+            .values_list('product_id', 'recommended_product_id', 'score')
+        )
+        neighbors = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+        scores = np.fromiter((row[2] for row in rows), dtype=np.float32, count=len(rows))
+
+        offsets = {}
+        for position, (product_id, _, _) in enumerate(rows):
+            start, _ = offsets.get(product_id, (position, position))
+            offsets[product_id] = (start, position + 1)
+
+        product_names = dict(Product.objects.values_list('product_id', 'product_name'))
+        return cls(product_names, offsets, neighbors, scores, build_version)
+
+    def is_stale(self) -> bool:
+        """
+        build_recommendations đã chạy lại kể từ khi nạp. Chỉ truy vấn mỗi REPORT_RECOMMENDATIONS_CHECK_SECONDS giây.
+        """
+        if time.monotonic() - self.checked_at < settings.REPORT_RECOMMENDATIONS_CHECK_SECONDS:
+            return False
+        self.checked_at = time.monotonic()
+        return current_build_version() != self.build_version
+
+    def __contains__(self, product_id: int) -> bool:
+        return product_id in self.product_names
+
+    def lookup(self, product_id: int, limit: int | None = None) -> list[dict]:
+        start, stop = self.offsets.get(product_id, (0, 0))
+        if limit is not None:
+            stop = min(stop, start + limit)
+        return [
+            {
+                'product_id': int(neighbor),
+                'product_name': self.product_names.get(int(neighbor), 'Không xác định'),
+                'score': round(float(score), 4),
+            }
+            for neighbor, score in zip(self.neighbors[start:stop], self.scores[start:stop])
+        ]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def current_build_version():
+    """
+    Thời điểm build_recommendations chạy xong lần gần nhất (None nếu chưa có).
+    """
+    return AggregateBuild.objects.filter(name=BUILD_NAME).values_list('built_at', flat=True).first()
+
+
+def get_recommendation_index() -> RecommendationIndex:
+    """
+    Chỉ mục gợi ý dùng chung cho cả worker: nạp ở lần gọi đầu tiên, nạp lại khi build_recommendations đã chạy
+    ở tiến trình khác (kiểm tra mỗi REPORT_RECOMMENDATIONS_CHECK_SECONDS giây).
+    """
+    global _index
+    index = _index
+    if index is None or index.is_stale():
+        with _index_lock:
+            if _index is index:
+                _index = RecommendationIndex.load()
+            return _index
+    return index
+
+
+def reset_recommendation_index() -> None:
+    """
+    Bỏ chỉ mục đang nạp để lần gọi sau đọc lại từ bảng product_recommendations.
+    """
+    global _index
+    _index = None
@@ -0,0 +1,136 @@
+import math
+from datetime import date, timedelta
+from statistics import NormalDist
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from sales.models import Store
+from .cache import coalesced, report_cache_key
+from .utils import normalized_date_sql
+
+REPLENISHMENT_SQL = """
+WITH daily AS (
+    SELECT o.store_id AS store_id, oi.product_id AS product_id, {order_date} AS day,
+           SUM(oi.quantity) AS units
+    FROM order_items oi
+    JOIN orders o ON o.order_id = oi.order_id
+    WHERE {order_date} BETWEEN %s AND %s AND o.store_id IN ({store_placeholders})
+    GROUP BY o.store_id, oi.product_id, day
+),
+velocity AS (
+    SELECT store_id, product_id, SUM(units) AS total_units, SUM(units * units) AS total_units_squared
+    FROM daily
+    GROUP BY store_id, product_id
+)
+SELECT s.store_id, st.store_name, s.product_id, p.product_name, s.quantity,
+       COALESCE(v.total_units, 0) AS total_units,
+       COALESCE(v.total_units_squared, 0) AS total_units_squared
+FROM stocks s
+JOIN stores st ON st.store_id = s.store_id
+JOIN products p ON p.product_id = s.product_id
+LEFT JOIN velocity v ON v.store_id = s.store_id AND v.product_id = s.product_id
+WHERE s.store_id IN ({store_placeholders})
+"""
+
+
+def _compute_store_recommendations(store_ids: list[int], as_of: date, window_days: int, lead_time_days: int,
+                                   review_days: int, service_level: float) -> dict[int, list[dict]]:
+    """
+    Tính khuyến nghị nhập hàng cho các cửa hàng bằng một truy vấn gộp stocks với tốc độ bán.
+
+    Tốc độ bán là trung bình số lượng bán mỗi ngày trong window_days ngày tính đến as_of (kể cả ngày không bán),
+    độ lệch chuẩn được suy ra từ tổng và tổng bình phương số lượng theo ngày.
+    """
+    start_date = as_of - timedelta(days=window_days - 1)
+    placeholders = ', '.join(['%s'] * len(store_ids))
+    sql = REPLENISHMENT_SQL.format(order_date=normalized_date_sql('o.order_date'), store_placeholders=placeholders)
+    params = [start_date.isoformat(), as_of.isoformat(), *store_ids, *store_ids]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [col[0] for col in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    z_score = NormalDist().inv_cdf(service_level)
+    recommendations = {store_id: [] for store_id in store_ids}
+    for row in rows:
+        daily_velocity = row['total_units'] / window_days
+        variance = max(row['total_units_squared'] / window_days - daily_velocity ** 2, 0.0)
+        safety_stock = z_score * math.sqrt(variance) * math.sqrt(lead_time_days)
+        reorder_point = math.ceil(daily_velocity * lead_time_days + safety_stock)
+        order_up_to = math.ceil(daily_velocity * (lead_time_days + review_days) + safety_stock)
+        quantity = row['quantity']
+        needs_reorder = daily_velocity > 0 and quantity <= reorder_point
+
+        recommendations[row['store_id']].append({
+            'store_id': row['store_id'],
+            'store_name': row['store_name'],
+            'product_id': row['product_id'],
+            'product_name': row['product_name'],
+            'quantity': quantity,
+            'daily_velocity': round(daily_velocity, 4),
+            'days_of_cover': round(quantity / daily_velocity, 1) if daily_velocity else None,
+            'safety_stock': math.ceil(safety_stock),
+            'reorder_point': reorder_point,
+            'needs_reorder': needs_reorder,
+            'recommended_order_quantity': max(order_up_to - quantity, 0) if needs_reorder else 0,
+        })
+    return recommendations
+
+
+def _ranking_key(item: dict) -> tuple:
+    # Cần nhập trước, sau đó đến số ngày còn đủ hàng ít nhất, cuối cùng là tốc độ bán cao nhất
+    days_of_cover = item['days_of_cover'] if item['days_of_cover'] is not None else math.inf
+    return not item['needs_reorder'], days_of_cover, -item['daily_velocity'], item['store_id'], item['product_id']
+
+
+@coalesced('replenishment-report')
+def get_replenishment_report(as_of: date, store_id: int | None = None, window_days: int = 90,
+                             lead_time_days: int = 7, review_days: int = 7, service_level: float = 0.95) -> dict:
+    """
+    Khuyến nghị điểm đặt hàng lại (reorder point) và số lượng cần nhập theo cửa hàng, sản phẩm.
+
+    Kết quả được cache theo từng cửa hàng; khi xem toàn hệ thống, chỉ các cửa hàng chưa có trong cache
+    mới được tính lại (trong một truy vấn duy nhất).
+    """
+    if store_id:
+        store_ids = [store_id]
+        try:
+            store_name = Store.objects.get(pk=store_id).store_name
+        except Store.DoesNotExist:
+            store_name = f"Không tìm thấy cửa hàng ID {store_id}"
+    else:
+        store_ids = list(Store.objects.order_by('store_id').values_list('store_id', flat=True))
+        store_name = "Toàn hệ thống"
+
+    params = {
+        'as_of': as_of.isoformat(), 'window_days': window_days, 'lead_time_days': lead_time_days,
+        'review_days': review_days, 'service_level': service_level,
+    }
+    keys = {sid: report_cache_key('replenishment', store_id=sid, **params) for sid in store_ids}
+    cached = cache.get_many(keys.values())
+    per_store = {sid: cached[key] for sid, key in keys.items() if key in cached}
+
+    missing = [sid for sid in store_ids if sid not in per_store]
+    if missing:
+        computed = _compute_store_recommendations(
+            missing, as_of, window_days, lead_time_days, review_days, service_level
+        )
+        cache.set_many({keys[sid]: items for sid, items in computed.items()}, settings.REPORT_CACHE_TIMEOUT)
+        per_store.update(computed)
+
+    items = sorted((item for sid in store_ids for item in per_store[sid]), key=_ranking_key)
+    for rank, item in enumerate(items, start=1):
+        item['rank'] = rank
+
+    return {
+        'store_name': store_name,
+        'as_of': as_of,
+        'summary': {
+            'product_count': len(items),
+            'reorder_count': sum(1 for item in items if item['needs_reorder']),
+        },
+        'data': items,
+    }
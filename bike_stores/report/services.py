@@ -1,14 +1,21 @@
 from production.models import Stock, Product
-from sales.models import Store, OrderItem
-from .utils import calculate_percentile_rank
+from sales.models import Customer, Store, Order, OrderItem
+from . import columnar
+from .aggregates import is_aggregate_built
+from .cache import coalesced
+from .models import CustomerStats, OrderStatusCounter, SalesCube
+from .money import from_minor, line_revenue_minor_expr, line_revenue_minor_sql
+from .utils import calculate_percentile_rank, casted_order_date_expr, normalized_date_sql
 
 from datetime import date, timedelta
 from decimal import Decimal
-from django.db import models
+from django.conf import settings
+from django.db import connection, models
 from django.db.models import functions as fn
 
 import math
 
+@coalesced('inventory')
 def get_inventory_report_data(store_id=None)->dict:
     """
     Lấy dữ liệu tồn kho theo từng sản phẩm theo cửa hàng
@@ -44,34 +51,29 @@ def get_inventory_report_data(store_id=None)->dict:
     return report_data_grouped
 
 
-def get_revenue_report_data(end_date: date, start_date: date | None = None, period: str = 'month',
-                            store_id: int | None = None) -> dict:
+def get_latest_order_date() -> date | None:
     """
-    Lấy dữ liệu doanh thu, có thể lọc theo cửa hàng.
+    Ngày có đơn hàng gần nhất (dùng làm mốc mặc định cho các báo cáo tính lùi theo thời gian).
     """
-    order_date_expr = models.Case(
-        models.When(
-            condition=models.Q(order_id__order_date__regex=r'^\d{8}$'),
-            then=fn.Cast(
-                fn.Concat(
-                    fn.Substr(fn.Cast('order_id__order_date', output_field=models.CharField()), 1, 4),
-                    models.Value('-'),
-                    fn.Substr(fn.Cast('order_id__order_date', output_field=models.CharField()), 5, 2),
-                    models.Value('-'),
-                    fn.Substr(fn.Cast('order_id__order_date', output_field=models.CharField()), 7, 2)
-                ),
-                output_field=models.DateField()
-            )
-        ),
-        default=fn.Cast('order_id__order_date', output_field=models.DateField()),
-        output_field=models.DateField()
+    return (
+        OrderItem.objects
+        .annotate(casted_order_date=casted_order_date_expr())
+        .aggregate(last_date=models.Max('casted_order_date'))['last_date']
     )
 
-    queryset = OrderItem.objects.annotate(casted_order_date=order_date_expr)
-    queryset = queryset.exclude(casted_order_date__isnull=True)
 
+@coalesced('revenue')
+def get_revenue_report_data(end_date: date, start_date: date | None = None, period: str = 'month',
+                            store_id: int | None = None, compare: str | None = None,
+                            engine: str | None = None) -> dict:
+    """
+    Lấy dữ liệu doanh thu, có thể lọc theo cửa hàng.
+    compare='yoy' so sánh với cùng kỳ năm trước, compare='prev' với khoảng liền trước có cùng độ dài.
+    engine='orm' gom nhóm bằng SQL (khoảng hiện tại và khoảng so sánh trong cùng một truy vấn),
+    engine='columnar' gom nhóm trên các cột NumPy trong bộ nhớ; mặc định theo settings.REPORT_ENGINE.
+    """
+    engine = engine or settings.REPORT_ENGINE
     if store_id:
-        queryset = queryset.filter(order_id__store_id=store_id)
         try:
             store_name = Store.objects.get(pk=store_id).store_name
         except Store.DoesNotExist:
@@ -79,19 +81,97 @@ def get_revenue_report_data(end_date: date, start_date: date | None = None, peri
     else:
         store_name = "Toàn hệ thống"
 
-    actual_range = queryset.aggregate(
-        first_date=models.Min('casted_order_date'),
-        last_date=models.Max('casted_order_date')
-    )
-    if not actual_range['first_date']:
+    if engine == 'columnar':
+        lines = columnar.get_columnar_engine()
+        first_date, last_date = columnar.order_date_range(lines, store_id)
+    else:
+        queryset = OrderItem.objects.annotate(casted_order_date=casted_order_date_expr())
+        queryset = queryset.exclude(casted_order_date__isnull=True)
+        if store_id:
+            queryset = queryset.filter(order_id__store_id=store_id)
+        actual_range = queryset.aggregate(
+            first_date=models.Min('casted_order_date'),
+            last_date=models.Max('casted_order_date')
+        )
+        first_date, last_date = actual_range['first_date'], actual_range['last_date']
+    if not first_date:
         return {'data': [], 'store_name': store_name}
 
-    final_start_date = start_date if start_date else actual_range['first_date']
-    final_end_date = min(end_date, actual_range['last_date'])
+    final_start_date = start_date if start_date else first_date
+    final_end_date = min(end_date, last_date)
     if final_start_date > final_end_date:
         return {'data': [], 'store_name': store_name}
 
-    date_filters = {'casted_order_date__range': [final_start_date, final_end_date]}
+    comparison_start_date = comparison_end_date = None
+    if compare:
+        comparison_start_date, comparison_end_date = _comparison_window(final_start_date, final_end_date, compare)
+
+    if engine == 'columnar':
+        sales_by_period = columnar.revenue_by_period(lines, final_start_date, final_end_date, period, store_id)
+        comparison_by_period = {}
+        if compare:
+            comparison_by_period = columnar.revenue_by_period(
+                lines, comparison_start_date, comparison_end_date, period, store_id
+            )
+    else:
+        sales_by_period, comparison_by_period = _revenue_by_period_orm(
+            queryset, final_start_date, final_end_date, period, comparison_start_date, comparison_end_date
+        )
+
+    # Doanh thu được cộng theo minor units (số nguyên), chỉ đổi sang Decimal khi trả kết quả
+    full_report_data = [
+        {'period': period_start, 'total_revenue': sales_by_period.get(period_start.isoformat()) or 0}
+        for period_start in _period_starts(final_start_date, final_end_date, period)
+    ]
+
+    if not compare:
+        for item in full_report_data:
+            item['total_revenue'] = from_minor(item['total_revenue'])
+        return {'store_name': store_name, 'data': full_report_data}
+
+    # Ghép các kỳ theo thứ tự: kỳ thứ i của khoảng hiện tại với kỳ thứ i của khoảng so sánh
+    comparison_starts = _period_starts(comparison_start_date, comparison_end_date, period)
+    for index, item in enumerate(full_report_data):
+        comparison_period = comparison_starts[index] if index < len(comparison_starts) else None
+        comparison_revenue = 0
+        if comparison_period:
+            comparison_revenue = comparison_by_period.get(comparison_period.isoformat()) or 0
+        item['comparison_revenue'] = comparison_revenue
+        item['comparison_period'] = comparison_period
+
+    total_revenue = sum(item['total_revenue'] for item in full_report_data)
+    comparison_total = sum(item['comparison_revenue'] for item in full_report_data)
+    for item in full_report_data:
+        item['total_revenue'] = from_minor(item['total_revenue'])
+        item.update(_comparison_fields(item['total_revenue'], from_minor(item['comparison_revenue'])))
+    comparison = {
+        'type': compare,
+        'start_date': comparison_start_date,
+        'end_date': comparison_end_date,
+        'total_revenue': from_minor(total_revenue),
+        **_comparison_fields(from_minor(total_revenue), from_minor(comparison_total)),
+    }
+
+    return {'store_name': store_name, 'data': full_report_data, 'comparison': comparison}
+
+
+def _revenue_by_period_orm(queryset, start_date: date, end_date: date, period: str,
+                           comparison_start_date: date | None, comparison_end_date: date | None) -> tuple[dict, dict]:
+    """
+    Doanh thu (minor units) theo kỳ của khoảng hiện tại và khoảng so sánh, gom trong cùng một truy vấn.
+    """
+    current_window = models.Q(casted_order_date__range=[start_date, end_date])
+    measures = {'total_revenue': models.Sum(line_revenue_minor_expr())}
+    date_filter = current_window
+    if comparison_start_date:
+        comparison_window = models.Q(casted_order_date__range=[comparison_start_date, comparison_end_date])
+        # Hai khoảng có thể chồng lấn (yoy trên nhiều năm) nên mỗi dòng được cộng vào từng khoảng chứa nó
+        measures = {
+            'total_revenue': models.Sum(line_revenue_minor_expr(), filter=current_window),
+            'comparison_revenue': models.Sum(line_revenue_minor_expr(), filter=comparison_window),
+        }
+        date_filter = current_window | comparison_window
+
     time_trunc = {
         'day': fn.TruncDay('casted_order_date'), 'week': fn.TruncWeek('casted_order_date'),
         'month': fn.TruncMonth('casted_order_date'), 'quarter': fn.TruncQuarter('casted_order_date'),
@@ -99,21 +179,52 @@ def get_revenue_report_data(end_date: date, start_date: date | None = None, peri
     }.get(period, fn.TruncMonth('casted_order_date'))
 
     sales_data_from_db = (
-        queryset.filter(**date_filters)
+        queryset.filter(date_filter)
         .annotate(period=time_trunc).values('period')
-        .annotate(total_revenue=models.Sum(
-            models.F('quantity') * models.F('list_price') * (Decimal('1.0') - models.F('discount')),
-            output_field=models.DecimalField()
-        ))
+        .annotate(**measures)
     )
 
-    sales_by_period = {
-        item['period'].isoformat(): item['total_revenue'] for item in sales_data_from_db if item['period']
+    sales_by_period = {}
+    comparison_by_period = {}
+    for item in sales_data_from_db:
+        if item['period']:
+            sales_by_period[item['period'].isoformat()] = item['total_revenue']
+            comparison_by_period[item['period'].isoformat()] = item.get('comparison_revenue')
+    return sales_by_period, comparison_by_period
+
+
+def _comparison_window(start_date: date, end_date: date, compare: str) -> tuple[date, date]:
+    """
+    Khoảng so sánh: cùng kỳ năm trước (yoy) hoặc khoảng liền trước có cùng số ngày (prev).
+    """
+    if compare == 'yoy':
+        return _shift_years(start_date, -1), _shift_years(end_date, -1)
+    length = end_date - start_date + timedelta(days=1)
+    return start_date - length, start_date - timedelta(days=1)
+
+
+def _shift_years(value: date, years: int) -> date:
+    try:
+        return value.replace(year=value.year + years)
+    except ValueError:  # 29/02 -> 28/02
+        return value.replace(year=value.year + years, day=28)
+
+
+def _comparison_fields(revenue: Decimal, comparison_revenue: Decimal) -> dict:
+    return {
+        'comparison_revenue': comparison_revenue,
+        'delta': revenue - comparison_revenue,
+        'growth_rate': (revenue - comparison_revenue) / comparison_revenue * 100 if comparison_revenue else None,
     }
 
-    full_report_data = []
-    current_date = final_start_date
-    while current_date <= final_end_date:
+
+def _period_starts(start_date: date, end_date: date, period: str) -> list[date]:
+    """
+    Danh sách ngày bắt đầu của các kỳ (ngày/tuần/tháng/quý/năm) phủ khoảng [start_date, end_date].
+    """
+    period_starts = []
+    current_date = start_date
+    while current_date <= end_date:
         if period == 'day':
             period_start = current_date; current_date += timedelta(days=1)
         elif period == 'week':
@@ -132,47 +243,24 @@ def get_revenue_report_data(end_date: date, start_date: date | None = None, peri
         else:  # year
             period_start = date(current_date.year, 1, 1);
             current_date = date(current_date.year + 1, 1, 1)
-        if period_start <= final_end_date and (not full_report_data or full_report_data[-1]['period'] != period_start):
-            period_key = period_start.isoformat()
-            revenue = sales_by_period.get(period_key, Decimal('0.0'))
-            full_report_data.append({'period': period_start, 'total_revenue': revenue})
-
-    return {'store_name': store_name, 'data': full_report_data}
+        if period_start <= end_date and (not period_starts or period_starts[-1] != period_start):
+            period_starts.append(period_start)
+    return period_starts
 
 
-def get_pareto_customer_analysis(end_date: date, start_date: date | None = None, store_id: int | None = None) -> dict:
+@coalesced('customer-analysis')
+def get_pareto_customer_analysis(end_date: date, start_date: date | None = None, store_id: int | None = None,
+                                 engine: str | None = None) -> dict:
     """
     Phân tích khách hàng theo nguyên lý Pareto, có thể lọc theo cửa hàng.
     Gán cờ is_8020 cho nhóm khách hàng top và trả về toàn bộ danh sách.
+    Với engine='orm', đọc từ bảng customer_stats khi khoảng ngày bao trùm toàn bộ dữ liệu, ngược lại tính
+    từ order_items; với engine='columnar', gom nhóm trên các cột NumPy trong bộ nhớ.
     """
-
-    order_date_expr = models.Case(
-        models.When(
-            condition=models.Q(order_id__order_date__regex=r'^\d{8}$'),
-            then=fn.Cast(
-                fn.Concat(
-                    fn.Substr(fn.Cast('order_id__order_date', output_field=models.CharField()), 1, 4),
-                    models.Value('-'),
-                    fn.Substr(fn.Cast('order_id__order_date', output_field=models.CharField()), 5, 2),
-                    models.Value('-'),
-                    fn.Substr(fn.Cast('order_id__order_date', output_field=models.CharField()), 7, 2)
-                ),
-                output_field=models.DateField()
-            )
-        ),
-        default=fn.Cast('order_id__order_date', output_field=models.DateField()),
-        output_field=models.DateField()
-    )
-    queryset = OrderItem.objects.annotate(casted_order_date=order_date_expr).exclude(casted_order_date__isnull=True)
-
-    date_filters = {}
-    if start_date: date_filters['casted_order_date__gte'] = start_date
-    if end_date: date_filters['casted_order_date__lte'] = end_date
-    if date_filters: queryset = queryset.filter(**date_filters)
+    engine = engine or settings.REPORT_ENGINE
 
     # Lọc theo store_id nếu được cung cấp
     if store_id:
-        queryset = queryset.filter(order_id__store_id=store_id)
         try:
             store_name = Store.objects.get(pk=store_id).store_name
         except Store.DoesNotExist:
@@ -180,18 +268,12 @@ def get_pareto_customer_analysis(end_date: date, start_date: date | None = None,
     else:
         store_name = "Toàn hệ thống"
 
-
-    customer_revenues_qs = (
-        queryset
-        .values('order_id__customer_id', 'order_id__customer_id__first_name', 'order_id__customer_id__last_name',
-                'order_id__customer_id__email')
-        .annotate(customer_revenue=models.Sum(
-            models.F('quantity') * models.F('list_price') * (Decimal('1.0') - models.F('discount'))
-        ))
-        .order_by('-customer_revenue')
-    )
-
-    customer_revenues_list = list(customer_revenues_qs)
+    if engine == 'columnar':
+        customer_revenues_list = _customer_revenues_from_columns(start_date, end_date, store_id)
+    else:
+        customer_revenues_list = _customer_revenues_from_stats(start_date, end_date, store_id)
+    if customer_revenues_list is None:
+        customer_revenues_list = _customer_revenues_from_order_items(start_date, end_date, store_id)
 
     if not customer_revenues_list:
         return {'summary': 'Không có dữ liệu doanh thu phù hợp.', 'customers': [], 'store_name': store_name}
@@ -201,29 +283,30 @@ def get_pareto_customer_analysis(end_date: date, start_date: date | None = None,
     top_20_percent_count = math.ceil(total_customer_count * 0.2)
 
 
-    top_customer_ids = {c['order_id__customer_id'] for c in customer_revenues_list[:top_20_percent_count]}
+    top_customer_ids = {c['customer_id'] for c in customer_revenues_list[:top_20_percent_count]}
 
 
     all_customers_result = []
     all_revenues_sorted = sorted([c['customer_revenue'] for c in customer_revenues_list])
 
     for rank, customer_data in enumerate(customer_revenues_list):
-        customer_id = customer_data['order_id__customer_id']
+        customer_id = customer_data['customer_id']
         percentile = calculate_percentile_rank(all_revenues_sorted, customer_data['customer_revenue'])
 
         all_customers_result.append({
             "rank": rank + 1,
             "customer_id": customer_id,
-            "full_name": f"{customer_data['order_id__customer_id__first_name']} {customer_data['order_id__customer_id__last_name']}",
-            "email": customer_data['order_id__customer_id__email'],
-            "revenue": customer_data['customer_revenue'],
+            "full_name": f"{customer_data['first_name']} {customer_data['last_name']}",
+            "email": customer_data['email'],
+            "revenue": from_minor(customer_data['customer_revenue']),
             "percentile_rank": percentile,
             "is_8020": customer_id in top_customer_ids  # Gán cờ True/False
         })
 
+    # customer_revenue là minor units (số nguyên) nên các phép cộng dưới đây chính xác tuyệt đối
     top_customers_group = customer_revenues_list[:top_20_percent_count]
-    revenue_from_top_group = sum(c['customer_revenue'] for c in top_customers_group)
-    grand_total_revenue = sum(c['customer_revenue'] for c in customer_revenues_list)
+    revenue_from_top_group = from_minor(sum(c['customer_revenue'] for c in top_customers_group))
+    grand_total_revenue = from_minor(sum(c['customer_revenue'] for c in customer_revenues_list))
     percentage_revenue_from_top_group = (revenue_from_top_group / grand_total_revenue) * 100 if grand_total_revenue else 0
 
     summary = {
@@ -240,4 +323,381 @@ def get_pareto_customer_analysis(end_date: date, start_date: date | None = None,
         "store_name": store_name,
         "summary": summary,
         "customers": all_customers_result,
-    }
\ No newline at end of file
+    }
+
+
+def _customer_revenues_from_order_items(start_date: date | None, end_date: date | None,
+                                        store_id: int | None) -> list[dict]:
+    """
+    Tổng hợp doanh thu theo khách hàng trực tiếp từ order_items (dùng khi cần lọc theo khoảng ngày tùy ý).
+    Bỏ qua đơn không có khách hàng, giống customer_stats.
+    """
+    queryset = OrderItem.objects.annotate(casted_order_date=casted_order_date_expr()).exclude(casted_order_date__isnull=True)
+    queryset = queryset.exclude(order_id__customer_id__isnull=True)
+
+    date_filters = {}
+    if start_date: date_filters['casted_order_date__gte'] = start_date
+    if end_date: date_filters['casted_order_date__lte'] = end_date
+    if date_filters: queryset = queryset.filter(**date_filters)
+
+    if store_id:
+        queryset = queryset.filter(order_id__store_id=store_id)
+
+    customer_revenues_qs = (
+        queryset
+        .values('order_id__customer_id', 'order_id__customer_id__first_name', 'order_id__customer_id__last_name',
+                'order_id__customer_id__email')
+        .annotate(customer_revenue=models.Sum(line_revenue_minor_expr()))
+        .order_by('-customer_revenue', 'order_id__customer_id')
+    )
+
+    return [
+        {
+            'customer_id': row['order_id__customer_id'],
+            'first_name': row['order_id__customer_id__first_name'],
+            'last_name': row['order_id__customer_id__last_name'],
+            'email': row['order_id__customer_id__email'],
+            'customer_revenue': row['customer_revenue'],
+        }
+        for row in customer_revenues_qs
+    ]
+
+
+def _customer_revenues_from_columns(start_date: date | None, end_date: date | None,
+                                    store_id: int | None) -> list[dict]:
+    """
+    Tổng hợp doanh thu theo khách hàng trên các cột trong bộ nhớ, cùng thứ tự với _customer_revenues_from_order_items.
+    """
+    lines = columnar.get_columnar_engine()
+    customer_ids, revenues = columnar.customer_revenues(lines, start_date, end_date, store_id)
+    customers = Customer.objects.in_bulk([int(customer_id) for customer_id in customer_ids if customer_id >= 0])
+
+    customer_revenues_list = []
+    for customer_id, revenue in zip(customer_ids.tolist(), revenues.tolist()):
+        customer = customers.get(customer_id)
+        customer_revenues_list.append({
+            'customer_id': customer.customer_id if customer else None,
+            'first_name': customer.first_name if customer else None,
+            'last_name': customer.last_name if customer else None,
+            'email': customer.email if customer else None,
+            'customer_revenue': revenue,
+        })
+    return customer_revenues_list
+
+
+def _customer_revenues_from_stats(start_date: date | None, end_date: date | None,
+                                  store_id: int | None) -> list[dict] | None:
+    """
+    Đọc doanh thu theo khách hàng từ bảng customer_stats.
+
+    Bảng chỉ lưu số liệu trọn đời nên chỉ dùng được khi đã được dựng lại đầy đủ (rebuild_aggregates) và khoảng
+    ngày bao trùm toàn bộ lịch sử đơn hàng. Trả về None nếu không dùng được, khi đó cần tính lại từ order_items.
+    """
+    if not is_aggregate_built('customer_stats'):
+        return None
+
+    stats = CustomerStats.objects.all()
+    if store_id:
+        stats = stats.filter(store_id=store_id)
+
+    coverage = stats.aggregate(
+        first_date=models.Min('first_order_date'),
+        last_date=models.Max('last_order_date')
+    )
+    if not coverage['first_date']:
+        return None
+    if start_date and start_date > coverage['first_date']:
+        return None
+    if end_date and end_date < coverage['last_date']:
+        return None
+
+    customer_revenues_qs = (
+        stats
+        .values('customer_id', 'customer_id__first_name', 'customer_id__last_name', 'customer_id__email')
+        .annotate(customer_revenue=models.Sum('lifetime_revenue_minor'))
+        .order_by('-customer_revenue', 'customer_id')
+    )
+
+    return [
+        {
+            'customer_id': row['customer_id'],
+            'first_name': row['customer_id__first_name'],
+            'last_name': row['customer_id__last_name'],
+            'email': row['customer_id__email'],
+            'customer_revenue': row['customer_revenue'],
+        }
+        for row in customer_revenues_qs
+    ]
+
+
+@coalesced('customer-lifetime-value')
+def get_customer_lifetime_value(store_id: int | None = None, customer_id: int | None = None) -> dict:
+    """
+    Giá trị vòng đời khách hàng (CLV) đọc từ bảng customer_stats, có thể lọc theo cửa hàng hoặc khách hàng.
+    Danh sách được sắp xếp theo doanh thu trọn đời giảm dần.
+    """
+    if store_id:
+        try:
+            store_name = Store.objects.get(pk=store_id).store_name
+        except Store.DoesNotExist:
+            store_name = f"Không tìm thấy cửa hàng ID {store_id}"
+    else:
+        store_name = "Toàn hệ thống"
+
+    stats = CustomerStats.objects.all()
+    if store_id:
+        stats = stats.filter(store_id=store_id)
+    if customer_id:
+        stats = stats.filter(customer_id=customer_id)
+
+    customers_qs = (
+        stats
+        .values('customer_id', 'customer_id__first_name', 'customer_id__last_name', 'customer_id__email')
+        .annotate(
+            first_order_date=models.Min('first_order_date'),
+            last_order_date=models.Max('last_order_date'),
+            order_count=models.Sum('order_count'),
+            lifetime_revenue_minor=models.Sum('lifetime_revenue_minor'),
+        )
+        .order_by('-lifetime_revenue_minor', 'customer_id')
+    )
+
+    customers = []
+    total_revenue_minor = 0
+    for row in customers_qs:
+        order_count = row['order_count'] or 0
+        total_revenue_minor += row['lifetime_revenue_minor'] or 0
+        lifetime_revenue = from_minor(row['lifetime_revenue_minor'])
+        customers.append({
+            'customer_id': row['customer_id'],
+            'full_name': f"{row['customer_id__first_name']} {row['customer_id__last_name']}",
+            'email': row['customer_id__email'],
+            'first_order_date': row['first_order_date'],
+            'last_order_date': row['last_order_date'],
+            'lifetime_days': (row['last_order_date'] - row['first_order_date']).days,
+            'order_count': order_count,
+            'lifetime_revenue': lifetime_revenue,
+            'average_order_value': lifetime_revenue / order_count if order_count else Decimal('0.0'),
+        })
+
+    total_revenue = from_minor(total_revenue_minor)
+    summary = {
+        'customer_count': len(customers),
+        'total_lifetime_revenue': total_revenue,
+        'average_lifetime_value': total_revenue / len(customers) if customers else Decimal('0.0'),
+    }
+
+    return {'store_name': store_name, 'summary': summary, 'customers': customers}
+
+
+STAFF_PERFORMANCE_SQL = """
+WITH RECURSIVE
+staff_revenue AS (
+    SELECT o.staff_id AS staff_id,
+           COUNT(DISTINCT o.order_id) AS order_count,
+           SUM({line_revenue}) AS revenue
+    FROM orders o
+    JOIN order_items oi ON oi.order_id = o.order_id
+    WHERE {order_date} BETWEEN %s AND %s {store_filter}
+    GROUP BY o.staff_id
+),
+-- Mỗi nhân viên là tổ tiên của chính mình và của mọi cấp dưới trực tiếp/gián tiếp
+team(ancestor_id, member_id) AS (
+    SELECT staff_id, staff_id FROM staffs
+    UNION
+    SELECT team.ancestor_id, s.staff_id
+    FROM team JOIN staffs s ON s.manager_id = team.member_id
+),
+hierarchy(staff_id, level, path) AS (
+    SELECT staff_id, 0, printf('%%010d', staff_id) FROM staffs WHERE manager_id IS NULL
+    UNION
+    SELECT s.staff_id, h.level + 1, h.path || '/' || printf('%%010d', s.staff_id)
+    FROM staffs s JOIN hierarchy h ON s.manager_id = h.staff_id
+)
+SELECT s.staff_id, s.first_name, s.last_name, s.active, s.store_id, s.manager_id,
+       h.level,
+       COALESCE(own.order_count, 0) AS own_order_count,
+       COALESCE(own.revenue, 0) AS own_revenue,
+       COUNT(team.member_id) - 1 AS team_size,
+       COALESCE(SUM(member.order_count), 0) AS team_order_count,
+       COALESCE(SUM(member.revenue), 0) AS team_revenue
+FROM staffs s
+JOIN team ON team.ancestor_id = s.staff_id
+LEFT JOIN staff_revenue member ON member.staff_id = team.member_id
+LEFT JOIN staff_revenue own ON own.staff_id = s.staff_id
+LEFT JOIN hierarchy h ON h.staff_id = s.staff_id
+GROUP BY s.staff_id, s.first_name, s.last_name, s.active, s.store_id, s.manager_id, h.level, h.path,
+         own.order_count, own.revenue
+{having}
+ORDER BY h.path IS NULL, h.path, s.staff_id
+"""
+
+
+@coalesced('staff-performance')
+def get_staff_performance_report(end_date: date, start_date: date | None = None,
+                                 store_id: int | None = None) -> dict:
+    """
+    Doanh thu theo nhân viên bán hàng và cộng dồn theo cây quản lý (manager_id).
+
+    Toàn bộ cây được tổng hợp trong một truy vấn dùng recursive CTE:
+    own_* là số liệu của chính nhân viên, team_* gồm cả nhân viên đó và mọi cấp dưới.
+    """
+    if store_id:
+        try:
+            store_name = Store.objects.get(pk=store_id).store_name
+        except Store.DoesNotExist:
+            store_name = f"Không tìm thấy cửa hàng ID {store_id}"
+    else:
+        store_name = "Toàn hệ thống"
+
+    params = [(start_date or date.min).isoformat(), end_date.isoformat()]
+    store_filter = having = ''
+    if store_id:
+        store_filter = 'AND o.store_id = %s'
+        params.append(store_id)
+        # Chỉ giữ nhân viên của cửa hàng và những quản lý có doanh thu cộng dồn từ cửa hàng này
+        having = 'HAVING s.store_id = %s OR COALESCE(SUM(member.revenue), 0) > 0'
+        params.append(store_id)
+
+    sql = STAFF_PERFORMANCE_SQL.format(
+        order_date=normalized_date_sql('o.order_date'), line_revenue=line_revenue_minor_sql('oi'),
+        store_filter=store_filter, having=having
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [col[0] for col in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    staffs = []
+    for row in rows:
+        staffs.append({
+            'staff_id': row['staff_id'],
+            'full_name': f"{row['first_name']} {row['last_name']}",
+            'active': bool(row['active']),
+            'store_id': row['store_id'],
+            'manager_id': row['manager_id'],
+            'level': row['level'],
+            'own_order_count': row['own_order_count'],
+            'own_revenue': from_minor(row['own_revenue']),
+            'team_size': row['team_size'],
+            'team_order_count': row['team_order_count'],
+            'team_revenue': from_minor(row['team_revenue']),
+        })
+
+    return {'store_name': store_name, 'data': staffs}
+
+
+# Chiều của sales_cube: tên chiều -> các trường cần group by (khóa, nhãn hiển thị)
+CUBE_DIMENSIONS = {
+    'store': ('store_id', 'store_id__store_name'),
+    'brand': ('brand_id', 'brand_id__brand_name'),
+    'category': ('category_id', 'category_id__category_name'),
+    'month': ('month',),
+}
+
+
+@coalesced('sales-cube')
+def get_sales_cube_data(dimensions: list[str], start_date: date | None = None, end_date: date | None = None,
+                        store_id: int | None = None, brand_id: int | None = None,
+                        category_id: int | None = None) -> dict:
+    """
+    Roll-up/drill-down doanh thu và số lượng theo tập chiều bất kỳ trong (store, brand, category, month).
+    Chỉ cộng các ô đã tổng hợp sẵn trong sales_cube, không truy vấn order_items.
+    Bộ lọc ngày được làm tròn theo tháng vì tháng là độ mịn nhỏ nhất của khối.
+    """
+    cells = SalesCube.objects.all()
+    if store_id:
+        cells = cells.filter(store_id=store_id)
+    if brand_id:
+        cells = cells.filter(brand_id=brand_id)
+    if category_id:
+        cells = cells.filter(category_id=category_id)
+    if start_date:
+        cells = cells.filter(month__gte=date(start_date.year, start_date.month, 1))
+    if end_date:
+        cells = cells.filter(month__lte=end_date)
+
+    group_fields = [field for dimension in dimensions for field in CUBE_DIMENSIONS[dimension]]
+    measures = {
+        'units': models.Sum('units'),
+        'line_count': models.Sum('line_count'),
+        'revenue_minor': models.Sum('revenue_minor'),
+    }
+    if group_fields:
+        rows = list(cells.values(*group_fields).annotate(**measures).order_by(*group_fields))
+    else:
+        rows = [cells.aggregate(**measures)] if cells.exists() else []
+
+    data = []
+    for row in rows:
+        item = {field.split('__')[-1]: row[field] for field in group_fields}
+        item.update({
+            'units': row['units'] or 0,
+            'line_count': row['line_count'] or 0,
+            'revenue': from_minor(row['revenue_minor']),
+        })
+        data.append(item)
+
+    totals = {
+        'units': sum(item['units'] for item in data),
+        'line_count': sum(item['line_count'] for item in data),
+        'revenue': from_minor(sum(row['revenue_minor'] or 0 for row in rows)),
+    }
+
+    return {'dimensions': dimensions, 'data': data, 'totals': totals}
+
+
+@coalesced('order-funnel')
+def get_order_status_funnel(start_date: date | None = None, end_date: date | None = None,
+                            store_id: int | None = None) -> dict:
+    """
+    Số đơn hàng theo trạng thái (Pending/Processing/Rejected/Completed) của từng cửa hàng.
+    Chỉ cộng các bộ đếm trong order_status_counters, không COUNT trên bảng orders.
+    """
+    counters = OrderStatusCounter.objects.all()
+    if store_id:
+        counters = counters.filter(store_id=store_id)
+    if start_date:
+        counters = counters.filter(day__gte=start_date)
+    if end_date:
+        counters = counters.filter(day__lte=end_date)
+
+    rows = (
+        counters
+        .values('store_id', 'store_id__store_name', 'order_status')
+        .annotate(order_count=models.Sum('count'))
+        .order_by('store_id', 'order_status')
+    )
+
+    status_names = {status: name.lower() for status, name in Order.ORDER_STATUS_CHOICES}
+    stores = {}
+    for row in rows:
+        store = stores.setdefault(row['store_id'], {
+            'store_id': row['store_id'],
+            'store_name': row['store_id__store_name'],
+            'statuses': {name: 0 for name in status_names.values()},
+        })
+        store['statuses'][status_names[row['order_status']]] += row['order_count'] or 0
+
+    totals = {name: 0 for name in status_names.values()}
+    for store in stores.values():
+        store.update(_funnel_rates(store['statuses']))
+        for name, order_count in store['statuses'].items():
+            totals[name] += order_count
+
+    return {
+        'stores': list(stores.values()),
+        'summary': {'statuses': totals, **_funnel_rates(totals)},
+    }
+
+
+def _funnel_rates(statuses: dict) -> dict:
+    """
+    Tổng số đơn và tỉ lệ hoàn thành/từ chối (%) từ số đơn theo trạng thái.
+    """
+    total = sum(statuses.values())
+    return {
+        'total': total,
+        'completion_rate': round(statuses['completed'] * 100 / total, 2) if total else 0.0,
+        'rejection_rate': round(statuses['rejected'] * 100 / total, 2) if total else 0.0,
+    }
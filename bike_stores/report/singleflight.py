@@ -0,0 +1,95 @@
+import pickle
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Khoảng thời gian (giây) giữa các lần kiểm tra kết quả của worker khác
+POLL_INTERVAL = 0.05
+
+# Thời gian (giây) kết quả được giữ trong cache chung cho các worker đang chờ
+SHARED_RESULT_TIMEOUT = 10
+
+
+class _Flight:
+    """
+    Một lần tính toán đang diễn ra trong tiến trình; các luồng khác cùng khóa chờ trên done.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_flights: dict[str, _Flight] = {}
+_flights_lock = threading.Lock()
+
+
+def single_flight(key: str, compute):
+    """
+    Gộp các lời gọi đồng thời có cùng khóa thành một lần compute() duy nhất.
+
+    Trong một worker, luồng đầu tiên tính toán còn các luồng khác chờ. Kết quả được pickle thành bản chụp
+    trước khi đánh thức các luồng chờ, và mọi luồng (kể cả luồng tính toán) nhận một bản giải nén riêng.
+    Giữa các worker, một khóa trong cache chung (cache.add) chọn ra worker tính toán; các worker khác
+    chờ kết quả được đặt vào cache. Kết quả chỉ được chia sẻ cho các yêu cầu đến trong lúc đang tính,
+    không được giữ lại như một cache. Nếu chờ quá REPORT_SINGLEFLIGHT_WAIT giây thì tự tính.
+    """
+    with _flights_lock:
+        flight = _flights.get(key)
+        is_leader = flight is None
+        if is_leader:
+            flight = _flights[key] = _Flight()
+
+    if not is_leader:
+        if not flight.done.wait(settings.REPORT_SINGLEFLIGHT_WAIT):
+            return compute()
+        if flight.error is not None:
+            raise flight.error
+        # Mỗi luồng nhận bản sao riêng vì view có thể định dạng lại kết quả tại chỗ
+        return pickle.loads(flight.result)
+
+    try:
+        # Bản chụp bất biến: luồng tính toán sửa kết quả của nó cũng không ảnh hưởng các luồng đang sao chép
+        flight.result = pickle.dumps(_compute_across_workers(key, compute), pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+    return pickle.loads(flight.result)
+
+
+def _compute_across_workers(key: str, compute):
+    """
+    Giữ khóa trong cache chung khi tính, hoặc chờ kết quả của worker đang giữ khóa.
+    """
+    lock_key = f'singleflight:{key}'
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, settings.REPORT_SINGLEFLIGHT_LOCK_TIMEOUT):
+        try:
+            result = compute()
+            cache.set(f'{lock_key}:{token}', result, SHARED_RESULT_TIMEOUT)
+            return result
+        finally:
+            cache.delete(lock_key)
+
+    owner = cache.get(lock_key)
+    deadline = time.monotonic() + settings.REPORT_SINGLEFLIGHT_WAIT
+    while owner is not None and time.monotonic() < deadline:
+        result = cache.get(f'{lock_key}:{owner}')
+        if result is not None:
+            return result
+        if cache.get(lock_key) != owner:
+            # Worker giữ khóa đã xong (hoặc lỗi): lấy kết quả lần cuối rồi tự tính nếu không có
+            result = cache.get(f'{lock_key}:{owner}')
+            if result is not None:
+                return result
+            break
+        time.sleep(POLL_INTERVAL)
+    return compute()
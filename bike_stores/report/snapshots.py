@@ -0,0 +1,101 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from itertools import repeat
+
+import django
+from django.db import connections, models, transaction
+
+from sales.models import Store
+from .models import ReportSnapshot
+from .services import get_inventory_report_data, get_pareto_customer_analysis, get_revenue_report_data
+
+REVENUE_PERIODS = ('day', 'week', 'month', 'quarter', 'year')
+
+
+def _init_worker() -> None:
+    # Tiến trình con khởi tạo bằng spawn (Windows/macOS) cần nạp lại Django
+    django.setup()
+
+
+def compute_scope_snapshots(store_id: int | None, as_of: date) -> list[dict]:
+    """
+    Tính các báo cáo tồn kho, doanh thu (mọi kỳ) và Pareto của một cửa hàng (None = toàn hệ thống).
+    Chạy được trong tiến trình con của process pool.
+    """
+    entries = []
+
+    def run(report: str, period: str, compute, count_rows):
+        started = time.perf_counter()
+        data = compute()
+        entries.append({
+            'report': report, 'store_id': store_id, 'period': period, 'data': data,
+            'row_count': count_rows(data), 'seconds': time.perf_counter() - started,
+        })
+
+    run('inventory', '', lambda: get_inventory_report_data(store_id=store_id),
+        lambda data: sum(len(items) for items in data.values()))
+    for period in REVENUE_PERIODS:
+        run('revenue', period, lambda: get_revenue_report_data(end_date=as_of, period=period, store_id=store_id),
+            lambda data: len(data['data']))
+    run('customer-analysis', '', lambda: get_pareto_customer_analysis(end_date=as_of, store_id=store_id),
+        lambda data: len(data['customers']))
+    return entries
+
+
+def precompute_report_snapshots(as_of: date, workers: int = 1, keep_versions: int = 7) -> dict:
+    """
+    Tính snapshot cho toàn hệ thống và từng cửa hàng (chia cho process pool nếu workers > 1),
+    ghi tất cả dưới một version mới trong một transaction và xóa các version cũ hơn keep_versions.
+    Trả về version, số snapshot và thời gian/số dòng theo từng stage (loại báo cáo).
+    """
+    scopes = [None, *Store.objects.order_by('store_id').values_list('store_id', flat=True)]
+
+    started = time.perf_counter()
+    if workers > 1 and len(scopes) > 1:
+        # Không để tiến trình con (fork) dùng chung kết nối CSDL của tiến trình cha
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            results = list(executor.map(compute_scope_snapshots, scopes, repeat(as_of)))
+    else:
+        results = [compute_scope_snapshots(store_id, as_of) for store_id in scopes]
+    entries = [entry for scope_entries in results for entry in scope_entries]
+    compute_seconds = time.perf_counter() - started
+
+    with transaction.atomic():
+        version = (ReportSnapshot.objects.aggregate(latest=models.Max('version'))['latest'] or 0) + 1
+        ReportSnapshot.objects.bulk_create([
+            ReportSnapshot(
+                version=version, report=entry['report'], store_id=entry['store_id'], period=entry['period'],
+                as_of=as_of, row_count=entry['row_count'], data=entry['data'],
+            )
+            for entry in entries
+        ])
+        if keep_versions:
+            ReportSnapshot.objects.filter(version__lte=version - keep_versions).delete()
+
+    stages = {}
+    for entry in entries:
+        stage = stages.setdefault(entry['report'], {'snapshots': 0, 'rows': 0, 'seconds': 0.0})
+        stage['snapshots'] += 1
+        stage['rows'] += entry['row_count']
+        stage['seconds'] += entry['seconds']
+
+    return {
+        'version': version,
+        'snapshot_count': len(entries),
+        'compute_seconds': compute_seconds,
+        'stages': stages,
+    }
+
+
+def get_latest_snapshot(report: str, store_id: int | None = None, period: str = '') -> ReportSnapshot | None:
+    """
+    Snapshot mới nhất của một báo cáo cho cửa hàng (None = toàn hệ thống) và kỳ cho trước.
+    """
+    return (
+        ReportSnapshot.objects
+        .filter(report=report, store_id=store_id, period=period)
+        .order_by('-version')
+        .first()
+    )
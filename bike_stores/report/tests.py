@@ -1,7 +1,48 @@
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
 from unittest.mock import MagicMock, patch
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+import json
+import tempfile
+import threading
+from pathlib import Path
 
-from .services import get_inventory_report_data
+import numpy as np
+
+from production.models import Brand, Category, Product, Stock
+from sales.models import Customer, Order, OrderItem, Staff, Store
+from .aggregates import (
+    mark_aggregates_stale, rebuild_customer_stats, rebuild_order_status_counters, rebuild_sales_cube,
+    refresh_customer_stats
+)
+from .basket import count_product_pairs, refresh_product_affinity
+from .columnar import (
+    fetch_order_lines, get_columnar_engine, group_sum, period_start_days, reset_columnar_engine,
+    write_order_line_snapshot
+)
+from .fulfillment import get_fulfillment_report
+from .forecasting import (
+    exponential_smoothing_levels, forecast_levels, get_forecast_pool, load_daily_unit_series, moving_average_levels,
+)
+from .money import from_minor, line_revenue_minor_expr, to_minor
+from .models import (
+    AggregateBuild, CustomerStats, OrderStatusCounter, ProductRecommendation, ReportSnapshot, SalesCube
+)
+from .recommendations import compute_item_neighbors, get_recommendation_index, reset_recommendation_index
+from .replenishment import get_replenishment_report
+from .singleflight import single_flight
+from .snapshots import precompute_report_snapshots
+from .services import (
+    get_inventory_report_data, get_pareto_customer_analysis, get_staff_performance_report, get_sales_cube_data,
+    get_revenue_report_data
+)
 
 class GetInventoryReportDataTest(TestCase):
     @patch('report.services.Stock')
@@ -51,4 +92,761 @@ class GetInventoryReportDataTest(TestCase):
             'Không xác định': [
                 {'product_id': None, 'product_name': 'Không xác định', 'quantity': 3}
             ]
-        })
\ No newline at end of file
+        })
+
+class ReportSampleDataMixin:
+    """
+    Dữ liệu mẫu dùng chung cho các test báo cáo: 2 cửa hàng, 3 khách hàng, 2 sản phẩm.
+    """
+
+    def _create_sample_data(self):
+        self.store1 = Store.objects.create(store_id=1, store_name='Store A')
+        self.store2 = Store.objects.create(store_id=2, store_name='Store B')
+        self.manager = Staff.objects.create(
+            staff_id=1, first_name='Mai', last_name='Tran', email='mai@example.com', active=True,
+            store_id=self.store1
+        )
+        self.staff = Staff.objects.create(
+            staff_id=2, first_name='Nam', last_name='Le', email='nam@example.com', active=True,
+            store_id=self.store1, manager_id=self.manager
+        )
+        self.customers = [
+            Customer.objects.create(customer_id=i, first_name=f'First{i}', last_name=f'Last{i}',
+                                    email=f'c{i}@example.com')
+            for i in (1, 2, 3)
+        ]
+        brand = Brand.objects.create(brand_id=1, brand_name='Trek')
+        category = Category.objects.create(category_id=1, category_name='Road Bikes')
+        self.products = [
+            Product.objects.create(product_id=i, product_name=f'Bike {i}', brand_id=brand, category_id=category,
+                                   model_year=2024, list_price=100 * i)
+            for i in (1, 2)
+        ]
+        # (order_id, customer, store, staff, order_date, [(product, quantity, list_price, discount)])
+        orders = [
+            (1, 0, self.store1, self.manager, date(2024, 1, 5), [(0, 2, Decimal('100'), Decimal('0'))]),
+            (2, 0, self.store1, self.staff, date(2024, 2, 10), [(1, 1, Decimal('200'), Decimal('0.1'))]),
+            (3, 1, self.store2, self.staff, date(2024, 2, 20), [(0, 1, Decimal('100'), Decimal('0.05')),
+                                                                (1, 3, Decimal('200'), Decimal('0'))]),
+            (4, 2, self.store1, self.staff, date(2024, 3, 1), [(0, 1, Decimal('99.99'), Decimal('0.07'))]),
+        ]
+        for order_id, customer, store, staff, order_date, lines in orders:
+            order = Order.objects.create(
+                order_id=order_id, customer_id=self.customers[customer], order_status=4,
+                order_date=order_date, required_date=order_date + timedelta(days=3),
+                shipped_date=order_date + timedelta(days=2), store_id=store, staff_id=staff
+            )
+            for item_id, (product, quantity, list_price, discount) in enumerate(lines, start=1):
+                OrderItem.objects.create(
+                    order_id=order, item_id=item_id, product_id=self.products[product],
+                    quantity=quantity, list_price=list_price, discount=discount
+                )
+
+
+class CustomerStatsTest(ReportSampleDataMixin, TestCase):
+    def setUp(self):
+        self._create_sample_data()
+
+    def test_rebuild_customer_stats(self):
+        self.assertEqual(rebuild_customer_stats(), 3)
+        stats = CustomerStats.objects.get(customer_id=1, store_id=1)
+        self.assertEqual(stats.order_count, 2)
+        self.assertEqual(stats.first_order_date, date(2024, 1, 5))
+        self.assertEqual(stats.last_order_date, date(2024, 2, 10))
+        self.assertEqual(stats.lifetime_revenue_minor, 3_800_000)
+
+    def test_pareto_from_stats_matches_order_items(self):
+        expected = get_pareto_customer_analysis(end_date=date(2024, 12, 31))
+        rebuild_customer_stats()
+        with patch('report.services._customer_revenues_from_order_items') as mock_line_path:
+            result = get_pareto_customer_analysis(end_date=date(2024, 12, 31))
+        mock_line_path.assert_not_called()
+        self.assertEqual(result['customers'], expected['customers'])
+        self.assertEqual(result['summary'], expected['summary'])
+
+    def test_pareto_ignores_stats_until_table_is_rebuilt(self):
+        expected = get_pareto_customer_analysis(end_date=date(2024, 12, 31))
+        # Thao tác ghi chỉ tính lại customer_stats của khách hàng bị ảnh hưởng: bảng chưa đầy đủ
+        refresh_customer_stats([1])
+        self.assertEqual(CustomerStats.objects.count(), 1)
+        cache.clear()
+        self.assertEqual(get_pareto_customer_analysis(end_date=date(2024, 12, 31))['customers'],
+                         expected['customers'])
+
+        rebuild_customer_stats()
+        mark_aggregates_stale()
+        cache.clear()
+        with patch('report.services._customer_revenues_from_order_items', return_value=[]) as mock_line_path:
+            get_pareto_customer_analysis(end_date=date(2024, 12, 31))
+        mock_line_path.assert_called_once()
+
+    def test_order_item_write_paths_refresh_stats(self):
+        rebuild_customer_stats()
+        response = self.client.post(
+            reverse('orderitem-list'),
+            data=json.dumps({'order_id': 4, 'item_id': 2, 'product_id': 2, 'quantity': 1,
+                             'list_price': 200, 'discount': 0}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(CustomerStats.objects.get(customer_id=3).lifetime_revenue_minor, 2_929_907)
+
+        response = self.client.delete(reverse('order-detail', args=[4]))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(CustomerStats.objects.filter(customer_id=3).exists())
+
+    def test_customer_lifetime_value_endpoint(self):
+        rebuild_customer_stats()
+        response = self.client.get(reverse('customer-lifetime-value'), {'store_id': 1})
+        self.assertEqual(response.status_code, 200)
+        customers = response.json()['analysis']['customers']
+        self.assertEqual([c['customer_id'] for c in customers], [1, 3])
+        self.assertEqual(customers[0]['order_count'], 2)
+        self.assertEqual(customers[0]['average_order_value'], '190.00')
+
+
+class StaffPerformanceReportTest(ReportSampleDataMixin, TestCase):
+    def setUp(self):
+        self._create_sample_data()
+
+    def test_revenue_rolls_up_through_managers(self):
+        result = get_staff_performance_report(end_date=date(2024, 12, 31))
+        by_staff = {row['staff_id']: row for row in result['data']}
+        self.assertEqual(by_staff[1]['own_revenue'], Decimal('200.0000'))
+        self.assertEqual(by_staff[2]['own_revenue'], Decimal('967.9907'))
+        self.assertEqual(by_staff[1]['team_size'], 1)
+        self.assertEqual(by_staff[1]['team_order_count'], 4)
+        self.assertEqual(by_staff[1]['team_revenue'], Decimal('1167.9907'))
+        self.assertEqual(by_staff[2]['level'], 1)
+
+    def test_store_and_date_filters(self):
+        response = self.client.get(reverse('staff-performance'), {
+            'store_id': 2, 'start_date': '2024-02-01', 'end_date': '2024-02-28'
+        })
+        self.assertEqual(response.status_code, 200)
+        rows = {row['staff_id']: row for row in response.json()['performance']['data']}
+        self.assertEqual(rows[1]['team_revenue'], '695.00')
+        self.assertEqual(rows[2]['own_revenue'], '695.00')
+
+
+class SalesCubeTest(ReportSampleDataMixin, TestCase):
+    def setUp(self):
+        self._create_sample_data()
+        rebuild_sales_cube()
+
+    def test_rollup_by_store_and_month(self):
+        result = get_sales_cube_data(['store', 'month'])
+        self.assertEqual(
+            [(row['store_id'], row['month'], row['units'], row['revenue']) for row in result['data']],
+            [
+                (1, date(2024, 1, 1), 2, Decimal('200.0000')),
+                (1, date(2024, 2, 1), 1, Decimal('180.0000')),
+                (1, date(2024, 3, 1), 1, Decimal('92.9907')),
+                (2, date(2024, 2, 1), 4, Decimal('695.0000')),
+            ]
+        )
+        self.assertEqual(result['totals']['revenue'], Decimal('1167.9907'))
+
+    def test_order_patch_moves_cells(self):
+        response = self.client.patch(
+            reverse('order-detail', args=[3]), data=json.dumps({'store_id': 1}), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(SalesCube.objects.filter(store_id=2).exists())
+
+        response = self.client.get(reverse('sales-cube'), {'dimensions': 'store', 'start_date': '2024-02-15'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['cube']['data'], [
+            {'store_id': 1, 'store_name': 'Store A', 'units': 6, 'line_count': 4, 'revenue': '967.99'}
+        ])
+
+    def test_refresh_selects_cell_rows_in_both_date_formats(self):
+        # Đơn hàng 1 lưu ngày dạng YYYYMMDD như dữ liệu nạp từ file SQL, đơn hàng 5 dạng YYYY-MM-DD
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE orders SET order_date = 20240105 WHERE order_id = 1')
+        Order.objects.create(order_id=5, customer_id=self.customers[1], order_status=1, order_date=date(2024, 1, 31),
+                             required_date=date(2024, 2, 3), store_id=self.store1, staff_id=self.staff)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse('orderitem-list'),
+                data=json.dumps({'order_id': 5, 'item_id': 1, 'product_id': 2, 'quantity': 3,
+                                 'list_price': 200, 'discount': 0}),
+                content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 201)
+        # Dòng hàng của ô được chọn bằng truy vấn con trên giá trị order_date thô
+        self.assertTrue(any('IN (SELECT order_id FROM orders WHERE (store_id = ' in query['sql']
+                            for query in queries))
+        january = SalesCube.objects.get(store_id=1, month=date(2024, 1, 1))
+        self.assertEqual((january.units, january.line_count), (5, 2))
+
+    def test_invalid_dimension(self):
+        response = self.client.get(reverse('sales-cube'), {'dimensions': 'store,color'})
+        self.assertEqual(response.status_code, 400)
+
+
+class DemandForecastTest(ReportSampleDataMixin, TestCase):
+    def setUp(self):
+        self._create_sample_data()
+
+    def test_exponential_smoothing_matches_recursive_definition(self):
+        matrix = np.array([[3.0, 0.0, 1.0, 4.0], [0.0, 2.0, 0.0, 0.0]])
+        alpha = 0.4
+        level = matrix[:, 0].copy()
+        for t in range(1, matrix.shape[1]):
+            level = alpha * matrix[:, t] + (1 - alpha) * level
+        np.testing.assert_allclose(exponential_smoothing_levels(matrix, alpha), level)
+        np.testing.assert_allclose(moving_average_levels(matrix, 2), [2.5, 0.0])
+
+    def test_forecast_levels_reuses_process_pool(self):
+        matrix = np.arange(24, dtype=float).reshape(4, 6)
+        expected = forecast_levels(matrix, 0.3, 3)
+        for _ in range(2):
+            ses, moving_average = forecast_levels(matrix, 0.3, 3, workers=2)
+            np.testing.assert_allclose(ses, expected[0])
+            np.testing.assert_allclose(moving_average, expected[1])
+        self.assertIs(get_forecast_pool(2), get_forecast_pool(2))
+
+    def test_daily_series_per_store_and_product(self):
+        store_ids, product_ids, matrix, start_date = load_daily_unit_series(date(2024, 3, 1), history_days=60)
+        self.assertEqual(list(zip(store_ids.tolist(), product_ids.tolist())), [(1, 1), (1, 2), (2, 1), (2, 2)])
+        self.assertEqual(matrix.shape, (4, 60))
+        self.assertEqual(matrix[0, -1], 1)
+        self.assertEqual(matrix[0, (date(2024, 1, 5) - start_date).days], 2)
+
+    def test_demand_forecast_endpoint(self):
+        response = self.client.get(reverse('demand-forecast'), {'horizon': 7, 'window': 7, 'store_id': 1})
+        self.assertEqual(response.status_code, 200)
+        forecast = response.json()['forecast']
+        self.assertEqual(forecast['forecast_start_date'], '2024-03-02')
+        self.assertEqual(forecast['data'][0]['product_id'], 1)
+        self.assertEqual(forecast['data'][0]['moving_average_total'], 1.0)
+
+        response = self.client.get(reverse('demand-forecast'), {'horizon': 0})
+        self.assertEqual(response.status_code, 400)
+
+
+class ReplenishmentReportTest(ReportSampleDataMixin, TestCase):
+    def setUp(self):
+        self._create_sample_data()
+        Stock.objects.create(store_id=self.store1, product_id=self.products[0], quantity=1)
+        Stock.objects.create(store_id=self.store1, product_id=self.products[1], quantity=50)
+        Stock.objects.create(store_id=self.store2, product_id=self.products[0], quantity=0)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_recommendations_ranked_by_urgency(self):
+        result = get_replenishment_report(as_of=date(2024, 3, 1), window_days=60, lead_time_days=30)
+        ranked = [(row['store_id'], row['product_id']) for row in result['data']]
+        self.assertEqual(ranked, [(2, 1), (1, 1), (1, 2)])
+        first = result['data'][1]
+        self.assertEqual(first['daily_velocity'], 0.05)
+        self.assertEqual(first['days_of_cover'], 20.0)
+        self.assertTrue(first['needs_reorder'])
+        self.assertEqual(result['summary']['reorder_count'], 2)
+
+    def test_results_cached_per_store_until_stock_changes(self):
+        get_replenishment_report(as_of=date(2024, 3, 1), store_id=1)
+        # Danh sách cửa hàng + một truy vấn cho riêng cửa hàng chưa có trong cache
+        with self.assertNumQueries(2):
+            get_replenishment_report(as_of=date(2024, 3, 1))
+        with self.assertNumQueries(1):
+            get_replenishment_report(as_of=date(2024, 3, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                reverse('stock-detail', args=[1, 2]), data=json.dumps({'quantity': 0}),
+                content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(reverse('replenishment-report'), {'store_id': 1, 'as_of': '2024-03-01'})
+        quantities = {row['product_id']: row['quantity'] for row in response.json()['replenishment']['data']}
+        self.assertEqual(quantities[2], 0)
+
+
+class ProductAffinityTest(ReportSampleDataMixin, TestCase):
+    def setUp(self):
+        self._create_sample_data()
+
+    def test_count_product_pairs(self):
+        order_ids = np.array([1, 1, 1, 2, 2, 3, 3, 3])
+        product_ids = np.array([5, 3, 7, 3, 7, 3, 5, 5])
+        first, second, pair_counts, item_counts, order_count = count_product_pairs(order_ids, product_ids, 2)
+        self.assertEqual(list(zip(first.tolist(), second.tolist(), pair_counts.tolist())), [(3, 5, 2), (3, 7, 2)])
+        self.assertEqual(item_counts, {3: 3, 5: 2, 7: 2})
+        self.assertEqual(order_count, 3)
+
+    def test_refresh_and_endpoint(self):
+        self.assertEqual(refresh_product_affinity(min_support=0.1), 2)
+        response = self.client.get(reverse('frequently-bought-with', args=[1]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data'], [{
+            'product_id': 2, 'product_name': 'Bike 2', 'pair_count': 1,
+            'support': 0.25, 'confidence': 0.3333, 'lift': 0.6667,
+        }])
+
+    def test_endpoint_rejects_non_positive_limit(self):
+        for limit in ('-1', '0', 'abc'):
+            response = self.client.get(reverse('frequently-bought-with', args=[1]), {'limit': limit})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'error': "Định dạng tham số không hợp lệ (limit)."})
+
+
+class ItemRecommendationTest(TestCase):
+    def test_compute_item_neighbors(self):
+        customer_ids = np.array([1, 1, 2, 2, 3, 3, 4])
+        product_ids = np.array([10, 20, 10, 20, 10, 30, 40])
+        products, neighbors, scores = compute_item_neighbors(customer_ids, product_ids, top_k=2)
+        self.assertEqual(products.tolist(), [10, 20, 30, 40])
+        self.assertEqual(neighbors.tolist(), [[20, 30], [10, -1], [10, -1], [-1, -1]])
+        np.testing.assert_allclose(scores[0], [2 / np.sqrt(6), 1 / np.sqrt(3)])
+
+    def test_index_reloads_after_build_in_another_process(self):
+        brand = Brand.objects.create(brand_id=1, brand_name='Trek')
+        category = Category.objects.create(category_id=1, category_name='Road Bikes')
+        products = [Product.objects.create(product_id=i, product_name=f'Bike {i}', brand_id=brand,
+                                           category_id=category, model_year=2024, list_price=100)
+                    for i in (1, 2, 3)]
+        reset_recommendation_index()
+        self.addCleanup(reset_recommendation_index)
+        index = get_recommendation_index()
+        self.assertEqual(index.lookup(1), [])
+
+        # build_recommendations chạy ở tiến trình khác: chỉ bảng và mốc dựng thay đổi
+        ProductRecommendation.objects.create(product_id=products[0], recommended_product_id=products[2],
+                                             rank=1, score=0.5)
+        AggregateBuild.objects.create(name='product_recommendations', built_at=timezone.now())
+        self.assertIs(get_recommendation_index(), index)
+        with self.settings(REPORT_RECOMMENDATIONS_CHECK_SECONDS=0):
+            self.assertEqual([item['product_id'] for item in get_recommendation_index().lookup(1)], [3])
+            with self.assertNumQueries(1):
+                get_recommendation_index()
+
+
+class RevenueComparisonTest(ReportSampleDataMixin, TestCase):
+    def setUp(self):
+        self._create_sample_data()
+        order = Order.objects.create(
+            order_id=5, customer_id=self.customers[0], order_status=4, order_date=date(2023, 2, 15),
+            required_date=date(2023, 2, 18), store_id=self.store1, staff_id=self.staff
+        )
+        OrderItem.objects.create(order_id=order, item_id=1, product_id=self.products[0], quantity=5,
+                                 list_price=Decimal('100'), discount=Decimal('0'))
+
+    def test_year_over_year_in_one_grouped_query(self):
+        # Khoảng ngày thực tế + một truy vấn gom nhóm cho cả hai khoảng
+        with self.assertNumQueries(2):
+            result = get_revenue_report_data(
+                start_date=date(2024, 1, 1), end_date=date(2024, 3, 31), period='month', compare='yoy'
+            )
+        february = result['data'][1]
+        self.assertEqual(february['period'], date(2024, 2, 1))
+        self.assertEqual(february['comparison_period'], date(2023, 2, 1))
+        self.assertEqual(february['total_revenue'], Decimal('875'))
+        self.assertEqual(february['comparison_revenue'], Decimal('500'))
+        self.assertEqual(february['growth_rate'], Decimal('75'))
+        self.assertIsNone(result['data'][0]['growth_rate'])
+        self.assertEqual(result['comparison']['comparison_revenue'], Decimal('500'))
+
+    def test_previous_period_endpoint(self):
+        response = self.client.get(reverse('revenue-report'), {
+            'start_date': '2024-02-01', 'end_date': '2024-02-29', 'period': 'month', 'compare': 'prev'
+        })
+        self.assertEqual(response.status_code, 200)
+        revenue = response.json()['revenue']
+        self.assertEqual(revenue['comparison']['start_date'], '2024-01-03')
+        self.assertEqual(revenue['data'], [{
+            'period': '2024-02-01', 'total_revenue': '875.00', 'comparison_period': '2024-01-01',
+            'comparison_revenue': '200.00', 'delta': '675.00', 'growth_rate': '337.50%',
+        }])
+
+        response = self.client.get(reverse('revenue-report'), {'compare': 'wow'})
+        self.assertEqual(response.status_code, 400)
+
+
+class FulfillmentReportTest(ReportSampleDataMixin, TestCase):
+    def setUp(self):
+        self._create_sample_data()
+        # Đơn 2 giao trễ 4 ngày, đơn 5 chưa giao và đã quá hạn, đơn 6 bị từ chối (không tính)
+        Order.objects.filter(order_id=2).update(shipped_date=date(2024, 2, 17))
+        Order.objects.create(
+            order_id=5, customer_id=self.customers[1], order_status=2, order_date=date(2024, 3, 10),
+            required_date=date(2024, 3, 12), store_id=self.store1, staff_id=self.staff
+        )
+        Order.objects.create(
+            order_id=6, customer_id=self.customers[1], order_status=3, order_date=date(2024, 3, 10),
+            required_date=date(2024, 3, 12), store_id=self.store1, staff_id=self.staff
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_fulfillment_metrics_per_store_and_staff(self):
+        result = get_fulfillment_report(end_date=date(2024, 12, 31), as_of=date(2024, 3, 20))
+        summary = result['summary']
+        self.assertEqual(summary['order_count'], 5)
+        self.assertEqual(summary['shipped_count'], 4)
+        self.assertEqual(summary['on_time_rate'], 75.0)
+        self.assertEqual(summary['lateness_histogram'], {'on_time': 3, '1': 0, '2-3': 0, '4-7': 1, '8+': 0})
+        self.assertEqual(summary['days_to_ship_percentiles'], {'p50': 2, 'p90': 7, 'p95': 7})
+        self.assertEqual(summary['open_past_required_count'], 1)
+
+        store1 = result['stores'][0]
+        self.assertEqual([staff['staff_id'] for staff in store1['staffs']], [1, 2])
+        self.assertEqual(store1['staffs'][1]['open_count'], 1)
+
+    def test_endpoint_filters(self):
+        params = {'store_id': 1, 'start_date': '2024-02-01', 'end_date': '2024-12-31', 'as_of': '2024-03-11'}
+        response = self.client.get(reverse('fulfillment-report'), params)
+        self.assertEqual(response.status_code, 200)
+        summary = response.json()['fulfillment']['summary']
+        self.assertEqual(summary['order_count'], 3)
+        self.assertEqual(summary['open_past_required_count'], 0)
+
+
+class OrderStatusFunnelTest(ReportSampleDataMixin, TestCase):
+    def setUp(self):
+        self._create_sample_data()
+        rebuild_order_status_counters()
+
+    def _counter_snapshot(self):
+        return {
+            (row.store_id_id, row.order_status, row.day): row.count
+            for row in OrderStatusCounter.objects.filter(count__gt=0)
+        }
+
+    def test_order_writes_keep_counters_in_sync(self):
+        response = self.client.post(reverse('order-list'), data=json.dumps({
+            'order_id': 10, 'customer_id': 2, 'order_status': 1, 'order_date': '2024-03-01',
+            'required_date': '2024-03-05', 'store_id': 1, 'staff_id': 2
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(OrderStatusCounter.objects.get(store_id=1, order_status=1, day=date(2024, 3, 1)).count, 1)
+
+        # Đổi trạng thái chuyển số đếm từ Pending sang Completed
+        self.client.patch(
+            reverse('order-detail', args=[10]), data=json.dumps({'order_status': 4}), content_type='application/json'
+        )
+        self.assertEqual(OrderStatusCounter.objects.get(store_id=1, order_status=1, day=date(2024, 3, 1)).count, 0)
+        self.assertEqual(OrderStatusCounter.objects.get(store_id=1, order_status=4, day=date(2024, 3, 1)).count, 2)
+
+        self.client.patch(
+            reverse('order-detail', args=[3]), data=json.dumps({'order_status': 3, 'store_id': 1}),
+            content_type='application/json'
+        )
+        self.client.delete(reverse('order-detail', args=[1]))
+
+        incremental = self._counter_snapshot()
+        rebuild_order_status_counters()
+        self.assertEqual(incremental, self._counter_snapshot())
+
+    def test_funnel_endpoint_reads_counters(self):
+        Order.objects.filter(order_id=3).update(order_status=3)
+        rebuild_order_status_counters()
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('order-funnel'), {'start_date': '2024-02-01'})
+        self.assertEqual(response.status_code, 200)
+        funnel = response.json()['funnel']
+        self.assertEqual(
+            [(store['store_id'], store['statuses']['completed'], store['statuses']['rejected'], store['total'])
+             for store in funnel['stores']],
+            [(1, 2, 0, 2), (2, 0, 1, 1)]
+        )
+        self.assertEqual(funnel['summary']['total'], 3)
+        self.assertEqual(funnel['summary']['completion_rate'], 66.67)
+
+
+class SingleFlightTest(TestCase):
+    def tearDown(self):
+        cache.clear()
+
+    def _run_concurrently(self, key, compute, thread_count=8):
+        results, errors = [], []
+
+        def call():
+            try:
+                results.append(single_flight(key, compute))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(thread_count)]
+        for thread in threads:
+            thread.start()
+        return threads, results, errors
+
+    def test_concurrent_identical_calls_compute_once(self):
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(None)
+            started.set()
+            release.wait(5)
+            return {'revenue': [1, 2, 3]}
+
+        threads, results, errors = self._run_concurrently('report:revenue:v1:period=month', compute)
+        started.wait(5)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual((len(calls), len(results), errors), (1, 8, []))
+        self.assertTrue(all(result == {'revenue': [1, 2, 3]} for result in results))
+        # Mỗi luồng nhận một bản sao riêng
+        self.assertEqual(len({id(result) for result in results}), 8)
+        self.assertIsNone(cache.get('singleflight:report:revenue:v1:period=month'))
+
+    def test_leader_mutating_its_result_does_not_affect_waiting_calls(self):
+        started, release = threading.Event(), threading.Event()
+        leader_results = []
+
+        def compute():
+            started.set()
+            release.wait(5)
+            return {'rows': [{'revenue': index} for index in range(2000)]}
+
+        def leader():
+            result = single_flight('report:mutated', compute)
+            leader_results.append(result)
+            # View định dạng lại kết quả tại chỗ trong khi các luồng khác đang nhận bản sao
+            for row in result['rows']:
+                row['revenue'] = f"{row['revenue']:,} đ"
+            result['rows'].clear()
+
+        leader_thread = threading.Thread(target=leader)
+        leader_thread.start()
+        started.wait(5)
+        threads, results, errors = self._run_concurrently('report:mutated', compute)
+        release.set()
+        for thread in [leader_thread, *threads]:
+            thread.join(5)
+
+        self.assertEqual((len(results), errors, leader_results[0]), (8, [], {'rows': []}))
+        expected = {'rows': [{'revenue': index} for index in range(2000)]}
+        self.assertTrue(all(result == expected for result in results))
+
+    def test_error_is_shared_with_waiting_calls(self):
+        started, release = threading.Event(), threading.Event()
+
+        def compute():
+            started.set()
+            release.wait(5)
+            raise ValueError('boom')
+
+        threads, results, errors = self._run_concurrently('report:failing', compute, thread_count=4)
+        started.wait(5)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual((results, len(errors)), ([], 4))
+
+    def test_waits_for_result_of_other_worker(self):
+        # Một worker khác đang giữ khóa và sẽ đặt kết quả vào cache chung
+        cache.set('singleflight:report:cube', 'other-worker')
+        timer = threading.Timer(0.1, cache.set, args=('singleflight:report:cube:other-worker', {'units': 7}))
+        timer.start()
+
+        result = single_flight('report:cube', lambda: self.fail('không được tính lại'))
+        timer.join()
+        self.assertEqual(result, {'units': 7})
+
+    def test_abandoned_lock_falls_back_to_computing(self):
+        cache.set('singleflight:report:cube', 'crashed-worker')
+        threading.Timer(0.1, cache.delete, args=('singleflight:report:cube',)).start()
+        self.assertEqual(single_flight('report:cube', lambda: {'units': 1}), {'units': 1})
+
+
+class ReportSnapshotTest(ReportSampleDataMixin, TestCase):
+    def setUp(self):
+        self._create_sample_data()
+        Stock.objects.create(store_id=self.store1, product_id=self.products[0], quantity=4)
+
+    def test_precompute_stores_versioned_snapshots_per_scope(self):
+        result = precompute_report_snapshots(date(2024, 12, 31))
+        # (toàn hệ thống + 2 cửa hàng) x (tồn kho + 5 kỳ doanh thu + Pareto)
+        self.assertEqual((result['version'], result['snapshot_count']), (1, 21))
+        self.assertEqual(result['stages']['revenue']['snapshots'], 15)
+        self.assertEqual(result['stages']['customer-analysis']['rows'], 3 + 2 + 1)
+
+        snapshot = ReportSnapshot.objects.get(version=1, report='revenue', store_id=None, period='month')
+        self.assertEqual(snapshot.data['data'][0], {'period': date(2024, 1, 1), 'total_revenue': Decimal('200.0000')})
+
+        self.assertEqual(precompute_report_snapshots(date(2024, 12, 31), keep_versions=1)['version'], 2)
+        self.assertFalse(ReportSnapshot.objects.filter(version=1).exists())
+
+    def test_views_serve_latest_snapshot(self):
+        precompute_report_snapshots(date(2024, 12, 31))
+        live = self.client.get(reverse('revenue-report'), {'period': 'quarter', 'store_id': 1}).json()
+
+        # Dữ liệu thay đổi sau khi tính snapshot không ảnh hưởng tới snapshot
+        OrderItem.objects.filter(order_id=1).delete()
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse('revenue-report'), {'period': 'quarter', 'store_id': 1, 'snapshot': 'latest'}
+            )
+        body = response.json()
+        self.assertEqual(body['revenue'], live['revenue'])
+        self.assertEqual(body['snapshot']['as_of'], '2024-12-31')
+
+        response = self.client.get(reverse('inventory-report'), {'snapshot': 'latest'})
+        self.assertEqual(response.json()['data'], {'Store A': [{'product_id': 1, 'product_name': 'Bike 1', 'quantity': 4}]})
+        response = self.client.get(reverse('customer-analysis'), {'snapshot': 'latest', 'limit': 1})
+        self.assertEqual(response.json()['analysis']['customers'][0]['revenue'], '695.00')
+
+    def test_snapshot_parameter_validation(self):
+        response = self.client.get(reverse('revenue-report'), {'snapshot': 'latest'})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('revenue-report'), {'snapshot': 'latest', 'compare': 'yoy'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('inventory-report'), {'snapshot': 'v1'})
+        self.assertEqual(response.status_code, 400)
+
+
+class MoneyTest(ReportSampleDataMixin, TestCase):
+    def setUp(self):
+        self._create_sample_data()
+
+    def test_minor_unit_conversions(self):
+        self.assertEqual(to_minor(Decimal('92.9907')), 929_907)
+        self.assertEqual(to_minor(0.1), 1_000)
+        self.assertEqual(to_minor('0.00005'), 0)
+        self.assertEqual(from_minor(929_907), Decimal('92.9907'))
+        self.assertEqual(str(from_minor(2_000_000)), '200.0000')
+
+    def test_line_revenue_in_sql_matches_decimal_exactly(self):
+        OrderItem.objects.create(
+            order_id_id=1, item_id=9, product_id=self.products[0], quantity=3,
+            list_price=Decimal('0.10'), discount=Decimal('0.07')
+        )
+        for item in OrderItem.objects.annotate(revenue_minor=line_revenue_minor_expr()):
+            expected = item.quantity * item.list_price * (1 - item.discount)
+            self.assertEqual(from_minor(item.revenue_minor), expected)
+
+
+class ColumnarEngineTest(ReportSampleDataMixin, TestCase):
+    def setUp(self):
+        self._create_sample_data()
+        order = Order.objects.create(
+            order_id=5, customer_id=self.customers[2], order_status=4, order_date='20230215',
+            required_date=date(2023, 2, 18), store_id=self.store2, staff_id=self.staff
+        )
+        OrderItem.objects.create(order_id=order, item_id=1, product_id=self.products[1], quantity=5,
+                                 list_price=Decimal('100'), discount=Decimal('0.2'))
+        rebuild_customer_stats()
+        self.snapshot_dir = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(self.settings(REPORT_COLUMNAR_SNAPSHOT_DIR=self.snapshot_dir))
+        reset_columnar_engine()
+
+    def tearDown(self):
+        reset_columnar_engine()
+        cache.clear()
+
+    def assertEnginesAgree(self):
+        for period in ('day', 'week', 'month', 'quarter', 'year'):
+            for store_id in (None, 1, 2):
+                for compare in (None, 'yoy', 'prev'):
+                    params = dict(end_date=date(2024, 12, 31), period=period, store_id=store_id, compare=compare)
+                    self.assertEqual(get_revenue_report_data(engine='columnar', **params),
+                                     get_revenue_report_data(engine='orm', **params))
+        for start_date in (None, date(2024, 2, 1)):
+            for store_id in (None, 1, 2):
+                params = dict(end_date=date(2024, 12, 31), start_date=start_date, store_id=store_id)
+                self.assertEqual(get_pareto_customer_analysis(engine='columnar', **params),
+                                 get_pareto_customer_analysis(engine='orm', **params))
+
+    def test_columnar_results_match_orm(self):
+        self.assertEnginesAgree()
+
+    def test_orders_without_customer_are_left_out_of_pareto(self):
+        order = Order.objects.create(
+            order_id=6, customer_id=None, order_status=4, order_date=date(2024, 3, 5),
+            required_date=date(2024, 3, 8), store_id=self.store1, staff_id=self.staff
+        )
+        OrderItem.objects.create(order_id=order, item_id=1, product_id=self.products[1], quantity=50,
+                                 list_price=Decimal('200'), discount=Decimal('0'))
+        rebuild_customer_stats()
+        reset_columnar_engine()
+        cache.clear()
+
+        self.assertEnginesAgree()
+        for engine in ('orm', 'columnar'):
+            result = get_pareto_customer_analysis(end_date=date(2024, 12, 31), start_date=date(2024, 2, 1),
+                                                  engine=engine)
+            self.assertNotIn(None, [customer['customer_id'] for customer in result['customers']])
+
+    def test_api_writes_are_applied_incrementally(self):
+        engine = get_columnar_engine()
+        self.assertEqual(len(engine), 6)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('orderitem-list'), json.dumps({
+                'order_id': 4, 'item_id': 2, 'product_id': 2, 'quantity': 2, 'list_price': '150.55', 'discount': '0.15'
+            }), content_type='application/json')
+            self.assertEqual(response.status_code, 201)
+            response = self.client.delete(reverse('orderitem-detail', args=[3, 1]))
+            self.assertEqual(response.status_code, 200)
+
+        with patch('report.columnar.fetch_order_lines', wraps=fetch_order_lines) as fetch:
+            self.assertIs(get_columnar_engine(), engine)
+        fetch.assert_called_once_with([3, 4])
+        self.assertEqual(len(engine), 6)
+        self.assertEnginesAgree()
+
+    def test_group_sum_and_period_starts(self):
+        keys, totals = group_sum(np.array([3, 1, 3, 2, 1]), np.array([10, 20, 30, 40, 2 ** 60], dtype=np.int64))
+        self.assertEqual(keys.tolist(), [1, 2, 3])
+        self.assertEqual(totals.tolist(), [20 + 2 ** 60, 40, 40])
+
+        days = np.arange(-400, 400)
+        for period, expected in (
+            ('week', lambda d: d - timedelta(days=d.weekday())),
+            ('quarter', lambda d: date(d.year, (d.month - 1) // 3 * 3 + 1, 1)),
+        ):
+            starts = period_start_days(days, period).astype('datetime64[D]').tolist()
+            self.assertEqual(starts, [expected(day) for day in days.astype('datetime64[D]').tolist()])
+
+
+class ColumnarSnapshotTest(ColumnarEngineTest):
+    """
+    Chạy lại các test của ColumnarEngineTest với bộ cột mở từ snapshot np.memmap.
+    """
+
+    def setUp(self):
+        super().setUp()
+        call_command('snapshot_order_lines', stdout=StringIO())
+
+    def test_engine_maps_snapshot_files(self):
+        engine = get_columnar_engine()
+        self.assertEqual(engine.source, 'snapshot')
+        base, alive, _ = engine._state
+        self.assertIsInstance(base['revenue_minor'], np.memmap)
+        self.assertIsNone(alive)
+        self.assertEnginesAgree()
+
+    def test_new_snapshot_is_swapped_in(self):
+        engine = get_columnar_engine()
+        version = write_order_line_snapshot(keep=0)['version']
+        self.assertEqual((Path(self.snapshot_dir) / 'CURRENT').read_text(), version)
+        self.assertEqual([path.name for path in Path(self.snapshot_dir).iterdir() if path.is_dir()], [version])
+
+        swapped = get_columnar_engine()
+        self.assertIsNot(swapped, engine)
+        self.assertEqual(swapped.snapshot_version, version)
+
+    def test_snapshot_out_of_sync_with_database_is_not_used(self):
+        # Ghi thẳng vào bảng, không qua outbox: số dòng lệch nên phải đọc lại từ cơ sở dữ liệu
+        OrderItem.objects.create(order_id_id=1, item_id=2, product_id=self.products[1], quantity=1,
+                                 list_price=Decimal('10'), discount=Decimal('0'))
+        engine = get_columnar_engine()
+        self.assertEqual(engine.source, 'database')
+        self.assertEqual(len(engine), 7)
+
+        reset_columnar_engine()
+        manifest_path = Path(self.snapshot_dir) / engine.snapshot_version / 'manifest.json'
+        manifest = json.loads(manifest_path.read_text())
+        manifest['columns']['revenue_minor'] = '<f8'
+        manifest_path.write_text(json.dumps(manifest))
+        self.assertEqual(get_columnar_engine().source, 'database')
@@ -3,6 +3,14 @@ from .views import (
     InventoryReportView
     , RevenueReportView
     , CustomerAnalysisView
+    , CustomerLifetimeValueView
+    , StaffPerformanceView
+    , SalesCubeView
+    , DemandForecastView
+    , ReplenishmentReportView
+    , FrequentlyBoughtWithView
+    , FulfillmentReportView
+    , OrderStatusFunnelView
 )
 
 urlpatterns = [
@@ -10,4 +18,13 @@ urlpatterns = [
     path('inventory-report/', InventoryReportView.as_view(), name='inventory-report'),
     path('revenue-report/', RevenueReportView.as_view(), name='revenue-report'),
     path('customer-analysis/', CustomerAnalysisView.as_view(), name='customer-analysis'),
+    path('customer-lifetime-value/', CustomerLifetimeValueView.as_view(), name='customer-lifetime-value'),
+    path('staff-performance/', StaffPerformanceView.as_view(), name='staff-performance'),
+    path('sales-cube/', SalesCubeView.as_view(), name='sales-cube'),
+    path('demand-forecast/', DemandForecastView.as_view(), name='demand-forecast'),
+    path('replenishment-report/', ReplenishmentReportView.as_view(), name='replenishment-report'),
+    path('frequently-bought-with/<int:product_id>/', FrequentlyBoughtWithView.as_view(),
+         name='frequently-bought-with'),
+    path('fulfillment-report/', FulfillmentReportView.as_view(), name='fulfillment-report'),
+    path('order-funnel/', OrderStatusFunnelView.as_view(), name='order-funnel'),
 ]
\ No newline at end of file
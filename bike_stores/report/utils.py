@@ -1,13 +1,21 @@
+from bisect import bisect_left, bisect_right
+import json
+import math
+from datetime import date, datetime
 from decimal import Decimal
 
+from django.db import models
+from django.db.models import functions as fn
 
-def calculate_percentile_rank(sorted_revenues: list[Decimal], revenue_value: Decimal) -> float:
+
+def calculate_percentile_rank(sorted_revenues: list[int | Decimal], revenue_value: int | Decimal) -> float:
     """
     Tính xếp hạng phần trăm của một giá trị doanh thu trong một danh sách đã được sắp xếp.
 
     Args:
-        sorted_revenues (list[Decimal]): Danh sách tất cả doanh thu, đã sắp xếp từ thấp đến cao.
-        revenue_value (Decimal): Giá trị doanh thu của khách hàng cần tính.
+        sorted_revenues (list[int | Decimal]): Danh sách tất cả doanh thu (Decimal hoặc minor units),
+            đã sắp xếp từ thấp đến cao.
+        revenue_value (int | Decimal): Giá trị doanh thu của khách hàng cần tính.
 
     Returns:
         float: Xếp hạng phần trăm (từ 0 đến 100).
@@ -15,12 +23,121 @@ def calculate_percentile_rank(sorted_revenues: list[Decimal], revenue_value: Dec
     if not sorted_revenues:
         return 0.0
 
-    count_lower = len([rev for rev in sorted_revenues if rev < revenue_value])
+    # Danh sách đã sắp xếp nên dùng tìm kiếm nhị phân thay vì duyệt toàn bộ
+    count_lower = bisect_left(sorted_revenues, revenue_value)
 
-    count_equal = sorted_revenues.count(revenue_value)
+    count_equal = bisect_right(sorted_revenues, revenue_value) - count_lower
 
     total_count = len(sorted_revenues)
 
     percentile = ((count_lower + 0.5 * count_equal) / total_count) * 100
 
-    return percentile
\ No newline at end of file
+    return percentile
+
+
+def casted_order_date_expr(field: str = 'order_id__order_date') -> models.Case:
+    """
+    Biểu thức chuẩn hóa ngày đặt hàng về DateField.
+
+    Dữ liệu nạp từ file SQL lưu order_date dạng YYYYMMDD, còn dữ liệu tạo qua API lưu dạng YYYY-MM-DD.
+
+    Args:
+        field (str): Đường dẫn tới cột order_date (mặc định tính từ OrderItem).
+
+    Returns:
+        models.Case: Biểu thức có thể dùng trong annotate/aggregate.
+    """
+    as_char = fn.Cast(field, output_field=models.CharField())
+    return models.Case(
+        models.When(
+            condition=models.Q(**{f'{field}__regex': r'^\d{8}$'}),
+            then=fn.Cast(
+                fn.Concat(
+                    fn.Substr(as_char, 1, 4),
+                    models.Value('-'),
+                    fn.Substr(as_char, 5, 2),
+                    models.Value('-'),
+                    fn.Substr(as_char, 7, 2)
+                ),
+                output_field=models.DateField()
+            )
+        ),
+        default=fn.Cast(field, output_field=models.DateField()),
+        output_field=models.DateField()
+    )
+
+
+def normalized_date_sql(column: str) -> str:
+    """
+    Đoạn SQL chuẩn hóa một cột ngày về dạng YYYY-MM-DD, dùng cho các truy vấn SQL thuần.
+
+    Tương đương casted_order_date_expr: giá trị YYYYMMDD (8 ký tự) được chèn dấu gạch ngang.
+
+    Args:
+        column (str): Tên cột (có thể kèm alias bảng, ví dụ 'o.order_date').
+    """
+    return (
+        f"(CASE WHEN length({column}) = 8 "
+        f"THEN substr({column}, 1, 4) || '-' || substr({column}, 5, 2) || '-' || substr({column}, 7, 2) "
+        f"ELSE {column} END)"
+    )
+
+
+def percentile_from_counts(value_counts: dict[int, int], percentile: float) -> int | None:
+    """
+    Phân vị (phương pháp nearest-rank) của một phân phối cho dưới dạng {giá trị: số lần xuất hiện}.
+
+    Args:
+        value_counts (dict[int, int]): Phân phối tần suất.
+        percentile (float): Phân vị cần tính (từ 0 đến 100).
+
+    Returns:
+        int | None: Giá trị tại phân vị, None nếu phân phối rỗng.
+    """
+    total = sum(value_counts.values())
+    if not total:
+        return None
+
+    rank = max(1, math.ceil(percentile / 100 * total))
+    cumulative = 0
+    for value in sorted(value_counts):
+        cumulative += value_counts[value]
+        if cumulative >= rank:
+            return value
+    return None
+
+
+class SnapshotJSONEncoder(json.JSONEncoder):
+    """
+    Mã hóa JSON giữ lại kiểu Decimal/date/datetime để snapshot đọc ra giống hệt kết quả của service.
+    """
+
+    def default(self, o):
+        if isinstance(o, Decimal):
+            return {'__decimal__': str(o)}
+        if isinstance(o, datetime):
+            return {'__datetime__': o.isoformat()}
+        if isinstance(o, date):
+            return {'__date__': o.isoformat()}
+        return super().default(o)
+
+
+def _decode_snapshot_value(obj: dict):
+    if len(obj) == 1:
+        if '__decimal__' in obj:
+            return Decimal(obj['__decimal__'])
+        if '__datetime__' in obj:
+            return datetime.fromisoformat(obj['__datetime__'])
+        if '__date__' in obj:
+            return date.fromisoformat(obj['__date__'])
+    return obj
+
+
+class SnapshotJSONDecoder(json.JSONDecoder):
+    """
+    Giải mã JSON do SnapshotJSONEncoder tạo ra.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('object_hook', _decode_snapshot_value)
+        super().__init__(*args, **kwargs)
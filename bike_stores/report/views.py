@@ -1,13 +1,60 @@
 from datetime import date
 from django.shortcuts import render
-from django.http import JsonResponse
 from django.views import View
+from django.conf import settings
 
+from monitoring.http import JsonResponse
 from .services import (
     get_inventory_report_data
     , get_revenue_report_data
     , get_pareto_customer_analysis
+    , get_customer_lifetime_value
+    , get_staff_performance_report
+    , get_sales_cube_data
+    , get_order_status_funnel
+    , CUBE_DIMENSIONS
 )
+from .basket import get_frequently_bought_with
+from .forecasting import get_demand_forecast
+from .fulfillment import get_fulfillment_report
+from .replenishment import get_replenishment_report
+from .services import get_latest_order_date
+from .snapshots import get_latest_snapshot
+
+
+SNAPSHOT_CONFLICTING_PARAMS = ('start_date', 'end_date', 'compare')
+
+
+def _requested_snapshot(request, report: str, store_id: int | None, period: str = ''):
+    """
+    Đọc snapshot tính sẵn khi có tham số snapshot=latest.
+    Trả về (snapshot, None), (None, None) nếu không yêu cầu snapshot, hoặc (None, JsonResponse lỗi).
+    """
+    snapshot_param = request.GET.get('snapshot')
+    if not snapshot_param:
+        return None, None
+    if snapshot_param != 'latest':
+        return None, JsonResponse({'error': "Tham số 'snapshot' chỉ chấp nhận giá trị 'latest'."}, status=400)
+    conflicting = [param for param in SNAPSHOT_CONFLICTING_PARAMS if request.GET.get(param)]
+    if conflicting:
+        return None, JsonResponse(
+            {'error': f"Không dùng được {', '.join(conflicting)} cùng với snapshot=latest."}, status=400
+        )
+
+    snapshot = get_latest_snapshot(report, store_id=store_id, period=period)
+    if snapshot is None:
+        return None, JsonResponse(
+            {'error': 'Chưa có snapshot cho báo cáo này, hãy chạy lệnh precompute_reports.'}, status=404
+        )
+    return snapshot, None
+
+
+def _snapshot_info(snapshot) -> dict:
+    return {
+        'version': snapshot.version,
+        'as_of': snapshot.as_of.strftime("%Y-%m-%d"),
+        'created_at': snapshot.created_at.isoformat(),
+    }
 
 
 # Inventory report
@@ -17,7 +64,19 @@ class InventoryReportView(View):
     def get(self, request, *args, **kwargs):
         store_id = request.GET.get('store_id')
 
-        inventory_data_grouped = get_inventory_report_data(store_id=store_id)
+        try:
+            snapshot, error_response = _requested_snapshot(
+                request, 'inventory', int(store_id) if store_id else None
+            )
+        except ValueError:
+            return JsonResponse({'error': 'store_id phải là một số nguyên hợp lệ.'}, status=400)
+        if error_response:
+            return error_response
+
+        if snapshot:
+            inventory_data_grouped = snapshot.data
+        else:
+            inventory_data_grouped = get_inventory_report_data(store_id=store_id)
 
         report_title = "Báo cáo hàng tồn kho"
         if store_id:
@@ -27,10 +86,18 @@ class InventoryReportView(View):
             'report_title': report_title,
             'data': inventory_data_grouped
         }
+        if snapshot:
+            response_data['snapshot'] = _snapshot_info(snapshot)
 
         return JsonResponse(response_data)
 
 
+def _format_comparison_fields(item: dict) -> None:
+    item['comparison_revenue'] = f"{item['comparison_revenue']:,.2f}"
+    item['delta'] = f"{item['delta']:,.2f}"
+    item['growth_rate'] = f"{item['growth_rate']:.2f}%" if item['growth_rate'] is not None else None
+
+
 # Revenue report
 class RevenueReportView(View):
     """
@@ -42,12 +109,15 @@ class RevenueReportView(View):
         end_date_str = request.GET.get('end_date', date.today().isoformat())
         period = request.GET.get('period', 'month')
         store_id_str = request.GET.get('store_id')
+        compare = request.GET.get('compare') or None
 
         if period not in ['day', 'week', 'month', 'quarter', 'year']:
             return JsonResponse(
                 {'error': "Tham số 'period' phải là 'day', 'week', 'month', 'quarter', hoặc 'year'."},
                 status=400
             )
+        if compare not in [None, 'yoy', 'prev']:
+            return JsonResponse({'error': "Tham số 'compare' phải là 'yoy' hoặc 'prev'."}, status=400)
 
         try:
             end_date = date.fromisoformat(end_date_str)
@@ -56,12 +126,20 @@ class RevenueReportView(View):
         except (ValueError, TypeError):
             return JsonResponse({'error': "Định dạng tham số không hợp lệ (ngày tháng, store_id)."}, status=400)
 
-        revenue_result = get_revenue_report_data(
-            start_date=start_date,
-            end_date=end_date,
-            period=period,
-            store_id=store_id
-        )
+        snapshot, error_response = _requested_snapshot(request, 'revenue', store_id, period)
+        if error_response:
+            return error_response
+
+        if snapshot:
+            revenue_result = snapshot.data
+        else:
+            revenue_result = get_revenue_report_data(
+                start_date=start_date,
+                end_date=end_date,
+                period=period,
+                store_id=store_id,
+                compare=compare
+            )
 
         # sales_data = revenue_result.get('data', [])
         # store_name = revenue_result.get('store_name', 'Lỗi không xác định')
@@ -71,6 +149,17 @@ class RevenueReportView(View):
             for item in revenue_result.get('data'):
                 item['period'] = item['period'].strftime("%Y-%m-%d")
                 item['total_revenue'] = f"{item['total_revenue']:,.2f}"
+                if compare:
+                    _format_comparison_fields(item)
+                    item['comparison_period'] = (
+                        item['comparison_period'].strftime("%Y-%m-%d") if item['comparison_period'] else None
+                    )
+        if revenue_result.get('comparison'):
+            comparison = revenue_result['comparison']
+            comparison['start_date'] = comparison['start_date'].strftime("%Y-%m-%d")
+            comparison['end_date'] = comparison['end_date'].strftime("%Y-%m-%d")
+            comparison['total_revenue'] = f"{comparison['total_revenue']:,.2f}"
+            _format_comparison_fields(comparison)
 
         response_data = {
             'report_title': 'Báo cáo Doanh thu theo Thời gian',
@@ -78,10 +167,12 @@ class RevenueReportView(View):
             'currency': 'VND',
             'query_params': {
                 'start_date': start_date_str, 'end_date': end_date_str,
-                'period': period, 'store_id': store_id
+                'period': period, 'store_id': store_id, 'compare': compare
             },
             'revenue': revenue_result
         }
+        if snapshot:
+            response_data['snapshot'] = _snapshot_info(snapshot)
         return JsonResponse(response_data)
 
 
@@ -106,8 +197,15 @@ class CustomerAnalysisView(View):
                 status=400
             )
 
-        # Gọi service để lấy toàn bộ dữ liệu phân tích
-        analysis_data = get_pareto_customer_analysis(start_date=start_date, end_date=end_date, store_id=store_id)
+        snapshot, error_response = _requested_snapshot(request, 'customer-analysis', store_id)
+        if error_response:
+            return error_response
+
+        # Gọi service để lấy toàn bộ dữ liệu phân tích (hoặc đọc từ snapshot tính sẵn)
+        if snapshot:
+            analysis_data = snapshot.data
+        else:
+            analysis_data = get_pareto_customer_analysis(start_date=start_date, end_date=end_date, store_id=store_id)
 
         # Lấy danh sách khách hàng đầy đủ từ kết quả phân tích
         all_customers = analysis_data.get('customers', [])
@@ -147,5 +245,387 @@ class CustomerAnalysisView(View):
             },
             'analysis': analysis_data
         }
+        if snapshot:
+            response_data['snapshot'] = _snapshot_info(snapshot)
+
+        return JsonResponse(response_data)
+
+
+# Customer lifetime value
+class CustomerLifetimeValueView(View):
+    """
+    Giá trị vòng đời khách hàng, đọc từ bảng tổng hợp customer_stats.
+    """
+
+    def get(self, request, *args, **kwargs):
+        store_id_str = request.GET.get('store_id')
+        customer_id_str = request.GET.get('customer_id')
+        limit_str = request.GET.get('limit')
+
+        try:
+            store_id = int(store_id_str) if store_id_str else None
+            customer_id = int(customer_id_str) if customer_id_str else None
+            limit = int(limit_str) if limit_str else None
+        except (ValueError, TypeError):
+            return JsonResponse(
+                {'error': "Định dạng tham số không hợp lệ (store_id, customer_id, limit)."},
+                status=400
+            )
+
+        clv_data = get_customer_lifetime_value(store_id=store_id, customer_id=customer_id)
+
+        if limit is not None:
+            clv_data['customers'] = clv_data['customers'][:limit]
+
+        summary = clv_data['summary']
+        summary['total_lifetime_revenue'] = f"{summary['total_lifetime_revenue']:,.2f}"
+        summary['average_lifetime_value'] = f"{summary['average_lifetime_value']:,.2f}"
+
+        for customer in clv_data['customers']:
+            customer['first_order_date'] = customer['first_order_date'].strftime("%Y-%m-%d")
+            customer['last_order_date'] = customer['last_order_date'].strftime("%Y-%m-%d")
+            customer['lifetime_revenue'] = f"{customer['lifetime_revenue']:,.2f}"
+            customer['average_order_value'] = f"{customer['average_order_value']:,.2f}"
+
+        response_data = {
+            'report_title': f"Giá trị vòng đời khách hàng ({clv_data.get('store_name')})",
+            'currency': 'VND',
+            'query_params': {
+                'store_id': store_id, 'customer_id': customer_id, 'limit': limit,
+            },
+            'analysis': clv_data
+        }
+
+        return JsonResponse(response_data)
+
+
+# Staff performance
+class StaffPerformanceView(View):
+    """
+    Doanh thu theo nhân viên và cộng dồn theo cây quản lý.
+    """
+
+    def get(self, request, *args, **kwargs):
+        start_date_str = request.GET.get('start_date')
+        end_date_str = request.GET.get('end_date', date.today().isoformat())
+        store_id_str = request.GET.get('store_id')
+
+        try:
+            end_date = date.fromisoformat(end_date_str)
+            start_date = date.fromisoformat(start_date_str) if start_date_str else None
+            store_id = int(store_id_str) if store_id_str else None
+        except (ValueError, TypeError):
+            return JsonResponse({'error': "Định dạng tham số không hợp lệ (ngày tháng, store_id)."}, status=400)
+
+        performance_result = get_staff_performance_report(
+            start_date=start_date,
+            end_date=end_date,
+            store_id=store_id
+        )
+
+        for item in performance_result['data']:
+            item['own_revenue'] = f"{item['own_revenue']:,.2f}"
+            item['team_revenue'] = f"{item['team_revenue']:,.2f}"
+
+        response_data = {
+            'report_title': 'Báo cáo hiệu suất nhân viên',
+            'currency': 'VND',
+            'query_params': {
+                'start_date': start_date_str, 'end_date': end_date_str, 'store_id': store_id
+            },
+            'performance': performance_result
+        }
+        return JsonResponse(response_data)
+
+
+# Sales cube (roll-up / drill-down)
+class SalesCubeView(View):
+    """
+    Doanh thu và số lượng theo tập chiều tùy chọn (store, brand, category, month), đọc từ sales_cube.
+    """
+
+    def get(self, request, *args, **kwargs):
+        dimensions_str = request.GET.get('dimensions', '')
+        start_date_str = request.GET.get('start_date')
+        end_date_str = request.GET.get('end_date')
+        store_id_str = request.GET.get('store_id')
+        brand_id_str = request.GET.get('brand_id')
+        category_id_str = request.GET.get('category_id')
+
+        dimensions = [d.strip() for d in dimensions_str.split(',') if d.strip()]
+        invalid_dimensions = [d for d in dimensions if d not in CUBE_DIMENSIONS]
+        if invalid_dimensions or len(set(dimensions)) != len(dimensions):
+            return JsonResponse(
+                {'error': f"Tham số 'dimensions' chỉ chấp nhận: {', '.join(CUBE_DIMENSIONS)} (không trùng lặp)."},
+                status=400
+            )
+
+        try:
+            start_date = date.fromisoformat(start_date_str) if start_date_str else None
+            end_date = date.fromisoformat(end_date_str) if end_date_str else None
+            store_id = int(store_id_str) if store_id_str else None
+            brand_id = int(brand_id_str) if brand_id_str else None
+            category_id = int(category_id_str) if category_id_str else None
+        except (ValueError, TypeError):
+            return JsonResponse(
+                {'error': "Định dạng tham số không hợp lệ (ngày tháng, store_id, brand_id, category_id)."},
+                status=400
+            )
+
+        cube_result = get_sales_cube_data(
+            dimensions=dimensions,
+            start_date=start_date,
+            end_date=end_date,
+            store_id=store_id,
+            brand_id=brand_id,
+            category_id=category_id
+        )
+
+        for item in cube_result['data']:
+            if 'month' in item:
+                item['month'] = item['month'].strftime("%Y-%m")
+            item['revenue'] = f"{item['revenue']:,.2f}"
+        cube_result['totals']['revenue'] = f"{cube_result['totals']['revenue']:,.2f}"
+
+        response_data = {
+            'report_title': 'Khối dữ liệu bán hàng',
+            'currency': 'VND',
+            'query_params': {
+                'dimensions': dimensions, 'start_date': start_date_str, 'end_date': end_date_str,
+                'store_id': store_id, 'brand_id': brand_id, 'category_id': category_id
+            },
+            'cube': cube_result
+        }
+        return JsonResponse(response_data)
+
+
+# Demand forecast
+class DemandForecastView(View):
+    """
+    Dự báo nhu cầu theo (cửa hàng, sản phẩm) bằng làm trơn hàm mũ và trung bình trượt.
+    """
+
+    def get(self, request, *args, **kwargs):
+        horizon_str = request.GET.get('horizon', '14')
+        end_date_str = request.GET.get('end_date')
+        history_days_str = request.GET.get('history_days', '365')
+        alpha_str = request.GET.get('alpha', '0.3')
+        window_str = request.GET.get('window', '28')
+        store_id_str = request.GET.get('store_id')
+        product_id_str = request.GET.get('product_id')
+        limit_str = request.GET.get('limit')
+
+        try:
+            horizon = int(horizon_str)
+            end_date = date.fromisoformat(end_date_str) if end_date_str else None
+            history_days = int(history_days_str)
+            alpha = float(alpha_str)
+            window = int(window_str)
+            store_id = int(store_id_str) if store_id_str else None
+            product_id = int(product_id_str) if product_id_str else None
+            limit = int(limit_str) if limit_str else None
+        except (ValueError, TypeError):
+            return JsonResponse({'error': "Định dạng tham số không hợp lệ."}, status=400)
+
+        if horizon < 1 or history_days < 1 or window < 1 or not 0 < alpha <= 1:
+            return JsonResponse(
+                {'error': "horizon, history_days, window phải lớn hơn 0 và alpha thuộc (0, 1]."},
+                status=400
+            )
+
+        forecast_result = get_demand_forecast(
+            horizon=horizon,
+            end_date=end_date,
+            history_days=history_days,
+            alpha=alpha,
+            window=window,
+            store_id=store_id,
+            product_id=product_id,
+            workers=settings.REPORT_FORECAST_WORKERS
+        )
+
+        if limit is not None:
+            forecast_result['data'] = forecast_result['data'][:limit]
+        for key in ('history_start_date', 'history_end_date', 'forecast_start_date'):
+            if key in forecast_result:
+                forecast_result[key] = forecast_result[key].strftime("%Y-%m-%d")
+        for item in forecast_result['data']:
+            for key in ('ses_daily', 'ses_total', 'moving_average_daily', 'moving_average_total'):
+                item[key] = round(item[key], 3)
+
+        response_data = {
+            'report_title': 'Dự báo nhu cầu theo sản phẩm và cửa hàng',
+            'query_params': {
+                'horizon': horizon, 'end_date': end_date_str, 'history_days': history_days,
+                'alpha': alpha, 'window': window, 'store_id': store_id, 'product_id': product_id, 'limit': limit
+            },
+            'forecast': forecast_result
+        }
+        return JsonResponse(response_data)
+
+
+# Replenishment report
+class ReplenishmentReportView(View):
+    """
+    Khuyến nghị nhập hàng: tồn kho hiện tại so với tốc độ bán gần đây, điểm đặt hàng lại và tồn kho an toàn.
+    """
+
+    def get(self, request, *args, **kwargs):
+        store_id_str = request.GET.get('store_id')
+        as_of_str = request.GET.get('as_of')
+        window_days_str = request.GET.get('window_days', '90')
+        lead_time_days_str = request.GET.get('lead_time_days', '7')
+        review_days_str = request.GET.get('review_days', '7')
+        service_level_str = request.GET.get('service_level', '0.95')
+        limit_str = request.GET.get('limit')
+
+        try:
+            store_id = int(store_id_str) if store_id_str else None
+            as_of = date.fromisoformat(as_of_str) if as_of_str else None
+            window_days = int(window_days_str)
+            lead_time_days = int(lead_time_days_str)
+            review_days = int(review_days_str)
+            service_level = float(service_level_str)
+            limit = int(limit_str) if limit_str else None
+        except (ValueError, TypeError):
+            return JsonResponse({'error': "Định dạng tham số không hợp lệ."}, status=400)
+
+        if window_days < 1 or lead_time_days < 0 or review_days < 0 or not 0.5 <= service_level < 1:
+            return JsonResponse(
+                {'error': "window_days phải lớn hơn 0, lead_time_days/review_days không âm, "
+                          "service_level thuộc [0.5, 1)."},
+                status=400
+            )
+
+        # Mặc định tính tốc độ bán tới ngày có đơn hàng gần nhất
+        as_of = as_of or get_latest_order_date() or date.today()
+
+        replenishment_result = get_replenishment_report(
+            as_of=as_of,
+            store_id=store_id,
+            window_days=window_days,
+            lead_time_days=lead_time_days,
+            review_days=review_days,
+            service_level=service_level
+        )
+
+        if limit is not None:
+            replenishment_result['data'] = replenishment_result['data'][:limit]
+        replenishment_result['as_of'] = replenishment_result['as_of'].strftime("%Y-%m-%d")
+
+        response_data = {
+            'report_title': 'Khuyến nghị nhập hàng',
+            'query_params': {
+                'store_id': store_id, 'as_of': as_of_str, 'window_days': window_days,
+                'lead_time_days': lead_time_days, 'review_days': review_days,
+                'service_level': service_level, 'limit': limit
+            },
+            'replenishment': replenishment_result
+        }
+        return JsonResponse(response_data)
+
+
+# Frequently bought together
+class FrequentlyBoughtWithView(View):
+    """
+    Các sản phẩm thường được mua cùng một sản phẩm, đọc từ bảng product_affinity.
+    """
+
+    def get(self, request, product_id, *args, **kwargs):
+        limit_str = request.GET.get('limit', '10')
+        sort_by = request.GET.get('sort_by', 'lift')
 
-        return JsonResponse(response_data)
\ No newline at end of file
+        if sort_by not in ['lift', 'confidence', 'support']:
+            return JsonResponse(
+                {'error': "Tham số 'sort_by' phải là 'lift', 'confidence' hoặc 'support'."},
+                status=400
+            )
+        try:
+            limit = int(limit_str)
+        except (ValueError, TypeError):
+            limit = None
+        if limit is None or limit < 1:
+            return JsonResponse({'error': "Định dạng tham số không hợp lệ (limit)."}, status=400)
+
+        products = get_frequently_bought_with(product_id, limit=limit, sort_by=sort_by)
+        for item in products:
+            item['support'] = round(item['support'], 6)
+            item['confidence'] = round(item['confidence'], 4)
+            item['lift'] = round(item['lift'], 4)
+
+        response_data = {
+            'report_title': f"Sản phẩm thường được mua cùng (product_id: {product_id})",
+            'query_params': {'product_id': product_id, 'limit': limit, 'sort_by': sort_by},
+            'data': products
+        }
+        return JsonResponse(response_data)
+
+
+# Fulfillment (shipping SLA) report
+class FulfillmentReportView(View):
+    """
+    Báo cáo giao hàng: tỉ lệ đúng hạn, mức độ trễ, phân vị số ngày giao và đơn quá hạn chưa giao.
+    """
+
+    def get(self, request, *args, **kwargs):
+        start_date_str = request.GET.get('start_date')
+        end_date_str = request.GET.get('end_date', date.today().isoformat())
+        store_id_str = request.GET.get('store_id')
+        as_of_str = request.GET.get('as_of')
+
+        try:
+            end_date = date.fromisoformat(end_date_str)
+            start_date = date.fromisoformat(start_date_str) if start_date_str else None
+            store_id = int(store_id_str) if store_id_str else None
+            as_of = date.fromisoformat(as_of_str) if as_of_str else None
+        except (ValueError, TypeError):
+            return JsonResponse({'error': "Định dạng tham số không hợp lệ (ngày tháng, store_id)."}, status=400)
+
+        fulfillment_result = get_fulfillment_report(
+            start_date=start_date,
+            end_date=end_date,
+            store_id=store_id,
+            as_of=as_of
+        )
+        fulfillment_result['as_of'] = fulfillment_result['as_of'].strftime("%Y-%m-%d")
+
+        response_data = {
+            'report_title': 'Báo cáo giao hàng và trễ hạn',
+            'query_params': {
+                'start_date': start_date_str, 'end_date': end_date_str, 'store_id': store_id, 'as_of': as_of_str
+            },
+            'fulfillment': fulfillment_result
+        }
+        return JsonResponse(response_data)
+
+
+# Order status funnel
+class OrderStatusFunnelView(View):
+    """
+    Số đơn hàng theo trạng thái của từng cửa hàng, đọc từ bộ đếm order_status_counters.
+    """
+
+    def get(self, request, *args, **kwargs):
+        start_date_str = request.GET.get('start_date')
+        end_date_str = request.GET.get('end_date')
+        store_id_str = request.GET.get('store_id')
+
+        try:
+            start_date = date.fromisoformat(start_date_str) if start_date_str else None
+            end_date = date.fromisoformat(end_date_str) if end_date_str else None
+            store_id = int(store_id_str) if store_id_str else None
+        except (ValueError, TypeError):
+            return JsonResponse({'error': "Định dạng tham số không hợp lệ (ngày tháng, store_id)."}, status=400)
+
+        funnel_result = get_order_status_funnel(
+            start_date=start_date,
+            end_date=end_date,
+            store_id=store_id
+        )
+
+        response_data = {
+            'report_title': 'Funnel trạng thái đơn hàng',
+            'query_params': {'start_date': start_date_str, 'end_date': end_date_str, 'store_id': store_id},
+            'funnel': funnel_result
+        }
+        return JsonResponse(response_data)
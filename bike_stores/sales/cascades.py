@@ -0,0 +1,40 @@
+"""
+Sự kiện outbox cho các bản ghi bị xóa dây chuyền (CASCADE) khi xóa khách hàng, cửa hàng hoặc sản phẩm.
+
+Các hàm ghi sự kiện 'deleted' giống như khi xóa từng bản ghi, để bộ cột trong bộ nhớ và các sink outbox
+thấy được các dòng bị xóa. Gọi trước thao tác xóa, trong cùng transaction.
+"""
+from events.outbox import record_change
+from .models import OrderItem
+
+
+def record_cascaded_item_deletes(items) -> None:
+    """
+    Sự kiện 'deleted' cho từng dòng hàng trong queryset items.
+    """
+    rows = items.order_by('order_id', 'item_id').values_list('order_id', 'item_id', 'order_id__store_id')
+    for order_id, item_id, store_id in rows:
+        record_change(
+            'order_item', 'deleted', f'{order_id}:{item_id}', {'order_id': order_id, 'item_id': item_id},
+            store_id=store_id
+        )
+
+
+def record_cascaded_order_deletes(orders) -> None:
+    """
+    Sự kiện 'deleted' cho các đơn hàng trong queryset orders và các dòng hàng của chúng.
+    """
+    record_cascaded_item_deletes(OrderItem.objects.filter(order_id__in=orders))
+    for order_id, store_id in orders.order_by('order_id').values_list('order_id', 'store_id'):
+        record_change('order', 'deleted', order_id, {'order_id': order_id}, store_id=store_id)
+
+
+def record_cascaded_stock_deletes(stocks) -> None:
+    """
+    Sự kiện 'deleted' cho từng bản ghi tồn kho trong queryset stocks.
+    """
+    for store_id, product_id in stocks.order_by('store_id', 'product_id').values_list('store_id', 'product_id'):
+        record_change(
+            'stock', 'deleted', f'{store_id}:{product_id}', {'store_id': store_id, 'product_id': product_id},
+            store_id=store_id
+        )
@@ -1,7 +1,8 @@
 from django.test import TestCase, Client
 from django.urls import reverse
 from .models import Customer, Store, Staff, Order, OrderItem
-from production.models import Product, Brand, Category
+from production.models import Product, Brand, Category, Stock
+from events.models import OutboxEvent
 import json
 from datetime import date
 
@@ -79,6 +80,13 @@ class SalesAPITestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn('được xóa thành công', response.json()['message'])
 
+    def test_delete_customer_records_cascaded_order_events(self):
+        response = self.client.delete(reverse('customer-detail', args=[self.customer.customer_id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Order.objects.exists())
+        events = list(OutboxEvent.objects.order_by('id').values_list('event_type', 'action', 'aggregate_id', 'store_id'))
+        self.assertEqual(events, [('order_item', 'deleted', '1:1', 1), ('order', 'deleted', '1', 1)])
+
     # ----------- ORDER TESTS -----------
     def test_order_list(self):
         url = reverse('order-list')
@@ -158,6 +166,28 @@ class SalesAPITestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json()['store_name'], "Updated Store")
 
+    def test_delete_store_records_cascaded_events(self):
+        # Nhân viên của cửa hàng 1 bán hàng tại cửa hàng 2; xóa cửa hàng 2 xóa dây chuyền đơn hàng và tồn kho
+        store = Store.objects.create(store_id=2, store_name="Second Store")
+        order = Order.objects.create(order_id=2, customer_id=self.customer, order_status=1, order_date=date.today(),
+                                     required_date=date.today(), store_id=store, staff_id=self.staff)
+        OrderItem.objects.create(order_id=order, item_id=1, product_id=self.product, quantity=1, list_price=1000,
+                                 discount=0)
+        Stock.objects.create(store_id=store, product_id=self.product, quantity=3)
+
+        response = self.client.delete(reverse('store-detail', args=[2]))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Order.objects.filter(order_id=2).exists())
+        events = list(OutboxEvent.objects.order_by('id').values_list('event_type', 'action', 'aggregate_id', 'store_id'))
+        self.assertEqual(events, [
+            ('order_item', 'deleted', '2:1', 2), ('order', 'deleted', '2', 2), ('stock', 'deleted', '2:1', 2),
+        ])
+
+        # Xóa bị chặn bởi khóa ngoại PROTECT thì các sự kiện cũng bị rollback
+        response = self.client.delete(reverse('store-detail', args=[self.store.store_id]))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(OutboxEvent.objects.count(), 3)
+
     def test_delete_store(self):
         # Tạo store mới không liên kết với staff/order nào
         store = Store.objects.create(
@@ -1,13 +1,17 @@
 from django.shortcuts import render
 from django.views import View
-from django.http import JsonResponse
 from django.core.exceptions import ValidationError
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 
 from .models import Customer, Order, OrderItem, Staff, Store
-from production.models import Product
+from production.models import Product, Stock
+from report.aggregates import refreshing_order_aggregates
+from report.cache import invalidate_report_cache
+from events.outbox import record_change
+from .cascades import record_cascaded_order_deletes, record_cascaded_stock_deletes
+from monitoring.http import JsonResponse
 import json
 from functools import wraps
 
@@ -34,10 +38,14 @@ def update_instance_fields(instance, data, updatable_fields, fk_map=None):
 
 def get_instance_or_404(model, pk, error_msg):
     try:
+        # Cho phép truyền dict cho các model dùng khóa kép (ví dụ OrderItem)
+        if isinstance(pk, dict):
+            return model.objects.get(**pk)
         return model.objects.get(pk=pk)
     except model.DoesNotExist:
         raise ValueError(error_msg)
 
+
 def handle_exceptions(view_func):
     @wraps(view_func)
     def wrapper(self, request, *args, **kwargs):
@@ -113,7 +121,10 @@ class CustomerDetailView(View):
     def delete(self, request, customer_id):
         customer = get_instance_or_404(Customer, customer_id, 'Khách hàng không tồn tại')
         customer_name = f"{customer.first_name} {customer.last_name}"
-        customer.delete()
+        orders = Order.objects.filter(customer_id=customer_id)
+        with transaction.atomic(), refreshing_order_aggregates(orders.values_list('order_id', flat=True)):
+            record_cascaded_order_deletes(orders)
+            customer.delete()
         return JsonResponse({'message': f'Khách hàng {customer_name} (ID: {customer_id}) đã được xóa thành công.'}, status=200)
 
 ######################### ORDER #########################
@@ -132,17 +143,19 @@ class OrderListView(View):
         customer = get_instance_or_404(Customer, data.get('customer_id'), 'Customer không tồn tại')
         store = get_instance_or_404(Store, data.get('store_id'), 'Store không tồn tại')
         staff = get_instance_or_404(Staff, data.get('staff_id'), 'Staff không tồn tại')
-        new_order = Order.objects.create(
-            order_id=data.get('order_id'),
-            customer_id=customer,
-            order_status=data.get('order_status'),
-            order_date=data.get('order_date'),
-            required_date=data.get('required_date'),
-            shipped_date=data.get('shipped_date'),
-            store_id=store,
-            staff_id=staff
-        )
-        response_data = Order.objects.filter(order_id=new_order.order_id).values().first()
+        with transaction.atomic(), refreshing_order_aggregates([data.get('order_id')]):
+            new_order = Order.objects.create(
+                order_id=data.get('order_id'),
+                customer_id=customer,
+                order_status=data.get('order_status'),
+                order_date=data.get('order_date'),
+                required_date=data.get('required_date'),
+                shipped_date=data.get('shipped_date'),
+                store_id=store,
+                staff_id=staff
+            )
+            response_data = Order.objects.filter(order_id=new_order.order_id).values().first()
+            record_change('order', 'created', new_order.order_id, response_data, store_id=new_order.store_id_id)
         return JsonResponse(response_data, status=201)
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -169,14 +182,18 @@ class OrderDetailView(View):
         if not has_changes and not data:
             current_data = Order.objects.filter(order_id=order_id).values().first()
             return JsonResponse(current_data, status=200)
-        order.save()
-        updated_order = Order.objects.filter(order_id=order_id).values().first()
+        with transaction.atomic(), refreshing_order_aggregates([order_id]):
+            order.save()
+            updated_order = Order.objects.filter(order_id=order_id).values().first()
+            record_change('order', 'updated', order_id, updated_order, store_id=order.store_id_id)
         return JsonResponse(updated_order, status=200)
 
     @handle_exceptions
     def delete(self, request, order_id):
         order = get_instance_or_404(Order, order_id, 'Đơn hàng không tồn tại')
-        order.delete()
+        with transaction.atomic(), refreshing_order_aggregates([order_id]):
+            order.delete()
+            record_change('order', 'deleted', order_id, {'order_id': order_id}, store_id=order.store_id_id)
         return JsonResponse({'message': f'Đơn hàng {order_id} đã được xóa thành công.'}, status=200)
 
 ######################### ORDER ITEM #########################
@@ -194,15 +211,19 @@ class OrderItemListView(View):
         check_required_fields(data, required_fields)
         order = get_instance_or_404(Order, data.get('order_id'), 'Order không tồn tại')
         product = get_instance_or_404(Product, data.get('product_id'), 'Product không tồn tại')
-        new_item = OrderItem.objects.create(
-            order_id=order,
-            item_id=data.get('item_id'),
-            product_id=product,
-            quantity=data.get('quantity'),
-            list_price=data.get('list_price'),
-            discount=data.get('discount')
-        )
-        response_data = OrderItem.objects.filter(order_id=new_item.order_id, item_id=new_item.item_id).values().first()
+        with transaction.atomic(), refreshing_order_aggregates([order.order_id]):
+            new_item = OrderItem.objects.create(
+                order_id=order,
+                item_id=data.get('item_id'),
+                product_id=product,
+                quantity=data.get('quantity'),
+                list_price=data.get('list_price'),
+                discount=data.get('discount')
+            )
+            response_data = OrderItem.objects.filter(order_id=new_item.order_id, item_id=new_item.item_id).values().first()
+            record_change(
+                'order_item', 'created', f'{order.order_id}:{new_item.item_id}', response_data, store_id=order.store_id_id
+            )
         return JsonResponse(response_data, status=201)
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -225,14 +246,23 @@ class OrderItemDetailView(View):
         if not has_changes and not data:
             current_data = OrderItem.objects.filter(order_id=order_id, item_id=item_id).values().first()
             return JsonResponse(current_data, status=200)
-        item.save()
-        updated_item = OrderItem.objects.filter(order_id=order_id, item_id=item_id).values().first()
+        with transaction.atomic(), refreshing_order_aggregates([order_id]):
+            item.save()
+            updated_item = OrderItem.objects.filter(order_id=order_id, item_id=item_id).values().first()
+            record_change(
+                'order_item', 'updated', f'{order_id}:{item_id}', updated_item, store_id=item.order_id.store_id_id
+            )
         return JsonResponse(updated_item, status=200)
 
     @handle_exceptions
     def delete(self, request, order_id, item_id):
         item = get_instance_or_404(OrderItem, {'order_id': order_id, 'item_id': item_id}, 'OrderItem không tồn tại')
-        item.delete()
+        with transaction.atomic(), refreshing_order_aggregates([order_id]):
+            item.delete()
+            record_change(
+                'order_item', 'deleted', f'{order_id}:{item_id}', {'order_id': order_id, 'item_id': item_id},
+                store_id=item.order_id.store_id_id
+            )
         return JsonResponse({'message': f'OrderItem ({order_id}, {item_id}) đã được xóa thành công.'}, status=200)
 
 ######################### STAFF #########################
@@ -347,5 +377,10 @@ class StoreDetailView(View):
     @handle_exceptions
     def delete(self, request, store_id):
         store = get_instance_or_404(Store, store_id, 'Cửa hàng không tồn tại')
-        store.delete()
+        # Các bảng tổng hợp của cửa hàng bị xóa dây chuyền theo khóa ngoại, chỉ cần vô hiệu hóa cache báo cáo
+        with transaction.atomic():
+            record_cascaded_order_deletes(Order.objects.filter(store_id=store_id))
+            record_cascaded_stock_deletes(Stock.objects.filter(store_id=store_id))
+            store.delete()
+            invalidate_report_cache()
         return JsonResponse({'message': f'Cửa hàng {store_id} đã được xóa thành công.'}, status=200)
\ No newline at end of file